@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import authentication, calendar_feed, lookup
+        authentication.connect_signals()
+        lookup.connect_signals()
+        calendar_feed.connect_signals()
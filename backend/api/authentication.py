@@ -0,0 +1,335 @@
+"""
+Autenticación JWT sin consulta de usuario por petición.
+
+Los tokens de login y de refresh llevan como claims los datos que las vistas
+usan en casi todas las peticiones (username, is_staff, is_superuser y el rol
+y la cédula del perfil). A partir de ellos ClaimsJWTAuthentication construye
+request.user sin tocar la base de datos: es un RequestUser (proxy de User)
+con el resto de campos diferidos y request.user.profile ya resuelto, de modo
+que las comprobaciones de rol no hacen consultas. Si una vista necesita un
+campo que no viene en el token (email, password...) se carga una sola vez
+con una consulta y se guarda en una caché local del proceso con TTL.
+
+Cuando la cuenta cambia (MeView.patch / MeView.delete, o cualquier save de
+User o Profile) se descarta la caché local y se anota la hora del cambio en
+la caché "auth" (settings.CACHES), que comparten todos los procesos y no
+desaloja entradas; los tokens emitidos antes dejan de usarse como fuente de
+datos y el usuario se vuelve a leer de la base de datos (comprobando
+is_active) hasta que el cliente obtenga un token nuevo. Si la caché "auth"
+no responde no se confía en los claims: el usuario se lee de la base de datos.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import checks
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+USER_CACHE_TTL = 60  # segundos
+# Usuarios distintos que guarda como máximo la caché local de cada proceso
+USER_CACHE_MAX_ENTRIES = 10000
+# Claims con datos del usuario; "claims_at" indica cuándo se tomaron de la base de datos
+USER_CLAIMS = ("username", "is_staff", "is_superuser")
+# Claims del perfil -> campo de Profile; todos None si el usuario no tiene perfil
+PROFILE_CLAIMS = {"profile_id": "id", "role": "role", "id_number": "id_number"}
+CLAIMS_AT = "claims_at"
+
+REVOCATION_CACHE = "auth"
+
+_CHANGED_KEY = "auth_user_changed:{}"
+_USER_FIELDS = [field.attname for field in User._meta.concrete_fields]
+
+logger = logging.getLogger(__name__)
+
+
+class _TTLCache:
+	"""
+	Diccionario local al proceso con caducidad por entrada y como mucho
+	``maxsize`` entradas: al guardar se descartan las caducadas y, si sigue
+	lleno, las usadas hace más tiempo (LRU).
+	"""
+
+	def __init__(self, ttl, maxsize):
+		self.ttl = ttl
+		self.maxsize = maxsize
+		self._data = OrderedDict()
+		self._lock = threading.Lock()
+
+	def __len__(self):
+		return len(self._data)
+
+	def get(self, key):
+		with self._lock:
+			item = self._data.get(key)
+			if item is None:
+				return None
+			if item[0] < time.monotonic():
+				del self._data[key]
+				return None
+			self._data.move_to_end(key)
+			return item[1]
+
+	def set(self, key, value):
+		now = time.monotonic()
+		with self._lock:
+			self._data[key] = (now + self.ttl, value)
+			self._data.move_to_end(key)
+			# Todas las entradas tienen el mismo TTL: las caducadas se acumulan al
+			# principio salvo que se hayan leído después, y esas acaban saliendo
+			# por el límite de tamaño
+			while self._data:
+				oldest = next(iter(self._data.values()))
+				if oldest[0] >= now and len(self._data) <= self.maxsize:
+					break
+				self._data.popitem(last=False)
+
+	def pop(self, key):
+		with self._lock:
+			self._data.pop(key, None)
+
+	def clear(self):
+		with self._lock:
+			self._data.clear()
+
+
+_user_cache = _TTLCache(USER_CACHE_TTL, USER_CACHE_MAX_ENTRIES)
+
+
+def load_user_values(user_id, changed_at=None):
+	"""
+	Campos del usuario y de su perfil (una consulta con LEFT JOIN, cacheada).
+	Devuelve {"user": {...}, "profile": {...} | None} o None si no existe.
+	Con changed_at se descarta lo cacheado antes de esa hora: la caché es
+	local y otro proceso puede haber registrado el cambio.
+	"""
+	values = _user_cache.get(user_id)
+	if values is not None and (changed_at is None or values["loaded_at"] > changed_at):
+		return values
+	loaded_at = time.time()
+	row = (
+		User.objects.filter(id=user_id)
+		.values(*_USER_FIELDS, "profile__id", "profile__role", "profile__id_number")
+		.first()
+	)
+	if row is None:
+		return None
+	values = {
+		"user": {name: row[name] for name in _USER_FIELDS},
+		"profile": {
+			"id": row["profile__id"],
+			"user_id": user_id,
+			"role": row["profile__role"],
+			"id_number": row["profile__id_number"],
+		} if row["profile__id"] is not None else None,
+		"loaded_at": loaded_at,
+	}
+	_user_cache.set(user_id, values)
+	return values
+
+
+def invalidate_user_cache(user_id):
+	"""Descarta los datos cacheados del usuario y los claims de sus tokens actuales."""
+	_user_cache.pop(user_id)
+	# Basta con que la marca dure lo que un access token: los emitidos antes ya habrán caducado
+	timeout = int(settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"].total_seconds())
+	try:
+		caches[REVOCATION_CACHE].set(_CHANGED_KEY.format(user_id), time.time(), timeout)
+	except Exception:
+		logger.exception(
+			"No se pudo registrar el cambio del usuario %s en la caché de revocación", user_id
+		)
+
+
+def _changed_at(user_id):
+	"""Hora del último cambio de la cuenta; infinito si la caché de revocación no responde."""
+	try:
+		return caches[REVOCATION_CACHE].get(_CHANGED_KEY.format(user_id))
+	except Exception:
+		logger.warning(
+			"Caché de revocación no disponible: el usuario %s se lee de la base de datos", user_id
+		)
+		return float("inf")
+
+
+def invalidate_user_cache_receiver(sender, instance, update_fields=None, **kwargs):
+	"""Receptor de señales de User y Profile."""
+	if update_fields and set(update_fields) <= {"last_login"}:
+		return
+	invalidate_user_cache(instance.pk if sender is User else instance.user_id)
+
+
+def connect_signals():
+	from django.db.models.signals import post_delete, post_save
+
+	from .models import Profile
+
+	for sender in (User, Profile):
+		name = sender.__name__
+		post_save.connect(
+			invalidate_user_cache_receiver, sender=sender,
+			dispatch_uid=f"auth_user_cache_save_{name}",
+		)
+		post_delete.connect(
+			invalidate_user_cache_receiver, sender=sender,
+			dispatch_uid=f"auth_user_cache_delete_{name}",
+		)
+
+
+def user_from_values(values):
+	"""RequestUser completo (con perfil) a partir de load_user_values()."""
+	from .models import RequestUser
+
+	row = [values["user"][name] for name in _USER_FIELDS]
+	user = RequestUser.from_db("default", _USER_FIELDS, row)
+	user._state.fields_cache["profile"] = RequestUser._profile_from(values)
+	return user
+
+
+def set_user_claims(token, user):
+	"""Copia en el token los datos del usuario (y de su perfil) que usa get_user()."""
+	from .models import Profile
+
+	for claim in USER_CLAIMS:
+		token[claim] = getattr(user, claim)
+	try:
+		profile = user.profile
+	except Profile.DoesNotExist:
+		profile = None
+	for claim, field in PROFILE_CLAIMS.items():
+		token[claim] = getattr(profile, field) if profile else None
+	token[CLAIMS_AT] = time.time()
+
+
+def user_from_claims(user_id, token):
+	"""
+	RequestUser con sólo los campos presentes en el token; el resto queda diferido.
+	El perfil se construye desde los claims de perfil. Sólo se llama cuando la
+	caché de revocación confirma que la cuenta no ha cambiado desde que se
+	emitieron los claims (y al emitirlos estaba activa).
+	"""
+	from .models import Profile, RequestUser
+
+	known = {
+		"id": user_id,
+		"username": token["username"],
+		"is_staff": token["is_staff"],
+		"is_superuser": token["is_superuser"],
+		"is_active": True,
+	}
+	names = [name for name in _USER_FIELDS if name in known]
+	user = RequestUser.from_db("default", names, [known[name] for name in names])
+	if all(claim in token for claim in PROFILE_CLAIMS):
+		profile = None
+		if token["profile_id"] is not None:
+			fields = ["user_id", *PROFILE_CLAIMS.values()]
+			row = [user_id, *(token[claim] for claim in PROFILE_CLAIMS)]
+			profile = Profile.from_db("default", fields, row)
+		user._state.fields_cache["profile"] = profile
+	return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+	"""JWTAuthentication que obtiene el usuario de los claims en lugar de la base de datos."""
+
+	def get_user(self, validated_token):
+		try:
+			# simplejwt guarda el id como texto; la caché usa el mismo tipo que la pk
+			user_id = User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+		except KeyError:
+			raise InvalidToken(_("Token contained no recognizable user identification"))
+
+		changed_at = _changed_at(user_id)
+		if all(claim in validated_token for claim in USER_CLAIMS):
+			if changed_at is None or validated_token.get(CLAIMS_AT, 0) > changed_at:
+				return user_from_claims(user_id, validated_token)
+
+		# Token antiguo, claims desactualizados o sin caché de revocación: leer el usuario
+		values = load_user_values(user_id, changed_at)
+		if values is None:
+			raise AuthenticationFailed(_("User not found"), code="user_not_found")
+		if api_settings.CHECK_USER_IS_ACTIVE and not values["user"]["is_active"]:
+			raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+		return user_from_values(values)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+	"""Login: añade al token los claims que usa ClaimsJWTAuthentication."""
+
+	@classmethod
+	def get_token(cls, user):
+		token = super().get_token(user)
+		set_user_claims(token, user)
+		return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+	"""
+	Refresh: vuelve a leer el usuario con su perfil (una consulta) y renueva los
+	claims, así el access token nuevo refleja los cambios de rol o de cuenta.
+	"""
+
+	def validate(self, attrs):
+		refresh = self.token_class(attrs["refresh"])
+
+		user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+		if user_id:
+			user = (
+				User.objects.select_related("profile")
+				.filter(**{api_settings.USER_ID_FIELD: user_id})
+				.first()
+			)
+			if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+				raise AuthenticationFailed(
+					self.error_messages["no_active_account"],
+					"no_active_account",
+				)
+			set_user_claims(refresh, user)
+
+		data = {"access": str(refresh.access_token)}
+
+		if api_settings.ROTATE_REFRESH_TOKENS:
+			if api_settings.BLACKLIST_AFTER_ROTATION:
+				try:
+					refresh.blacklist()
+				except AttributeError:
+					# Sin la app de blacklist instalada
+					pass
+
+			refresh.set_jti()
+			refresh.set_exp()
+			refresh.set_iat()
+			refresh.outstand()
+
+			data["refresh"] = str(refresh)
+
+		return data
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+	"""Documenta ClaimsJWTAuthentication en el esquema OpenAPI igual que JWTAuthentication."""
+
+	target_class = "api.authentication.ClaimsJWTAuthentication"
+
+
+@checks.register(checks.Tags.security, deploy=True)
+def check_revocation_cache(app_configs, **kwargs):
+	"""Fuera de DEBUG la caché de revocación tiene que ser compartida entre procesos."""
+	backend = settings.CACHES.get(REVOCATION_CACHE, {}).get("BACKEND", "")
+	if settings.DEBUG or not backend.endswith("LocMemCache"):
+		return []
+	return [checks.Warning(
+		f'La caché "{REVOCATION_CACHE}" es local al proceso: con varios workers un usuario '
+		"desactivado o sin permisos seguiría autenticándose con sus claims hasta que "
+		"caduque el token.",
+		hint="Usa Redis (USE_REDIS=true) o ejecuta un único proceso.",
+		id="api.W001",
+	)]
@@ -0,0 +1,183 @@
+"""
+Ejecución de varias operaciones de la API en una sola petición (POST batch/).
+
+Cada operación se resuelve con las URLs de la app y se despacha a la vista
+DRF correspondiente dentro del mismo proceso, reutilizando el usuario ya
+autenticado en la petición principal (no se vuelve a validar el JWT por
+operación). Una operación puede usar el resultado de otra anterior con
+referencias {{n.campo}} en la ruta o en los valores de texto del cuerpo, por
+ejemplo "lists/{{0.list}}/cards/".
+
+Sólo se aceptan rutas bajo /api/ que lleguen a vistas de DRF (APIView): el
+resto del sitio (admin, /metrics) no es alcanzable desde un lote. Los
+permisos de cada vista se comprueban como en una petición normal; no se
+comparte entre operaciones la resolución de membresía a tableros porque una
+operación anterior del mismo lote puede haberla cambiado.
+"""
+import io
+import json
+import logging
+import posixpath
+import re
+from urllib.parse import urlsplit
+
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_OPERATIONS = 20
+BATCH_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+API_PREFIX = "/api/"
+
+_REFERENCE = re.compile(r"\{\{\s*(\d+)((?:\.[\w-]+)*)\s*\}\}")
+
+# Cabeceras de la petición principal que se copian a cada operación
+_INHERITED_META = (
+	"HTTP_ACCEPT_LANGUAGE",
+	"HTTP_USER_AGENT",
+	"REMOTE_ADDR",
+	"SERVER_NAME",
+	"SERVER_PORT",
+	"HTTP_HOST",
+	"wsgi.url_scheme",
+)
+
+
+class BatchError(Exception):
+	"""Operación mal formada o referencia a un resultado que no existe."""
+
+
+class _Rollback(Exception):
+	pass
+
+
+def _lookup(results, index, path):
+	if index >= len(results):
+		raise BatchError(f"La referencia {{{{{index}...}}}} apunta a una operación posterior")
+	value = results[index]["body"]
+	for key in filter(None, path.split(".")):
+		if isinstance(value, list) and key.isdigit() and int(key) < len(value):
+			value = value[int(key)]
+		elif isinstance(value, dict) and key in value:
+			value = value[key]
+		else:
+			raise BatchError(f"La operación {index} no tiene el campo '{path.lstrip('.')}'")
+	return value
+
+
+def _substitute(value, results):
+	if isinstance(value, str):
+		match = _REFERENCE.fullmatch(value.strip())
+		if match:
+			# Referencia completa: conserva el tipo (número, lista...)
+			return _lookup(results, int(match.group(1)), match.group(2))
+		return _REFERENCE.sub(lambda m: str(_lookup(results, int(m.group(1)), m.group(2))), value)
+	if isinstance(value, list):
+		return [_substitute(item, results) for item in value]
+	if isinstance(value, dict):
+		return {key: _substitute(item, results) for key, item in value.items()}
+	return value
+
+
+def _api_path(path):
+	"""Ruta absoluta normalizada bajo API_PREFIX; BatchError si sale de ella."""
+	url = urlsplit(path)
+	if url.scheme or url.netloc:
+		raise BatchError(f"La ruta debe ser relativa a {API_PREFIX}: {path}")
+	path_info = url.path if url.path.startswith("/") else API_PREFIX + url.path
+	normalized = posixpath.normpath(path_info)
+	if path_info.endswith("/"):
+		normalized += "/"
+	if not normalized.startswith(API_PREFIX):
+		raise BatchError(f"Sólo se permiten rutas bajo {API_PREFIX}: {path}")
+	return normalized, url.query
+
+
+def _build_request(parent, method, path, body):
+	path_info, query = _api_path(path)
+	payload = json.dumps(body).encode() if body is not None else b""
+
+	sub = HttpRequest()
+	sub.method = method
+	sub.path = sub.path_info = path_info
+	sub.META = {key: parent.META[key] for key in _INHERITED_META if key in parent.META}
+	sub.META.update({
+		"REQUEST_METHOD": method,
+		"PATH_INFO": path_info,
+		"QUERY_STRING": query,
+		"CONTENT_TYPE": "application/json",
+		"CONTENT_LENGTH": str(len(payload)),
+		"HTTP_ACCEPT": "application/json",
+	})
+	sub.GET = QueryDict(query)
+	sub._stream = io.BytesIO(payload)
+	sub._read_started = False
+	# Misma autenticación que la petición principal (ForcedAuthentication de DRF)
+	sub._force_auth_user = parent.user
+	sub._force_auth_token = parent.auth
+	return sub
+
+
+def _dispatch(parent, operation, results):
+	if not isinstance(operation, dict):
+		raise BatchError("Cada operación debe ser un objeto")
+	method = str(operation.get("method", "GET")).upper()
+	if method not in BATCH_METHODS:
+		raise BatchError(f"Método no soportado: {method}")
+	path = _substitute(str(operation.get("path") or ""), results)
+	body = _substitute(operation.get("body"), results)
+	sub = _build_request(parent, method, path, body)
+	try:
+		match = resolve(sub.path_info)
+	except Resolver404:
+		return {"status": 404, "body": {"detail": f"No existe la ruta {sub.path_info}"}}
+	view_class = getattr(match.func, "cls", None)
+	if not (isinstance(view_class, type) and issubclass(view_class, APIView)):
+		raise BatchError(f"La ruta {sub.path_info} no es un endpoint de la API")
+	if match.url_name == "batch":
+		raise BatchError("No se pueden anidar peticiones batch")
+
+	try:
+		response = match.func(sub, *match.args, **match.kwargs)
+	except Exception:
+		# Las vistas DRF ya convierten sus excepciones en respuestas: esto es un error real
+		logger.exception("Error en la operación batch %s %s", method, sub.path_info)
+		return {"status": 500, "body": {"detail": "Error interno del servidor"}}
+	if hasattr(response, "data"):
+		content = response.data
+	else:
+		raw = b"".join(response) if response.streaming else response.content
+		content = raw.decode(response.charset or "utf-8", errors="replace")
+	return {"status": response.status_code, "body": content}
+
+
+def run_batch(request, operations, atomic=False):
+	"""
+	Ejecuta las operaciones en orden y devuelve una lista de {status, body}.
+	Con atomic=True todo se hace en una transacción: la primera operación con
+	estado >= 400 detiene el lote y deshace las anteriores.
+	"""
+	if not isinstance(operations, list) or not operations:
+		raise BatchError("'operations' debe ser una lista no vacía")
+	if len(operations) > BATCH_MAX_OPERATIONS:
+		raise BatchError(f"Máximo {BATCH_MAX_OPERATIONS} operaciones por lote")
+
+	results = []
+	if not atomic:
+		for operation in operations:
+			results.append(_dispatch(request, operation, results))
+		return results
+
+	try:
+		with transaction.atomic():
+			for operation in operations:
+				result = _dispatch(request, operation, results)
+				results.append(result)
+				if result["status"] >= 400:
+					raise _Rollback()
+	except _Rollback:
+		pass
+	return results
@@ -0,0 +1,114 @@
+"""
+Copia profunda de tableros (boards/{id}/clone/) y plantillas.
+
+Se copian listas, etiquetas, tarjetas, asignación de etiquetas a tarjetas y
+elementos de checklist con un bulk_create por tabla; los ids nuevos se
+obtienen del propio bulk_create y se usan para remapear las claves foráneas
+de la tabla siguiente. No se copian miembros, responsables, comentarios ni
+actividad: el tablero nuevo empieza sólo con su propietario y con los
+elementos de checklist sin marcar.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Board, Card, ChecklistItem, Label, List
+
+
+def clone_board(source, owner, name=None, due_date=None, shift_due_dates=False, is_template=False):
+	"""
+	Crea una copia de ``source`` para ``owner`` y la devuelve.
+	Sin ``due_date`` la copia conserva la fecha límite del original y las
+	tarjetas sus fechas y prioridades. Con ``due_date`` y shift_due_dates (y
+	fecha en el original), las fechas de las tarjetas se desplazan lo mismo que
+	la del tablero y su prioridad se recalcula. Ninguna tarjeta queda con fecha
+	posterior a la del tablero nuevo.
+	"""
+	from .views import calculate_auto_priority
+
+	delta = None
+	if shift_due_dates and due_date and source.due_date:
+		delta = due_date - source.due_date
+	board_due_date = due_date or source.due_date
+
+	with transaction.atomic():
+		board = Board.objects.create(
+			name=name or source.name,
+			owner=owner,
+			color=source.color,
+			due_date=board_due_date,
+			is_template=is_template,
+		)
+		board.members.add(owner)
+
+		source_lists = list(List.objects.filter(board=source).order_by("rank", "id"))
+		new_lists = List.objects.bulk_create([
+			List(board=board, title=lst.title, position=lst.position, rank=lst.rank)
+			for lst in source_lists
+		])
+		list_ids = {old.id: new.id for old, new in zip(source_lists, new_lists)}
+
+		source_labels = list(Label.objects.filter(board=source).order_by("id"))
+		new_labels = Label.objects.bulk_create([
+			Label(board=board, name=label.name, color=label.color)
+			for label in source_labels
+		])
+		label_ids = {old.id: new.id for old, new in zip(source_labels, new_labels)}
+
+		source_cards = list(
+			Card.objects.filter(list__board=source).order_by("id").values(
+				"id", "list_id", "title", "description", "due_date", "priority", "position", "rank",
+			)
+		)
+		now = timezone.now()
+		cards = []
+		for row in source_cards:
+			card_due_date = row["due_date"]
+			priority = row["priority"]
+			if card_due_date:
+				if delta is not None:
+					card_due_date = card_due_date + delta
+				if board_due_date and card_due_date > board_due_date:
+					card_due_date = board_due_date
+				if due_date:
+					priority = calculate_auto_priority(card_due_date, due_date)
+			cards.append(Card(
+				list_id=list_ids[row["list_id"]],
+				title=row["title"],
+				description=row["description"],
+				due_date=card_due_date,
+				priority=priority,
+				position=row["position"],
+				rank=row["rank"],
+				created_by=owner,
+				updated_at=now,
+			))
+		Card.objects.bulk_create(cards, batch_size=500)
+		card_ids = {row["id"]: card.id for row, card in zip(source_cards, cards)}
+
+		label_links = (
+			Label.cards.through.objects.filter(label__board=source)
+			.order_by("id")
+			.values_list("label_id", "card_id")
+		)
+		Label.cards.through.objects.bulk_create(
+			[
+				Label.cards.through(label_id=label_ids[label_id], card_id=card_ids[card_id])
+				for label_id, card_id in label_links
+				if card_id in card_ids
+			],
+			batch_size=500,
+		)
+
+		items = (
+			ChecklistItem.objects.filter(card__list__board=source)
+			.order_by("id")
+			.values_list("card_id", "text", "position")
+		)
+		ChecklistItem.objects.bulk_create(
+			[
+				ChecklistItem(card_id=card_ids[card_id], text=text, done=False, position=position)
+				for card_id, text, position in items
+			],
+			batch_size=500,
+		)
+	return board
@@ -0,0 +1,130 @@
+"""
+Soporte para el feed .ics suscribible (calendar/feed/<token>.ics).
+
+El token es un valor firmado con SECRET_KEY y con el secreto de calendario
+del usuario (Profile.calendar_secret) que identifica al usuario y,
+opcionalmente, a un tablero; así los clientes de calendario pueden consultar
+el feed sin enviar el JWT. Cambiar el secreto invalida todas las URLs
+anteriores del usuario.
+
+El contenido renderizado se cachea y la clave de caché incluye una huella de
+las tarjetas en el alcance del feed más Board.feed_version, que se incrementa
+cuando cambian datos que aparecen en los eventos pero no modifican
+Card.updated_at (nombre del tablero, título de la lista, responsables y sus
+usernames). Al estar en la base de datos la comparten todos los procesos.
+"""
+import secrets
+
+from django.core import signing
+from django.db.models import F
+
+FEED_TOKEN_SALT = "api.calendar_feed"
+FEED_CACHE_TTL = 60 * 60 * 24  # segundos
+
+
+def _signer(secret):
+	# Sin secreto (nunca se ha regenerado) la sal es la de siempre: los tokens
+	# ya emitidos siguen valiendo
+	return signing.Signer(salt=f"{FEED_TOKEN_SALT}{secret}")
+
+
+def make_feed_token(user, board_id=None):
+	from .models import Profile
+
+	profiles = Profile.objects.filter(user_id=user.id)
+	secret = profiles.values_list("calendar_secret", flat=True).first()
+	return _signer(secret or "").sign(f"{user.id}.{board_id or 0}")
+
+
+def read_feed_token(token):
+	"""
+	Devuelve (usuario activo, board_id|None). Lanza signing.BadSignature si el
+	token no es válido o su secreto se ha regenerado.
+	"""
+	from django.contrib.auth.models import User
+
+	from .models import Profile
+
+	value = token.rpartition(":")[0]
+	user_id, board_id = value.split(".")
+	user = User.objects.select_related("profile").filter(id=int(user_id), is_active=True).first()
+	if user is None:
+		raise signing.BadSignature("Usuario no encontrado")
+	try:
+		secret = user.profile.calendar_secret
+	except Profile.DoesNotExist:
+		secret = ""
+	_signer(secret).unsign(token)
+	return user, int(board_id) or None
+
+
+def rotate_feed_secret(user):
+	"""Nuevo secreto de calendario: las URLs de feed anteriores dejan de funcionar."""
+	from .models import Profile
+
+	profile, _ = Profile.objects.get_or_create(user=user)
+	profile.calendar_secret = secrets.token_hex(16)
+	profile.save(update_fields=["calendar_secret"])
+
+
+def event_uid(card_id):
+	# UID estable: el mismo evento conserva su identidad entre descargas
+	return f"card-{card_id}@kanban-academico"
+
+
+def bump_feed_version(board_ids):
+	from .models import Board
+
+	Board.objects.filter(id__in=board_ids).update(feed_version=F("feed_version") + 1)
+
+
+def _board_saved(sender, instance, created, **kwargs):
+	if not created:
+		bump_feed_version([instance.id])
+
+
+def _list_saved(sender, instance, **kwargs):
+	bump_feed_version([instance.board_id])
+
+
+def _assignees_changed(sender, instance, action, reverse, pk_set, **kwargs):
+	from .models import Board, List
+
+	if not action.startswith("post_"):
+		return
+	if not reverse:
+		bump_feed_version(List.objects.filter(id=instance.list_id).values("board_id"))
+	else:
+		bump_feed_version(Board.objects.filter(lists__cards__id__in=pk_set or ()).values("id"))
+
+
+def _members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+	if not action.startswith("post_"):
+		return
+	bump_feed_version(pk_set or () if reverse else [instance.id])
+
+
+def _user_saved(sender, instance, created, update_fields=None, **kwargs):
+	from .models import Board
+
+	# El login sólo guarda last_login: no hace falta invalidar nada
+	if created or (update_fields is not None and "username" not in update_fields):
+		return
+	bump_feed_version(Board.objects.filter(lists__cards__assignees=instance).values("id"))
+
+
+def connect_signals():
+	from django.contrib.auth.models import User
+	from django.db.models.signals import m2m_changed, post_save
+
+	from .models import Board, Card, List
+
+	post_save.connect(_board_saved, sender=Board, dispatch_uid="calendar_feed_board")
+	post_save.connect(_list_saved, sender=List, dispatch_uid="calendar_feed_list")
+	post_save.connect(_user_saved, sender=User, dispatch_uid="calendar_feed_user")
+	m2m_changed.connect(
+		_assignees_changed, sender=Card.assignees.through, dispatch_uid="calendar_feed_assignees"
+	)
+	m2m_changed.connect(
+		_members_changed, sender=Board.members.through, dispatch_uid="calendar_feed_members"
+	)
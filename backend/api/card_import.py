@@ -0,0 +1,244 @@
+"""
+Importación masiva de tarjetas (boards/{id}/import/).
+
+Las filas llegan como JSON ({"cards": [...]}) o como archivo CSV/JSON subido en
+el campo "file". Cada fila tiene: list, title, description, due_date,
+priority, assignees y labels. En CSV, assignees y labels se separan con ";".
+
+Todas las filas se validan antes de escribir nada; si alguna es inválida no
+se importa ninguna y se devuelve el detalle de errores por fila. La
+inserción usa un bulk_create por tabla (listas y etiquetas nuevas, tarjetas
+y tablas intermedias de responsables y etiquetas).
+"""
+import csv
+import io
+import json
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Card, Label, List
+from .ranking import key_between
+
+IMPORT_MAX_ROWS = 1000
+
+
+class CardImportError(Exception):
+	"""Error de formato del archivo o del cuerpo (no de una fila concreta)."""
+
+
+def _split(value):
+	if value is None:
+		return []
+	if isinstance(value, (list, tuple)):
+		return [str(item).strip() for item in value if str(item).strip()]
+	return [item.strip() for item in str(value).split(";") if item.strip()]
+
+
+def read_rows(request):
+	"""Extrae las filas de la petición como lista de diccionarios."""
+	upload = request.FILES.get("file")
+	if upload is not None:
+		raw = upload.read()
+		try:
+			text = raw.decode("utf-8-sig")
+		except UnicodeDecodeError:
+			raise CardImportError("El archivo debe estar codificado en UTF-8")
+		if upload.name.lower().endswith(".json") or text.lstrip().startswith(("[", "{")):
+			try:
+				data = json.loads(text)
+			except ValueError as e:
+				raise CardImportError(f"JSON inválido: {e}")
+			rows = data.get("cards") if isinstance(data, dict) else data
+		else:
+			reader = csv.DictReader(io.StringIO(text))
+			headers = [name.strip().lower() for name in reader.fieldnames or ()]
+			if "title" not in headers:
+				raise CardImportError("El CSV debe tener cabecera con al menos la columna 'title'")
+			rows = [
+				{(key or "").strip().lower(): value for key, value in row.items()}
+				for row in reader
+			]
+	else:
+		rows = request.data.get("cards")
+	if not isinstance(rows, list) or not rows:
+		raise CardImportError("No hay filas para importar")
+	if len(rows) > IMPORT_MAX_ROWS:
+		raise CardImportError(f"Máximo {IMPORT_MAX_ROWS} filas por importación")
+	if not all(isinstance(row, dict) for row in rows):
+		raise CardImportError("Cada fila debe ser un objeto")
+	return rows
+
+
+def import_cards(board, actor, rows):
+	"""
+	Valida e inserta las filas en el tablero.
+	Devuelve (cards, errors): si errors no está vacío no se ha escrito nada.
+	"""
+	from .views import calculate_auto_priority
+
+	# Resolver listas, etiquetas y usuarios del tablero con una consulta cada uno
+	lists_by_key = {}
+	for lst in List.objects.filter(board=board).order_by("rank", "id"):
+		lists_by_key.setdefault(str(lst.id), lst)
+		lists_by_key.setdefault(lst.title.strip().lower(), lst)
+	labels_by_name = {
+		label.name.strip().lower(): label for label in Label.objects.filter(board=board)
+	}
+
+	wanted_users = {name for row in rows for name in _split(row.get("assignees"))}
+	users_by_key = {}
+	if wanted_users:
+		member_ids = set(board.members.values_list("id", flat=True)) | {board.owner_id}
+		matches = (
+			User.objects.filter(id__in=member_ids)
+			.filter(Q(username__in=wanted_users) | Q(profile__id_number__in=wanted_users))
+			.values_list("id", "username", "profile__id_number")
+		)
+		for user_id, username, id_number in matches:
+			users_by_key[username] = user_id
+			if id_number:
+				users_by_key[id_number] = user_id
+
+	valid_priorities = set(Card.Priority.values)
+	parsed = []
+	errors = []
+	for index, row in enumerate(rows, start=1):
+		row_errors = {}
+		title = str(row.get("title") or "").strip()
+		if not title:
+			row_errors["title"] = "El título es obligatorio"
+		elif len(title) > 255:
+			row_errors["title"] = "Máximo 255 caracteres"
+
+		# Se recorta al tamaño de la columna para que la clave de búsqueda sea
+		# la misma que queda guardada (List.title: 200, Label.name: 50)
+		list_key = str(row.get("list") or "").strip()[:200].strip()
+		if not list_key:
+			row_errors["list"] = "La lista es obligatoria"
+
+		due_date = None
+		raw_due = str(row.get("due_date") or "").strip()
+		if raw_due:
+			try:
+				due_date = date.fromisoformat(raw_due)
+			except ValueError:
+				row_errors["due_date"] = "Formato de fecha inválido (AAAA-MM-DD)"
+			else:
+				if board.due_date and due_date > board.due_date:
+					row_errors["due_date"] = (
+						"La fecha límite de la tarjeta no puede ser posterior a la fecha "
+						f"límite del tablero ({board.due_date})"
+					)
+
+		priority = str(row.get("priority") or "").strip().lower()
+		if priority and priority not in valid_priorities:
+			choices = ", ".join(sorted(valid_priorities))
+			row_errors["priority"] = f"Prioridad inválida, usa: {choices}"
+
+		assignees = _split(row.get("assignees"))
+		unknown = [name for name in assignees if name not in users_by_key]
+		if unknown:
+			row_errors["assignees"] = f"No son miembros del tablero: {', '.join(unknown)}"
+
+		labels = {}
+		for name in _split(row.get("labels")):
+			name = name[:50].strip()
+			labels.setdefault(name.lower(), name)
+
+		if row_errors:
+			errors.append({"row": index, "errors": row_errors})
+			continue
+		parsed.append({
+			"list": list_key,
+			"title": title,
+			"description": str(row.get("description") or ""),
+			"due_date": due_date,
+			"priority": priority or calculate_auto_priority(due_date, board.due_date),
+			"assignees": list(dict.fromkeys(users_by_key[name] for name in assignees)),
+			"labels": list(labels.values()),
+		})
+	if errors:
+		return [], errors
+
+	with transaction.atomic():
+		# Listas nuevas (por título) al final del tablero
+		new_lists = []
+		last_rank = (
+			List.objects.filter(board=board)
+			.order_by("-rank", "-id")
+			.values_list("rank", flat=True)
+			.first()
+		)
+		position = List.objects.filter(board=board).count()
+		for item in parsed:
+			key = item["list"].lower()
+			if key not in lists_by_key:
+				last_rank = key_between(last_rank, None)
+				lst = List(board=board, title=item["list"], position=position, rank=last_rank)
+				position += 1
+				lists_by_key[key] = lst
+				new_lists.append(lst)
+		List.objects.bulk_create(new_lists)
+
+		# Etiquetas nuevas (por nombre)
+		new_labels = []
+		for item in parsed:
+			for name in item["labels"]:
+				if name.lower() not in labels_by_name:
+					label = Label(board=board, name=name)
+					labels_by_name[name.lower()] = label
+					new_labels.append(label)
+		Label.objects.bulk_create(new_labels)
+
+		# Tarjetas: se añaden al final de su lista conservando el orden del archivo
+		target_ids = {lists_by_key[item["list"].lower()].id for item in parsed}
+		tails = {}
+		counts = {}
+		existing = (
+			Card.objects.filter(list_id__in=target_ids)
+			.order_by("list_id", "rank", "id")
+			.values_list("list_id", "rank")
+		)
+		for list_id, rank in existing:
+			tails[list_id] = rank
+			counts[list_id] = counts.get(list_id, 0) + 1
+		now = timezone.now()
+		cards = []
+		for item in parsed:
+			lst = lists_by_key[item["list"].lower()]
+			tails[lst.id] = key_between(tails.get(lst.id), None)
+			cards.append(Card(
+				list=lst,
+				title=item["title"],
+				description=item["description"],
+				due_date=item["due_date"],
+				priority=item["priority"],
+				position=counts.get(lst.id, 0),
+				rank=tails[lst.id],
+				created_by=actor,
+				updated_at=now,
+			))
+			counts[lst.id] = counts.get(lst.id, 0) + 1
+		Card.objects.bulk_create(cards, batch_size=500)
+
+		Card.assignees.through.objects.bulk_create(
+			[
+				Card.assignees.through(card_id=card.id, user_id=user_id)
+				for card, item in zip(cards, parsed)
+				for user_id in item["assignees"]
+			],
+			batch_size=500,
+		)
+		Label.cards.through.objects.bulk_create(
+			[
+				Label.cards.through(label_id=labels_by_name[name.lower()].id, card_id=card.id)
+				for card, item in zip(cards, parsed)
+				for name in item["labels"]
+			],
+			batch_size=500,
+		)
+	return cards, []
@@ -7,6 +7,8 @@ from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from jwt import decode as jwt_decode
 from django.conf import settings
 
+from . import metrics
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
 	async def connect(self):
@@ -17,6 +19,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 			token = query_string.split('token=')[-1].split('&')[0]
 		
 		if not token:
+			metrics.websocket_rejected()
 			await self.close()
 			return
 		
@@ -27,6 +30,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 			user_id = decoded_data.get('user_id')
 			
 			if not user_id:
+				metrics.websocket_rejected()
 				await self.close()
 				return
 			
@@ -34,6 +38,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 			self.user = await self.get_user(user_id)
 			
 			if not self.user or not self.user.is_authenticated:
+				metrics.websocket_rejected()
 				await self.close()
 				return
 			
@@ -44,11 +49,17 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 				self.channel_name
 			)
 			await self.accept()
+			self.counted = True
+			metrics.websocket_connected()
 		except (InvalidToken, TokenError, Exception) as e:
 			print(f"Error de autenticación WebSocket: {e}")
+			metrics.websocket_rejected()
 			await self.close()
 
 	async def disconnect(self, close_code):
+		if getattr(self, 'counted', False):
+			self.counted = False
+			metrics.websocket_disconnected()
 		# Salir del grupo
 		if hasattr(self, 'group_name'):
 			await self.channel_layer.group_discard(
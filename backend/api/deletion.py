@@ -0,0 +1,230 @@
+"""
+Eliminación en segundo plano de tableros y cuentas de usuario.
+
+En lugar de borrar en la petición con el collector de CASCADE de Django (que
+carga en memoria todas las filas relacionadas y las borra en una única
+transacción larga), la vista marca el objeto como pendiente de eliminación
+(queda oculto al instante) y crea un DeletionJob. El trabajo se ejecuta tras
+el commit en un hilo en segundo plano y borra los hijos con DELETE directos
+por lotes de ids acotados, cada lote en su propia transacción. Al final se
+elimina la fila principal con el ORM, que ya no encuentra dependencias
+grandes.
+
+Los trabajos interrumpidos (p. ej. por un reinicio) se reanudan con
+``python manage.py purge_deleted``; cada paso es idempotente.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .authentication import invalidate_user_cache
+from .lookup import invalidate_user_lookup
+from .models import (
+	ActivityLog,
+	Board,
+	Card,
+	ChecklistItem,
+	Comment,
+	DeletionJob,
+	Label,
+	List,
+	Notification,
+	PushSubscription,
+)
+
+logger = logging.getLogger(__name__)
+
+DELETE_BATCH_SIZE = 1000
+# Un trabajo empezado hace más de esto se considera abandonado y se puede retomar
+STALE_JOB_AFTER = timedelta(minutes=15)
+
+_lock = threading.Lock()
+
+
+def _delete_where(model, column, values):
+	"""DELETE FROM <tabla> WHERE <columna> IN (...) sin pasar por el collector."""
+	if not values:
+		return 0
+	table = connection.ops.quote_name(model._meta.db_table)
+	column = connection.ops.quote_name(column)
+	placeholders = ", ".join(["%s"] * len(values))
+	with connection.cursor() as cursor:
+		cursor.execute(f"DELETE FROM {table} WHERE {column} IN ({placeholders})", list(values))
+		return cursor.rowcount
+
+
+def _next_ids(queryset, last_id):
+	ids = queryset.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)
+	return list(ids[:DELETE_BATCH_SIZE])
+
+
+def _purge_cards(queryset):
+	"""Borra por lotes de ids las tarjetas del queryset y todas sus filas dependientes."""
+	deleted = 0
+	last_id = 0
+	while True:
+		ids = _next_ids(queryset, last_id)
+		if not ids:
+			return deleted
+		with transaction.atomic():
+			deleted += _delete_where(Card.assignees.through, "card_id", ids)
+			deleted += _delete_where(Label.cards.through, "card_id", ids)
+			deleted += _delete_where(Comment, "card_id", ids)
+			deleted += _delete_where(ChecklistItem, "card_id", ids)
+			deleted += _delete_where(Card, "id", ids)
+		last_id = ids[-1]
+
+
+def _purge_rows(queryset):
+	"""Borra por lotes de ids las filas de un modelo sin dependencias."""
+	model = queryset.model
+	deleted = 0
+	last_id = 0
+	while True:
+		ids = _next_ids(queryset, last_id)
+		if not ids:
+			return deleted
+		with transaction.atomic():
+			deleted += _delete_where(model, "id", ids)
+		last_id = ids[-1]
+
+
+def purge_board(board_id):
+	"""Elimina el tablero y todo su contenido. Devuelve el número de filas borradas."""
+	deleted = _purge_cards(Card.objects.filter(list__board_id=board_id))
+	label_ids = list(Label.objects.filter(board_id=board_id).values_list("id", flat=True))
+	with transaction.atomic():
+		# Etiquetas del tablero asignadas a tarjetas de otros tableros
+		deleted += _delete_where(Label.cards.through, "label_id", label_ids)
+		deleted += _delete_where(Label, "id", label_ids)
+		deleted += _delete_where(List, "board_id", [board_id])
+	deleted += _purge_rows(ActivityLog.objects.filter(board_id=board_id))
+	deleted += _purge_rows(Notification.objects.filter(board_id=board_id))
+	with transaction.atomic():
+		deleted += _delete_where(Board.members.through, "board_id", [board_id])
+		deleted += Board.objects.filter(id=board_id).delete()[0]
+	return deleted
+
+
+def purge_user(user_id):
+	"""Elimina la cuenta y todos sus datos (los mismos que borraría CASCADE)."""
+	deleted = 0
+	for board_id in Board.objects.filter(owner_id=user_id).values_list("id", flat=True):
+		deleted += purge_board(board_id)
+	# Tarjetas creadas por el usuario en tableros de otros
+	deleted += _purge_cards(Card.objects.filter(created_by_id=user_id))
+	deleted += _purge_rows(Comment.objects.filter(author_id=user_id))
+	deleted += _purge_rows(ActivityLog.objects.filter(actor_id=user_id))
+	deleted += _purge_rows(Notification.objects.filter(recipient_id=user_id))
+	deleted += _purge_rows(PushSubscription.objects.filter(user_id=user_id))
+	with transaction.atomic():
+		deleted += _delete_where(Card.assignees.through, "user_id", [user_id])
+		deleted += _delete_where(Board.members.through, "user_id", [user_id])
+		# El resto (perfil, grupos, permisos...) es pequeño: lo borra el ORM
+		deleted += User.objects.filter(id=user_id).delete()[0]
+	return deleted
+
+
+def _unclaimed(stale):
+	return Q(started_at__isnull=True) | Q(started_at__lt=stale)
+
+
+def _claim(job):
+	"""Marca el trabajo como empezado si nadie más lo ha tomado. True si se obtuvo."""
+	now = timezone.now()
+	stale = now - STALE_JOB_AFTER
+	return bool(
+		DeletionJob.objects.filter(id=job.id, finished_at__isnull=True)
+		.filter(_unclaimed(stale))
+		.update(started_at=now)
+	)
+
+
+def run_job(job):
+	if not _claim(job):
+		return False
+	if job.kind == DeletionJob.Kind.BOARD:
+		deleted = purge_board(job.object_id)
+	else:
+		deleted = purge_user(job.object_id)
+	DeletionJob.objects.filter(id=job.id).update(finished_at=timezone.now(), deleted_rows=deleted)
+	logger.info("Eliminación %s %s completada (%s filas)", job.kind, job.object_id, deleted)
+	return True
+
+
+def _pending_jobs():
+	stale = timezone.now() - STALE_JOB_AFTER
+	return DeletionJob.objects.filter(finished_at__isnull=True).filter(_unclaimed(stale))
+
+
+def run_pending_jobs():
+	"""Ejecuta los trabajos pendientes (o abandonados). Devuelve cuántos se completaron."""
+	done = 0
+	while True:
+		# Se vuelve a consultar por si se han creado trabajos mientras tanto; uno que
+		# falla queda marcado como empezado y no se reintenta hasta que caduque
+		jobs = list(_pending_jobs())
+		if not jobs:
+			return done
+		for job in jobs:
+			try:
+				done += run_job(job)
+			except Exception:
+				logger.exception("Error en la eliminación %s %s", job.kind, job.object_id)
+
+
+def drain_queue():
+	"""
+	Procesa la cola si ningún otro hilo de este proceso lo está haciendo. Al
+	soltar el lock se vuelve a mirar: un trabajo confirmado mientras otro hilo
+	tenía el lock no ha podido lanzar el suyo y lo recoge este.
+	"""
+	while _lock.acquire(blocking=False):
+		try:
+			run_pending_jobs()
+		finally:
+			_lock.release()
+		if not _pending_jobs().exists():
+			return
+
+
+def schedule():
+	"""Lanza los trabajos pendientes en un hilo en segundo plano tras el commit."""
+
+	def run():
+		try:
+			drain_queue()
+		finally:
+			connection.close()
+
+	transaction.on_commit(lambda: threading.Thread(target=run, daemon=True).start())
+
+
+def request_board_deletion(board, requested_by):
+	"""Oculta el tablero y programa su eliminación."""
+	with transaction.atomic():
+		Board.objects.filter(id=board.id).update(pending_delete=True)
+		DeletionJob.objects.create(
+			kind=DeletionJob.Kind.BOARD, object_id=board.id, requested_by=requested_by
+		)
+		schedule()
+
+
+def request_user_deletion(user):
+	"""
+	Desactiva la cuenta (deja de poder autenticarse), oculta sus tableros y
+	programa la eliminación.
+	"""
+	with transaction.atomic():
+		User.objects.filter(id=user.id).update(is_active=False)
+		Board.objects.filter(owner_id=user.id).update(pending_delete=True)
+		DeletionJob.objects.create(kind=DeletionJob.Kind.USER, object_id=user.id, requested_by=user)
+		schedule()
+	# update() no emite señales: quitar la cuenta del typeahead y revocar sus claims explícitamente
+	invalidate_user_lookup()
+	invalidate_user_cache(user.id)
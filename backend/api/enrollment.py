@@ -0,0 +1,107 @@
+"""
+Matrícula masiva de miembros en un tablero (boards/{id}/enroll/).
+
+El cuerpo trae listas de cédulas y/o usernames:
+{"id_numbers": [...], "usernames": [...]}. También se aceptan como texto
+separado por comas, punto y coma o saltos de línea (lo que se pega desde
+una hoja de cálculo).
+
+Todos los identificadores se resuelven con una sola consulta IN, las filas
+de la tabla intermedia se insertan con un bulk_create y el resultado incluye
+un informe por identificador: los que no existen, los repetidos y los que ya
+eran miembros no impiden matricular al resto.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Board
+
+ENROLL_MAX_ROWS = 1000
+
+_SEPARATORS = re.compile(r"[,;\n\r\t]+")
+
+
+class EnrollmentError(Exception):
+	"""Cuerpo mal formado (no un identificador concreto)."""
+
+
+def _identifiers(value):
+	if value is None:
+		return []
+	if isinstance(value, str):
+		value = _SEPARATORS.split(value)
+	if not isinstance(value, list):
+		raise EnrollmentError("id_numbers y usernames deben ser listas o texto separado por comas")
+	return [str(item).strip() for item in value if str(item).strip()]
+
+
+def read_identifiers(data):
+	"""Devuelve [(campo, valor)] en el orden recibido."""
+	rows = [("id_number", value) for value in _identifiers(data.get("id_numbers"))]
+	rows += [("username", value) for value in _identifiers(data.get("usernames"))]
+	if not rows:
+		raise EnrollmentError("Debes proporcionar id_numbers o usernames")
+	if len(rows) > ENROLL_MAX_ROWS:
+		raise EnrollmentError(f"Máximo {ENROLL_MAX_ROWS} usuarios por matrícula")
+	return rows
+
+
+def enroll_members(board, rows):
+	"""
+	Matricula en el tablero a los usuarios de ``rows``.
+	Devuelve (added, errors): added es la lista de usuarios nuevos (dicts con
+	id, username, id_number y role) y errors el informe de filas no matriculadas.
+	"""
+	id_numbers = {value for field, value in rows if field == "id_number"}
+	usernames = {value for field, value in rows if field == "username"}
+	matches = (
+		User.objects.filter(is_active=True)
+		.filter(Q(profile__id_number__in=id_numbers) | Q(username__in=usernames))
+		.values("id", "username", "profile__id_number", "profile__role")
+	)
+	by_key = {}
+	for user in matches:
+		by_key[("username", user["username"])] = user
+		if user["profile__id_number"]:
+			by_key[("id_number", user["profile__id_number"])] = user
+
+	found = {user["id"] for user in by_key.values()}
+	current = set(
+		Board.members.through.objects.filter(board_id=board.id, user_id__in=found)
+		.values_list("user_id", flat=True)
+	)
+
+	added = []
+	errors = []
+	seen = set()
+	for index, (field, value) in enumerate(rows, start=1):
+		user = by_key.get((field, value))
+		if user is None:
+			error = "Usuario no encontrado"
+		elif user["id"] == board.owner_id:
+			error = "El propietario del tablero ya es miembro automáticamente"
+		elif user["id"] in seen:
+			error = "Repetido en la lista"
+		elif user["id"] in current:
+			error = "Ya es miembro del tablero"
+		else:
+			seen.add(user["id"])
+			added.append({
+				"id": user["id"],
+				"username": user["username"],
+				"id_number": user["profile__id_number"],
+				"role": user["profile__role"],
+			})
+			continue
+		errors.append({"row": index, field: value, "error": error})
+
+	with transaction.atomic():
+		Board.members.through.objects.bulk_create(
+			[Board.members.through(board_id=board.id, user_id=user["id"]) for user in added],
+			batch_size=500,
+			ignore_conflicts=True,
+		)
+	return added, errors
@@ -0,0 +1,145 @@
+"""
+Serialización rápida basada en proyecciones (.values()) para los listados más
+consultados. Produce exactamente la misma estructura JSON que CardSerializer,
+ListSerializer y CalendarEventSerializer, pero sin instanciar modelos ni pasar
+por los campos de DRF por objeto: las relaciones M2M (assignees, labels) se
+resuelven con una consulta por relación para todo el lote.
+
+Se activa con el setting API_FAST_SERIALIZERS (variable de entorno del mismo nombre).
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import Card, Label
+
+# Campos de DRF reutilizados sólo para formatear fechas igual que los serializers
+_date_field = serializers.DateField()
+_datetime_field = serializers.DateTimeField()
+
+
+def fast_serializers_enabled(request=None):
+	"""Activo por setting, salvo que la petición pida campos dispersos (?fields / ?expand)."""
+	if not getattr(settings, "API_FAST_SERIALIZERS", False):
+		return False
+	if request is not None and {"fields", "expand"} & request.query_params.keys():
+		return False
+	return True
+
+
+def _date(value):
+	return _date_field.to_representation(value) if value is not None else None
+
+
+def _datetime(value):
+	return _datetime_field.to_representation(value) if value is not None else None
+
+
+def _assignees_by_card(card_ids):
+	result = defaultdict(list)
+	rows = (
+		Card.assignees.through.objects.filter(card_id__in=card_ids)
+		.order_by("id")
+		.values_list("card_id", "user_id", "user__username")
+	)
+	for card_id, user_id, username in rows:
+		result[card_id].append({"id": user_id, "username": username})
+	return result
+
+
+def _labels_by_card(card_ids):
+	result = defaultdict(list)
+	rows = (
+		Label.cards.through.objects.filter(card_id__in=card_ids)
+		.order_by("id")
+		.values_list("card_id", "label_id", "label__board_id", "label__name", "label__color")
+	)
+	for card_id, label_id, board_id, name, color in rows:
+		result[card_id].append({"id": label_id, "board": board_id, "name": name, "color": color})
+	return result
+
+
+def serialize_cards(queryset):
+	"""Equivalente a CardSerializer(queryset, many=True).data."""
+	rows = list(
+		queryset.prefetch_related(None).values(
+			"id",
+			"list_id",
+			"title",
+			"description",
+			"due_date",
+			"priority",
+			"position",
+			"rank",
+			"created_by_id",
+			"created_by__username",
+			"created_at",
+		)
+	)
+	card_ids = [row["id"] for row in rows]
+	assignees = _assignees_by_card(card_ids) if card_ids else {}
+	labels = _labels_by_card(card_ids) if card_ids else {}
+	return [
+		{
+			"id": row["id"],
+			"list": row["list_id"],
+			"title": row["title"],
+			"description": row["description"],
+			"due_date": _date(row["due_date"]),
+			"priority": row["priority"],
+			"position": row["position"],
+			"rank": row["rank"],
+			"created_by": {"id": row["created_by_id"], "username": row["created_by__username"]},
+			"assignees": assignees.get(row["id"], []),
+			"labels": labels.get(row["id"], []),
+			"created_at": _datetime(row["created_at"]),
+		}
+		for row in rows
+	]
+
+
+def serialize_lists(queryset):
+	"""Equivalente a ListSerializer(queryset, many=True).data."""
+	return [
+		{
+			"id": row["id"],
+			"board": row["board_id"],
+			"title": row["title"],
+			"position": row["position"],
+			"rank": row["rank"],
+		}
+		for row in queryset.values("id", "board_id", "title", "position", "rank")
+	]
+
+
+def serialize_calendar_events(queryset):
+	"""Equivalente a CalendarEventSerializer(queryset, many=True).data."""
+	rows = list(
+		queryset.prefetch_related(None).values(
+			"id",
+			"title",
+			"description",
+			"due_date",
+			"priority",
+			"list__board_id",
+			"list__board__name",
+			"list__title",
+		)
+	)
+	card_ids = [row["id"] for row in rows]
+	assignees = _assignees_by_card(card_ids) if card_ids else {}
+	return [
+		{
+			"id": row["id"],
+			"title": row["title"],
+			"description": row["description"],
+			"due_date": _date(row["due_date"]),
+			"priority": row["priority"],
+			"board_id": row["list__board_id"],
+			"board_name": row["list__board__name"],
+			"list_name": row["list__title"],
+			"assignees": assignees.get(row["id"], []),
+		}
+		for row in rows
+	]
@@ -0,0 +1,192 @@
+"""
+Búsqueda por prefijo (typeahead) de usuarios por username, o por id_number
+completo.
+
+El id_number completo encuentra a cualquier usuario activo (es como se
+invita a alguien a un tablero), pero nunca se devuelve: sólo sirve para
+encontrar a alguien cuyo número ya se conoce, no para enumerarlo dígito a
+dígito. La búsqueda por prefijo de username se limita según el rol de quien
+busca (LOOKUP_VISIBLE_ROLES): los docentes encuentran a estudiantes y
+docentes, los estudiantes sólo a docentes y el staff a todos. Como el
+resultado depende sólo del rol, se cachea por rol.
+
+En PostgreSQL la búsqueda se resuelve en la base de datos usando los índices
+de patrón (``*_like`` que Django crea para campos únicos y el índice sobre
+``UPPER(username)`` de la migración 0009). En SQLite, donde ``LIKE`` no puede
+usar índices, se mantiene en memoria una lista ordenada de claves y se
+resuelven los prefijos con búsqueda binaria.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Profile
+
+LOOKUP_DEFAULT_LIMIT = 10
+LOOKUP_MAX_LIMIT = 25
+LOOKUP_CACHE_TTL = 30  # segundos
+# Con caché local por proceso la invalidación no llega a otros workers,
+# así que el índice en memoria se reconstruye igualmente pasado este tiempo.
+LOOKUP_INDEX_MAX_AGE = 300  # segundos
+ID_NUMBER_LENGTH = 10
+# Rol de quien busca -> roles que encuentra por prefijo de username
+LOOKUP_VISIBLE_ROLES = {
+	Profile.Role.TEACHER: (Profile.Role.STUDENT, Profile.Role.TEACHER),
+	Profile.Role.STUDENT: (Profile.Role.TEACHER,),
+}
+
+_VERSION_KEY = "users_lookup_version"
+
+
+def _index_version():
+	return cache.get_or_set(_VERSION_KEY, 1, None)
+
+
+def invalidate_user_lookup(update_fields=None, **kwargs):
+	"""Receptor de señales: descarta el índice en memoria y los resultados cacheados."""
+	if update_fields and set(update_fields) <= {"last_login", "password"}:
+		return
+	try:
+		cache.incr(_VERSION_KEY)
+	except ValueError:
+		cache.set(_VERSION_KEY, 2, None)
+	_memory_index.clear()
+
+
+class _PrefixIndex:
+	"""Claves ordenadas (clave, user_id) para resolver prefijos con bisect."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._version = None
+		self._built_at = 0.0
+		self._usernames = []
+		self._id_numbers = {}
+		self._rows = {}
+
+	def clear(self):
+		with self._lock:
+			self._version = None
+
+	def _fresh(self, version):
+		return self._version == version and time.monotonic() - self._built_at < LOOKUP_INDEX_MAX_AGE
+
+	def _ensure(self):
+		version = _index_version()
+		if self._fresh(version):
+			return
+		with self._lock:
+			if self._fresh(version):
+				return
+			rows = {}
+			usernames = []
+			id_numbers = {}
+			users = User.objects.filter(is_active=True).values_list(
+				"id", "username", "profile__id_number", "profile__role"
+			)
+			for user_id, username, id_number, role in users:
+				rows[user_id] = {"id": user_id, "username": username, "role": role}
+				usernames.append((username.lower(), user_id))
+				if id_number:
+					id_numbers[id_number] = user_id
+			usernames.sort()
+			self._rows, self._usernames, self._id_numbers = rows, usernames, id_numbers
+			self._version = version
+			self._built_at = time.monotonic()
+
+	def _scan(self, prefix, limit, roles):
+		keys = self._usernames
+		found = []
+		i = bisect_left(keys, (prefix,))
+		while i < len(keys) and len(found) < limit and keys[i][0].startswith(prefix):
+			if roles is None or self._rows[keys[i][1]]["role"] in roles:
+				found.append(keys[i][1])
+			i += 1
+		return found
+
+	def search(self, q, limit, roles=None):
+		self._ensure()
+		ids = []
+		user_id = self._id_numbers.get(q) if _is_id_number(q) else None
+		if user_id is not None:
+			ids.append(user_id)
+		for user_id in self._scan(q.lower(), limit, roles):
+			if user_id not in ids:
+				ids.append(user_id)
+		return [self._rows[user_id] for user_id in ids[:limit]]
+
+
+_memory_index = _PrefixIndex()
+
+
+def _is_id_number(q):
+	return len(q) == ID_NUMBER_LENGTH and q.isdigit()
+
+
+def _search_database(q, limit, roles=None):
+	fields = ("id", "username", "profile__role")
+	users = User.objects.filter(is_active=True)
+	rows = []
+	if _is_id_number(q):
+		rows.extend(users.filter(profile__id_number=q).values_list(*fields))
+	seen = {row[0] for row in rows}
+	if len(rows) < limit:
+		by_username = users.filter(username__istartswith=q).order_by("username")
+		if roles is not None:
+			by_username = by_username.filter(profile__role__in=roles)
+		for row in by_username.values_list(*fields)[:limit]:
+			if row[0] not in seen:
+				rows.append(row)
+	return [
+		{"id": user_id, "username": username, "role": role}
+		for user_id, username, role in rows[:limit]
+	]
+
+
+def visible_roles(user):
+	"""Roles que ``user`` encuentra por prefijo de username; None si ve a todos."""
+	if user is None or user.is_staff:
+		return None
+	role = getattr(getattr(user, "profile", None), "role", None)
+	return LOOKUP_VISIBLE_ROLES.get(role, ())
+
+
+def lookup_users(q, limit=LOOKUP_DEFAULT_LIMIT, user=None):
+	"""
+	Devuelve hasta ``limit`` usuarios cuyo username (sin distinguir mayúsculas)
+	comienza por ``q`` o cuyo id_number es exactamente ``q`` (ese va primero).
+	Con ``user`` (que no sea staff) el prefijo sólo encuentra los roles de
+	LOOKUP_VISIBLE_ROLES para su rol.
+	"""
+	q = q.strip()
+	if not q:
+		return []
+	limit = max(1, min(int(limit), LOOKUP_MAX_LIMIT))
+	roles = visible_roles(user)
+	scope = "all" if roles is None else ",".join(roles) or "none"
+	cache_key = f"users_lookup:{_index_version()}:{scope}:{limit}:{q.lower()}"
+	results = cache.get(cache_key)
+	if results is None:
+		if connection.vendor == "postgresql":
+			results = _search_database(q, limit, roles)
+		else:
+			results = _memory_index.search(q, limit, roles)
+		cache.set(cache_key, results, LOOKUP_CACHE_TTL)
+	return results
+
+
+def connect_signals():
+	from django.db.models.signals import post_delete, post_save
+
+	for model in (User, Profile):
+		name = model.__name__
+		post_save.connect(
+			invalidate_user_lookup, sender=model, dispatch_uid=f"users_lookup_save_{name}"
+		)
+		post_delete.connect(
+			invalidate_user_lookup, sender=model, dispatch_uid=f"users_lookup_delete_{name}"
+		)
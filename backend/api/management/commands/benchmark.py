@@ -0,0 +1,410 @@
+"""
+Comando de Django para medir los endpoints más usados contra datos generados.
+Uso: python manage.py benchmark [--sizes small,medium] [--iterations 20] [--update-budgets]
+
+Por cada tamaño crea una base de datos de pruebas temporal, la llena con
+generar_datos y mide con peticiones reales (JWT incluido) la latencia
+p50/p95 y el número de consultas SQL de cada escenario:
+
+  board_open       GET del tablero, sus listas y las tarjetas de cada lista
+                   (lo que hace BoardView)
+  list_cards       GET lists/{id}/cards/
+  card_patch       PATCH cards/{id}/ cambiando el título
+  card_move        PATCH cards/{id}/ moviendo la tarjeta a otra lista
+  cards_search     GET cards/search/?q=...
+  calendar         GET calendar/ (rango de 6 semanas)
+  calendar_export  GET calendar/export/
+  card_fanout      POST lists/{id}/cards/ (notifica a todos los estudiantes del tablero)
+  notifications    GET notifications/?unread=true como estudiante
+  list_cards_1k    GET lists/{id}/cards/ de una lista con 1.000 tarjetas
+  list_cards_10k   GET lists/{id}/cards/ de una lista con 10.000 tarjetas
+
+Las listas de list_cards_1k y list_cards_10k se crean, sin fecha límite, en
+un tablero aparte del mismo docente para medir cuánto cuesta serializar
+muchas filas; con --existing no se crean y esos escenarios no se miden.
+
+Todos se miden con API_FAST_SERIALIZERS desactivado, sea cual sea el entorno.
+Los escenarios que pasan por api.fast_serializers (board_open, list_cards,
+cards_search, calendar y las listas grandes) se repiten además con el setting
+activado, con el sufijo _fast, y al final se muestra la comparación entre
+ambos (serializers de DRF frente a .values()).
+
+Las respuestas en streaming (calendar_export) se leen enteras dentro de la
+medición: la vista sólo prepara el generador y las consultas y el trabajo
+ocurren al consumirlo.
+
+Los resultados se comparan con los presupuestos de benchmark_budgets.json;
+si algún escenario supera su número de consultas o su p95 el comando
+termina con error. --update-budgets guarda los p95 medidos con un margen
+de LATENCY_MARGIN; --latency-tolerance lo amplía al comparar en máquinas
+más lentas. Con --queries-only (así lo usa la CI) sólo el número de
+consultas hace fallar el comando: el p95 de una máquina compartida varía
+demasiado entre ejecuciones, así que los excesos de latencia sólo se
+muestran como aviso. Con --existing se mide la base de datos actual sin
+generar nada (p. ej. un millón de tarjetas en Postgres).
+"""
+
+import contextlib
+import io
+import json
+import math
+import statistics
+import time
+from datetime import timedelta
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.authentication import ClaimsTokenObtainPairSerializer
+from api.models import Board, Card, List, Profile
+from api.ranking import spread_keys
+
+BUDGETS_PATH = Path(settings.BASE_DIR) / 'benchmark_budgets.json'
+# Margen sobre el p95 medido al guardar los presupuestos
+LATENCY_MARGIN = 1.5
+
+SIZES = {
+    'small': {'teachers': 5, 'students': 200, 'boards': 20, 'cards': 2000},
+    'medium': {'teachers': 20, 'students': 1000, 'boards': 200, 'cards': 20000},
+    'large': {'teachers': 50, 'students': 3000, 'boards': 1000, 'cards': 200000},
+}
+
+
+# Escenarios de listas grandes -> número de tarjetas de la lista
+ROW_SCENARIOS = {'list_cards_1k': 1000, 'list_cards_10k': 10000}
+
+# Escenarios que cambian con API_FAST_SERIALIZERS: se miden también con el sufijo _fast
+FAST_SERIALIZER_SCENARIOS = (
+    'board_open', 'list_cards', 'cards_search', 'calendar', *ROW_SCENARIOS
+)
+
+
+def _con_fast_serializers(peticion):
+    def envuelta():
+        with override_settings(API_FAST_SERIALIZERS=True):
+            return peticion()
+    return envuelta
+
+
+def _consumir(respuesta):
+    """Lee el cuerpo de las respuestas en streaming, que es donde se hace el trabajo."""
+    if respuesta.streaming:
+        b''.join(respuesta.streaming_content)
+    return respuesta
+
+
+def _contar(consultas):
+    def wrapper(execute, sql, params, many, context):
+        consultas.append(sql)
+        return execute(sql, params, many, context)
+    return wrapper
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[indice]
+
+
+def _cliente(user):
+    client = APIClient()
+    token = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia y consultas SQL de los endpoints principales '
+        'y las compara con los presupuestos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default='small', help=f'Tamaños separados por comas ({", ".join(SIZES)})'
+        )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--budgets', default=str(BUDGETS_PATH), help='Archivo JSON de presupuestos'
+        )
+        parser.add_argument(
+            '--update-budgets', action='store_true',
+            help='Guarda los valores medidos como nuevos presupuestos',
+        )
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=1.0,
+            help='Multiplicador aplicado a los p95 presupuestados',
+        )
+        parser.add_argument(
+            '--queries-only', action='store_true',
+            help='Fallar sólo por número de consultas; la latencia se informa como aviso',
+        )
+        parser.add_argument(
+            '--existing', action='store_true',
+            help='Medir la base de datos actual sin generar datos',
+        )
+        parser.add_argument('--output', help='Guardar los resultados en este archivo JSON')
+
+    def handle(self, *args, **options):
+        iteraciones = max(1, options['iterations'])
+        if options['existing']:
+            tamanos = ['existing']
+        else:
+            tamanos = [tamano.strip() for tamano in options['sizes'].split(',') if tamano.strip()]
+            desconocidos = [tamano for tamano in tamanos if tamano not in SIZES]
+            if desconocidos:
+                raise CommandError(f'Tamaños desconocidos: {", ".join(desconocidos)}')
+
+        resultados = {}
+        # Como el runner de tests: DEBUG desactivado. Sin QueryBudgetMiddleware, que
+        # inspecciona la pila en cada consulta y falsearía la latencia
+        setup_test_environment(debug=False)
+        try:
+            sin_presupuesto = override_settings(
+                QUERY_BUDGET={'ENABLED': False}, API_FAST_SERIALIZERS=False
+            )
+            with sin_presupuesto:
+                for tamano in tamanos:
+                    resultados[tamano] = self.medir_tamano(
+                        tamano, iteraciones, options['existing']
+                    )
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            salida = json.dumps(resultados, indent=2) + '\n'
+            Path(options['output']).write_text(salida, encoding='utf-8')
+
+        ruta = Path(options['budgets'])
+        presupuestos = json.loads(ruta.read_text(encoding='utf-8')) if ruta.exists() else {}
+        if options['update_budgets']:
+            for tamano, escenarios in resultados.items():
+                presupuestos[tamano] = {
+                    nombre: {
+                        'queries': datos['queries'],
+                        'p95_ms': math.ceil(datos['p95_ms'] * LATENCY_MARGIN),
+                    }
+                    for nombre, datos in escenarios.items()
+                }
+            ruta.write_text(json.dumps(presupuestos, indent=2) + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f'Presupuestos actualizados en {ruta}'))
+            return
+
+        fallos, lentos = self.comparar(resultados, presupuestos, options['latency_tolerance'])
+        if options['queries_only']:
+            for aviso in lentos:
+                self.stdout.write(self.style.WARNING(f'⚠ {aviso}'))
+        else:
+            fallos += lentos
+        if fallos:
+            for fallo in fallos:
+                self.stdout.write(self.style.ERROR(f'✗ {fallo}'))
+            raise CommandError(f'{len(fallos)} escenario(s) superan su presupuesto')
+        if lentos and options['queries_only']:
+            self.stdout.write(self.style.SUCCESS('✓ Consultas SQL dentro de presupuesto'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Todos los escenarios dentro de presupuesto'))
+
+    def medir_tamano(self, tamano, iteraciones, existente):
+        old_name = None
+        if not existente:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            if not existente:
+                t = time.perf_counter()
+                call_command('generar_datos', stdout=io.StringIO(), **SIZES[tamano])
+                self.stdout.write(f'\n[{tamano}] datos generados en {time.perf_counter() - t:.1f}s')
+            else:
+                self.stdout.write('\n[existing] midiendo la base de datos actual')
+            escenarios = self.escenarios(listas_grandes=not existente)
+            resultados = {}
+            self.stdout.write(f'{"escenario":<20}{"consultas":>10}{"p50 ms":>10}{"p95 ms":>10}')
+            for nombre, peticion in escenarios.items():
+                resultados[nombre] = self.medir(peticion, iteraciones)
+                datos = resultados[nombre]
+                self.stdout.write(
+                    f'{nombre:<20}{datos["queries"]:>10}'
+                    f'{datos["p50_ms"]:>10.1f}{datos["p95_ms"]:>10.1f}'
+                )
+            self.comparar_serializers(resultados)
+            return resultados
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def escenarios(self, listas_grandes=True):
+        """Peticiones de cada escenario sobre el tablero activo más grande de un docente."""
+        board = (
+            Board.objects.filter(
+                archived=False, pending_delete=False, is_template=False,
+                owner__profile__role=Profile.Role.TEACHER,
+            )
+            .annotate(n=Count('lists__cards'))
+            .order_by('-n', 'id')
+            .select_related('owner')
+            .first()
+        )
+        if board is None:
+            raise CommandError('No hay tableros activos de docentes para medir')
+        teacher = board.owner
+        student = board.members.filter(profile__role=Profile.Role.STUDENT).order_by('id').first()
+        if student is None:
+            raise CommandError(f'El tablero {board.id} no tiene estudiantes')
+        listas = list(
+            List.objects.filter(board=board).order_by('rank', 'id').values_list('id', flat=True)
+        )
+        card = Card.objects.filter(list__board=board).order_by('id').first()
+        moved = Card.objects.filter(list__board=board).exclude(id=card.id).order_by('-id').first()
+        docente = _cliente(teacher)
+        estudiante = _cliente(student)
+        hoy = timezone.localdate()
+        contador = iter(range(10 ** 9))
+
+        def board_open():
+            docente.get(f'/api/boards/{board.id}/')
+            docente.get(f'/api/boards/{board.id}/lists/')
+            for list_id in listas:
+                docente.get(f'/api/lists/{list_id}/cards/')
+            return docente.get(f'/api/boards/{board.id}/activity/')
+
+        def card_move():
+            actual = Card.objects.filter(id=moved.id).values_list('list_id', flat=True).first()
+            destino = listas[(listas.index(actual) + 1) % len(listas)]
+            datos = {'list_id': destino, 'position': 0}
+            return docente.patch(f'/api/cards/{moved.id}/', datos, format='json')
+
+        def card_patch():
+            datos = {'title': f'Benchmark {next(contador)}'}
+            return docente.patch(f'/api/cards/{card.id}/', datos, format='json')
+
+        def card_fanout():
+            datos = {'title': f'Nueva {next(contador)}'}
+            return docente.post(f'/api/lists/{listas[0]}/cards/', datos, format='json')
+
+        escenarios = {
+            'board_open': board_open,
+            'list_cards': lambda: docente.get(f'/api/lists/{listas[0]}/cards/'),
+            'card_patch': card_patch,
+            'card_move': card_move,
+            'cards_search': lambda: docente.get('/api/cards/search/', {'q': 'informe'}),
+            'calendar': lambda: docente.get('/api/calendar/', {
+                'start_date': str(hoy - timedelta(days=7)),
+                'end_date': str(hoy + timedelta(days=35)),
+            }),
+            'calendar_export': lambda: docente.get('/api/calendar/export/'),
+            'card_fanout': card_fanout,
+            'notifications': lambda: estudiante.get('/api/notifications/', {'unread': 'true'}),
+        }
+        if listas_grandes:
+            for nombre, list_id in self.crear_listas_grandes(board, student).items():
+                escenarios[nombre] = partial(docente.get, f'/api/lists/{list_id}/cards/')
+        for nombre in FAST_SERIALIZER_SCENARIOS:
+            if nombre in escenarios:
+                escenarios[f'{nombre}_fast'] = _con_fast_serializers(escenarios[nombre])
+        return escenarios
+
+    def crear_listas_grandes(self, board, student):
+        """
+        Tablero del mismo docente con una lista por escenario de ROW_SCENARIOS.
+        Las tarjetas no tienen fecha límite ni coinciden con la búsqueda, así
+        que no cambian el resultado de los demás escenarios.
+        """
+        volumen = Board.objects.create(
+            name='Benchmark volumen', owner=board.owner, due_date=board.due_date
+        )
+        volumen.members.add(board.owner, student)
+        listas = {}
+        ranks = spread_keys(len(ROW_SCENARIOS))
+        for posicion, (nombre, total) in enumerate(ROW_SCENARIOS.items()):
+            lst = List.objects.create(
+                board=volumen, title=nombre, position=posicion, rank=ranks[posicion]
+            )
+            cards = Card.objects.bulk_create(
+                [
+                    Card(
+                        list=lst, title=f'Fila {i}', description='Tarjeta de volumen',
+                        position=i, rank=rank, created_by=board.owner,
+                    )
+                    for i, rank in enumerate(spread_keys(total))
+                ],
+                batch_size=2000,
+            )
+            Card.assignees.through.objects.bulk_create(
+                [Card.assignees.through(card_id=card.id, user_id=student.id) for card in cards],
+                batch_size=2000,
+            )
+            listas[nombre] = lst.id
+        return listas
+
+    def medir(self, peticion, iteraciones):
+        # Las vistas imprimen trazas (notificaciones, push...): no mezclarlas con el informe
+        with contextlib.redirect_stdout(io.StringIO()):
+            respuesta = _consumir(peticion())  # calentamiento
+            if respuesta.status_code >= 400:
+                detalle = getattr(respuesta, 'data', None) or getattr(respuesta, 'content', b'')
+                raise CommandError(f'{respuesta.status_code}: {detalle}')
+            # Contador con execute_wrapper: el registro de consultas de Django se
+            # vacía en cada petición
+            consultas = []
+            with connection.execute_wrapper(_contar(consultas)):
+                _consumir(peticion())
+            tiempos = []
+            for _ in range(iteraciones):
+                inicio = time.perf_counter()
+                _consumir(peticion())
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        return {
+            'queries': len(consultas),
+            'p50_ms': round(statistics.median(tiempos), 2),
+            'p95_ms': round(_percentil(tiempos, 95), 2),
+        }
+
+    def comparar_serializers(self, resultados):
+        self.stdout.write(
+            f'\n{"serializers":<18}{"consultas":>12}{"p50 drf":>10}{"p50 fast":>10}{"mejora":>9}'
+        )
+        for nombre in FAST_SERIALIZER_SCENARIOS:
+            if nombre not in resultados:
+                continue
+            drf, fast = resultados[nombre], resultados[f'{nombre}_fast']
+            consultas = f'{drf["queries"]}/{fast["queries"]}'
+            mejora = drf['p50_ms'] / fast['p50_ms'] if fast['p50_ms'] else 0
+            self.stdout.write(
+                f'{nombre:<18}{consultas:>12}'
+                f'{drf["p50_ms"]:>10.1f}{fast["p50_ms"]:>10.1f}{mejora:>8.2f}x'
+            )
+
+    def comparar(self, resultados, presupuestos, tolerancia):
+        """Devuelve (excesos de consultas, excesos de p95)."""
+        fallos = []
+        lentos = []
+        for tamano, escenarios in resultados.items():
+            limites = presupuestos.get(tamano, {})
+            for nombre, datos in escenarios.items():
+                limite = limites.get(nombre)
+                if limite is None:
+                    self.stdout.write(self.style.WARNING(f'⚠ {tamano}/{nombre}: sin presupuesto'))
+                    continue
+                if datos['queries'] > limite['queries']:
+                    fallos.append(
+                        f'{tamano}/{nombre}: {datos["queries"]} consultas '
+                        f'(presupuesto {limite["queries"]})'
+                    )
+                p95 = limite['p95_ms'] * tolerancia
+                if datos['p95_ms'] > p95:
+                    lentos.append(
+                        f'{tamano}/{nombre}: p95 {datos["p95_ms"]:.1f} ms '
+                        f'(presupuesto {p95:.0f} ms)'
+                    )
+        return fallos, lentos
@@ -0,0 +1,309 @@
+"""
+Comando de Django para medir la carga de WebSockets de notificaciones (NotificationConsumer).
+Uso: python manage.py carga_websocket [--connections 1000] [--recipients 500] [--fanouts 5]
+     python manage.py carga_websocket --url ws://127.0.0.1:8000 (contra un daphne local)
+
+Abre muchas conexiones autenticadas con JWT, lanza difusiones de
+notificaciones (las mismas que genera actualizar una tarjeta) a un
+subconjunto de usuarios conectados y mide:
+
+  - ritmo de conexión (conexiones/s) y latencia de conexión p50/p95,
+  - memoria por conexión (incremento de RSS del proceso / conexiones),
+  - latencia de entrega p50/p95/p99 desde que empieza la difusión hasta
+    que cada cliente recibe su mensaje, y duración total de la difusión.
+
+Por defecto todo ocurre en este proceso con channels.testing.WebsocketCommunicator
+sobre la aplicación ASGI real, en una base de datos de pruebas temporal, y
+funciona con InMemoryChannelLayer (USE_REDIS=false) o con Redis. Con --url
+se usan sockets reales contra un servidor ya arrancado con usuarios de la
+base de datos actual; en ese modo la difusión tiene que pasar por Redis
+para llegar al proceso del servidor, y hace falta el paquete "websockets".
+La memoria por conexión medida en ese modo es la del cliente, no la del servidor.
+"""
+
+import asyncio
+import json
+import os
+import random
+import resource
+import statistics
+import time
+
+from asgiref.sync import sync_to_async
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.models import Notification
+from core.asgi import application
+
+RUTA = '/ws/notifications/'
+HEADERS = [(b'origin', b'http://localhost'), (b'host', b'localhost')]
+
+
+def _rss():
+    """Memoria residente del proceso en bytes."""
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Sin /proc (macOS): pico de memoria, en bytes en macOS y en KB en Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _percentiles(valores):
+    if not valores:
+        return {'p50': 0, 'p95': 0, 'p99': 0, 'max': 0}
+    ordenados = sorted(valores)
+
+    def p(n):
+        return ordenados[min(len(ordenados) - 1, int(len(ordenados) * n / 100))]
+    return {'p50': statistics.median(ordenados), 'p95': p(95), 'p99': p(99), 'max': ordenados[-1]}
+
+
+class _ClienteMemoria:
+    """Conexión en proceso con WebsocketCommunicator."""
+
+    def __init__(self, user_id, token):
+        self.user_id = user_id
+        self.communicator = WebsocketCommunicator(
+            application, f'{RUTA}?token={token}', headers=HEADERS
+        )
+
+    async def conectar(self, timeout):
+        conectado, _ = await self.communicator.connect(timeout=timeout)
+        return conectado
+
+    async def recibir(self, timeout):
+        await self.communicator.receive_json_from(timeout=timeout)
+
+    async def cerrar(self):
+        await self.communicator.disconnect()
+
+
+class _ClienteSocket:
+    """Conexión real contra un servidor ASGI (requiere el paquete websockets)."""
+
+    def __init__(self, user_id, token, url):
+        self.user_id = user_id
+        self.url = f'{url.rstrip("/")}{RUTA}?token={token}'
+        self.ws = None
+
+    async def conectar(self, timeout):
+        import websockets
+
+        try:
+            conexion = websockets.connect(self.url, origin='http://localhost')
+            self.ws = await asyncio.wait_for(conexion, timeout)
+        except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException):
+            return False
+        return True
+
+    async def recibir(self, timeout):
+        json.loads(await asyncio.wait_for(self.ws.recv(), timeout))
+
+    async def cerrar(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga de las conexiones WebSocket de notificaciones y de las difusiones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000)
+        parser.add_argument(
+            '--recipients', type=int, default=500, help='Destinatarios por difusión'
+        )
+        parser.add_argument('--fanouts', type=int, default=5, help='Número de difusiones')
+        parser.add_argument(
+            '--concurrency', type=int, default=200, help='Conexiones abriéndose a la vez'
+        )
+        parser.add_argument(
+            '--timeout', type=float, default=10.0,
+            help='Segundos de espera por conexión o mensaje',
+        )
+        parser.add_argument(
+            '--send', choices=['batch', 'individual'], default='batch',
+            help='batch: send_notifications_batch; '
+                 'individual: send_notification_to_user por destinatario',
+        )
+        parser.add_argument(
+            '--url',
+            help='Servidor real, p. ej. ws://127.0.0.1:8000 '
+                 '(usa usuarios de la base de datos actual)',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        layer = get_channel_layer()
+        if layer is None:
+            raise CommandError('No hay CHANNEL_LAYERS configurado')
+        if options['url']:
+            if isinstance(layer, InMemoryChannelLayer):
+                raise CommandError(
+                    'Con --url la difusión debe llegar al servidor: usa Redis (USE_REDIS=true)'
+                )
+            try:
+                import websockets  # noqa: F401
+            except ImportError:
+                raise CommandError(
+                    'El modo --url necesita el paquete "websockets" (pip install websockets)'
+                )
+        self.stdout.write(f'Channel layer: {type(layer).__name__}')
+
+        old_name = None
+        setup_test_environment(debug=False)
+        if not options['url']:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            usuarios = self.usuarios(options['connections'], crear=not options['url'])
+            asyncio.run(self.ejecutar(usuarios, options))
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def usuarios(self, cantidad, crear):
+        if crear:
+            User.objects.bulk_create(
+                [User(username=f'ws.carga{i}', password='!') for i in range(cantidad)],
+                batch_size=1000,
+            )
+        usuarios = list(User.objects.filter(is_active=True).order_by('id')[:cantidad])
+        if len(usuarios) < cantidad:
+            raise CommandError(
+                f'Sólo hay {len(usuarios)} usuarios activos (se pidieron {cantidad})'
+            )
+        return [(usuario.id, str(AccessToken.for_user(usuario))) for usuario in usuarios]
+
+    async def ejecutar(self, usuarios, options):
+        timeout = options['timeout']
+        if options['url']:
+            clientes = [
+                _ClienteSocket(user_id, token, options['url']) for user_id, token in usuarios
+            ]
+        else:
+            clientes = [_ClienteMemoria(user_id, token) for user_id, token in usuarios]
+
+        # Conexión
+        rss_inicial = _rss()
+        semaforo = asyncio.Semaphore(max(1, options['concurrency']))
+        latencias_conexion = []
+
+        async def conectar(cliente):
+            async with semaforo:
+                inicio = time.perf_counter()
+                try:
+                    ok = await cliente.conectar(timeout)
+                except Exception:
+                    ok = False
+                if ok:
+                    latencias_conexion.append((time.perf_counter() - inicio) * 1000)
+                return ok
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(conectar(cliente) for cliente in clientes))
+        duracion = time.perf_counter() - inicio
+        conectados = [cliente for cliente, ok in zip(clientes, resultados) if ok]
+        memoria = (_rss() - rss_inicial) / max(1, len(conectados))
+        lat = _percentiles(latencias_conexion)
+        self.stdout.write(self.style.SUCCESS('\nCONEXIÓN'))
+        ritmo = len(conectados) / max(duracion, 1e-6)
+        self.stdout.write(
+            f'Conectados: {len(conectados)}/{len(clientes)} en {duracion:.2f}s '
+            f'({ritmo:.0f} conexiones/s)'
+        )
+        self.stdout.write(
+            f'Latencia de conexión: p50 {lat["p50"]:.1f} ms  p95 {lat["p95"]:.1f} ms  '
+            f'máx {lat["max"]:.1f} ms'
+        )
+        self.stdout.write(f'Memoria por conexión: {memoria / 1024:.1f} KB (RSS)')
+        if not conectados:
+            raise CommandError('No se pudo abrir ninguna conexión')
+
+        # Difusiones
+        rng = random.Random(options['seed'])
+        entregas = []
+        duraciones = []
+        perdidos = 0
+        for ronda in range(max(0, options['fanouts'])):
+            destinatarios = rng.sample(conectados, min(options['recipients'], len(conectados)))
+            inicio = time.perf_counter()
+
+            async def esperar(cliente):
+                try:
+                    await cliente.recibir(timeout)
+                except Exception:
+                    return None
+                return (time.perf_counter() - inicio) * 1000
+
+            tareas = [asyncio.create_task(esperar(cliente)) for cliente in destinatarios]
+            user_ids = [cliente.user_id for cliente in destinatarios]
+            await self.difundir(user_ids, ronda, options['send'])
+            tiempos = await asyncio.gather(*tareas)
+            recibidos = [t for t in tiempos if t is not None]
+            perdidos += len(tiempos) - len(recibidos)
+            entregas.extend(recibidos)
+            if recibidos:
+                duraciones.append(max(recibidos))
+
+        if options['fanouts'] > 0:
+            lat = _percentiles(entregas)
+            self.stdout.write(self.style.SUCCESS(
+                f'\nDIFUSIÓN ({options["send"]}, '
+                f'{options["recipients"]} destinatarios x {options["fanouts"]})'
+            ))
+            self.stdout.write(f'Entregados: {len(entregas)}  Perdidos/timeout: {perdidos}')
+            self.stdout.write(
+                f'Latencia de entrega: p50 {lat["p50"]:.1f} ms  p95 {lat["p95"]:.1f} ms  '
+                f'p99 {lat["p99"]:.1f} ms  máx {lat["max"]:.1f} ms'
+            )
+            if duraciones:
+                self.stdout.write(
+                    'Duración de cada difusión (último mensaje): '
+                    f'media {statistics.mean(duraciones):.1f} ms  máx {max(duraciones):.1f} ms'
+                )
+
+        await asyncio.gather(*(cliente.cerrar() for cliente in conectados), return_exceptions=True)
+
+    async def difundir(self, user_ids, ronda, modo):
+        """
+        Misma ruta que una actualización de tarjeta: notificaciones enviadas desde
+        código síncrono.
+        """
+        from api.views import send_notification_to_user, send_notifications_batch
+
+        ahora = timezone.now()
+        notificaciones = [
+            Notification(
+                id=ronda * len(user_ids) + i + 1,
+                recipient_id=user_id,
+                notification_type='card_updated',
+                title='Tarea actualizada',
+                message=f'Carga: difusión {ronda + 1}',
+                created_at=ahora,
+            )
+            for i, user_id in enumerate(user_ids)
+        ]
+
+        def enviar():
+            if modo == 'batch':
+                send_notifications_batch(notificaciones)
+                return
+            for notificacion in notificaciones:
+                send_notification_to_user(notificacion.recipient_id, {
+                    'id': notificacion.id,
+                    'type': notificacion.notification_type,
+                    'title': notificacion.title,
+                    'message': notificacion.message,
+                    'created_at': notificacion.created_at.isoformat(),
+                })
+
+        await sync_to_async(enviar, thread_sensitive=False)()
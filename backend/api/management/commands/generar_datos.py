@@ -0,0 +1,373 @@
+"""
+Comando de Django para generar un conjunto de datos sintético grande (pruebas
+de carga y benchmarks).
+Uso: python manage.py generar_datos [--teachers 50] [--students 2000] [--boards 500]
+         [--cards 100000] [--seed 42]
+
+Crea docentes, estudiantes, tableros con sus miembros, listas, etiquetas,
+tarjetas (con responsables, etiquetas, comentarios y checklist), actividad
+y notificaciones. Con la misma semilla y la misma --fecha-base el resultado
+es idéntico.
+
+Las distribuciones imitan el uso real: unos pocos docentes concentran
+muchos tableros, el número de tarjetas por tablero tiene cola larga, la
+mayoría de tarjetas tiene uno o dos responsables, sólo una parte tiene
+comentarios o checklist y alrededor de un 10% de los tableros está
+archivado.
+
+Se inserta por bloques de tableros, cada bloque en su propia transacción.
+Tableros, listas, etiquetas y tarjetas usan bulk_create (hacen falta sus
+ids); las tablas hoja (miembros, responsables, comentarios, checklist,
+actividad, notificaciones) se insertan con executemany directo, porque
+compilar un INSERT del ORM por fila es lo que más tiempo consume. Todos los
+usuarios comparten un único hash de contraseña. Un millón de tarjetas se
+genera en pocos minutos.
+"""
+
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.lookup import invalidate_user_lookup
+from api.models import (
+    ActivityLog,
+    Board,
+    Card,
+    ChecklistItem,
+    Comment,
+    Label,
+    List,
+    Notification,
+    Profile,
+)
+from api.ranking import spread_keys
+
+PASSWORD = 'password123'
+
+LISTAS = ['Pendiente', 'En progreso', 'Revisión', 'Hecho', 'Bloqueado', 'Ideas']
+# Peso relativo de cada lista al repartir las tarjetas
+PESO_LISTAS = [4, 2, 1, 5, 1, 1]
+ETIQUETAS = [
+    ('Investigación', '#3b82f6'), ('Código', '#10b981'), ('Documentación', '#f59e0b'),
+    ('Presentación', '#ef4444'), ('Urgente', '#dc2626'), ('Opcional', '#6b7280'),
+    ('Laboratorio', '#8b5cf6'), ('Examen', '#ec4899'),
+]
+TEMAS = [
+    'Bases de datos', 'Cálculo', 'Física', 'Programación', 'Redes', 'Estadística',
+    'Historia', 'Química', 'Inglés', 'Ética', 'Algoritmos', 'Sistemas operativos',
+]
+ACCIONES = [
+    'Entregar', 'Revisar', 'Preparar', 'Investigar', 'Redactar', 'Corregir', 'Diseñar', 'Probar',
+]
+OBJETOS = [
+    'informe', 'taller', 'laboratorio', 'exposición', 'ensayo', 'proyecto', 'cuestionario',
+    'prototipo',
+]
+COMENTARIOS = [
+    'Ya subí mi parte.', '¿Alguien puede revisar esto?', 'Falta la bibliografía.',
+    'Listo, lo movemos a revisión.', 'Tengo dudas con el punto 3.', 'Buen trabajo.',
+    'Lo termino mañana.', 'Agregué los resultados.',
+]
+COLORES = ['#3b82f6', '#10b981', '#f59e0b', '#ef4444', '#8b5cf6', '#ec4899', '']
+
+
+def _insertar(model, campos, filas, lote=5000):
+    """INSERT directo con executemany; los campos JSON y de fecha se adaptan al backend."""
+    if not filas:
+        return
+    fields = [model._meta.get_field(campo) for campo in campos]
+    adaptar = [
+        i for i, field in enumerate(fields)
+        if field.get_internal_type() in ('JSONField', 'DateTimeField')
+    ]
+    tabla = connection.ops.quote_name(model._meta.db_table)
+    columnas = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    sql = f'INSERT INTO {tabla} ({columnas}) VALUES ({", ".join(["%s"] * len(fields))})'
+    with connection.cursor() as cursor:
+        for i in range(0, len(filas), lote):
+            bloque = filas[i:i + lote]
+            if adaptar:
+                bloque = [list(fila) for fila in bloque]
+                for fila in bloque:
+                    for j in adaptar:
+                        fila[j] = fields[j].get_db_prep_save(fila[j], connection)
+            cursor.executemany(sql, bloque)
+
+
+class Command(BaseCommand):
+    help = 'Genera un conjunto de datos sintético y reproducible para pruebas de carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=50)
+        parser.add_argument('--students', type=int, default=2000)
+        parser.add_argument('--boards', type=int, default=500)
+        parser.add_argument('--cards', type=int, default=100000, help='Total de tarjetas')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='gen', help='Prefijo de los usernames generados')
+        parser.add_argument(
+            '--id-start', type=int, default=7000000000, help='Primer id_number (10 dígitos)'
+        )
+        parser.add_argument(
+            '--fecha-base', type=date.fromisoformat, default=None,
+            help='Fecha de referencia AAAA-MM-DD (por defecto hoy)',
+        )
+        parser.add_argument(
+            '--chunk-cards', type=int, default=20000, help='Tarjetas aproximadas por transacción'
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.hoy = options['fecha_base'] or date.today()
+        self.totales = {}
+        inicio = time.perf_counter()
+
+        teachers, students = self.crear_usuarios(options)
+        planes = self.planificar(options, teachers, students)
+
+        # Tableros por bloques de ~chunk_cards tarjetas
+        bloque = []
+        tarjetas_bloque = 0
+        tarjetas_hechas = 0
+        for plan in planes:
+            bloque.append(plan)
+            tarjetas_bloque += sum(plan['tarjetas_por_lista'])
+            if tarjetas_bloque >= options['chunk_cards']:
+                self.crear_bloque(bloque)
+                tarjetas_hechas += tarjetas_bloque
+                self.progreso(tarjetas_hechas, options['cards'], inicio)
+                bloque, tarjetas_bloque = [], 0
+        if bloque:
+            self.crear_bloque(bloque)
+            tarjetas_hechas += tarjetas_bloque
+            self.progreso(tarjetas_hechas, options['cards'], inicio)
+
+        # bulk_create no emite señales: invalidar el índice de usuarios. Los
+        # feeds .ics no hace falta: los tableros son nuevos y sus tarjetas ya
+        # cambian la huella del feed
+        invalidate_user_lookup()
+
+        total = time.perf_counter() - inicio
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('RESUMEN'))
+        self.stdout.write('=' * 60)
+        for nombre, cantidad in self.totales.items():
+            self.stdout.write(f'{nombre:<24}{cantidad:>12,}')
+        ritmo = sum(self.totales.values()) / max(total, 1e-6)
+        self.stdout.write(f'Tiempo total: {total:.1f}s ({ritmo:,.0f} filas/s)')
+        self.stdout.write(f'Contraseña de todos los usuarios: {PASSWORD}')
+
+    def contar(self, nombre, cantidad):
+        self.totales[nombre] = self.totales.get(nombre, 0) + cantidad
+
+    def progreso(self, hechas, total, inicio):
+        transcurrido = time.perf_counter() - inicio
+        self.stdout.write(f'  {hechas:,}/{total:,} tarjetas ({transcurrido:.1f}s)')
+
+    def crear_usuarios(self, options):
+        prefix = options['prefix']
+        n_teachers, n_students = options['teachers'], options['students']
+        if n_teachers < 1 or n_students < 1:
+            raise CommandError('Se necesita al menos un docente y un estudiante')
+        id_start = options['id_start']
+        if id_start < 10 ** 9 or id_start + n_teachers + n_students > 10 ** 10:
+            raise CommandError('--id-start debe dejar todos los id_number con 10 dígitos')
+        if User.objects.filter(username__startswith=f'{prefix}.').exists():
+            raise CommandError(f'Ya existen usuarios con el prefijo "{prefix}.": usa otro --prefix')
+        id_end = id_start + n_teachers + n_students
+        ocupados = Profile.objects.filter(id_number__gte=str(id_start), id_number__lt=str(id_end))
+        if ocupados.exists():
+            raise CommandError('El rango de id_number ya está en uso: usa otro --id-start')
+
+        # Un solo hash (con sal fija para que sea reproducible) para todos los usuarios
+        password = make_password(PASSWORD, salt=f'{prefix}{options["seed"]}'.ljust(12, '0'))
+        datos = [(f'{prefix}.prof{i}', Profile.Role.TEACHER) for i in range(n_teachers)]
+        datos += [(f'{prefix}.est{i}', Profile.Role.STUDENT) for i in range(n_students)]
+        usuarios = []
+        with transaction.atomic():
+            for i in range(0, len(datos), 5000):
+                lote = User.objects.bulk_create([
+                    User(username=username, email=f'{username}@escuela.edu', password=password)
+                    for username, _ in datos[i:i + 5000]
+                ])
+                usuarios.extend(lote)
+            Profile.objects.bulk_create(
+                [
+                    Profile(user_id=usuario.pk, role=role, id_number=str(id_start + i))
+                    for i, (usuario, (_, role)) in enumerate(zip(usuarios, datos))
+                ],
+                batch_size=5000,
+            )
+        self.contar('Usuarios', len(usuarios))
+        self.stdout.write(f'Usuarios creados: {n_teachers} docentes, {n_students} estudiantes')
+        return [u.pk for u in usuarios[:n_teachers]], [u.pk for u in usuarios[n_teachers:]]
+
+    def planificar(self, options, teachers, students):
+        """Decide para cada tablero propietario, miembros, listas y reparto de tarjetas."""
+        rng = self.rng
+        n_boards = max(1, options['boards'])
+        # Pocos docentes con muchos tableros (ley de potencias)
+        peso_docentes = [1 / (i + 1) ** 0.8 for i in range(len(teachers))]
+        # Tarjetas por tablero con cola larga (lognormal), normalizado al total pedido
+        pesos = [rng.lognormvariate(0, 0.8) for _ in range(n_boards)]
+        escala = options['cards'] / sum(pesos)
+        por_tablero = [int(peso * escala) for peso in pesos]
+        for i in range(options['cards'] - sum(por_tablero)):
+            por_tablero[i % n_boards] += 1
+
+        planes = []
+        for n_cards in por_tablero:
+            n_listas = rng.randint(3, len(LISTAS))
+            reparto = [0] * n_listas
+            for indice in rng.choices(range(n_listas), weights=PESO_LISTAS[:n_listas], k=n_cards):
+                reparto[indice] += 1
+            planes.append({
+                'owner': rng.choices(teachers, weights=peso_docentes)[0],
+                'members': rng.sample(students, min(len(students), rng.randint(15, 45))),
+                'due_date': self.hoy + timedelta(days=rng.randint(-60, 150)),
+                'archived': rng.random() < 0.1,
+                'tarjetas_por_lista': reparto,
+                'n_etiquetas': rng.randint(2, 6),
+            })
+        return planes
+
+    def crear_bloque(self, planes):
+        rng = self.rng
+        ahora = timezone.now()
+        with transaction.atomic():
+            boards = Board.objects.bulk_create([
+                Board(
+                    name=(
+                        f'{rng.choice(TEMAS)} {self.hoy.year}-{rng.randint(1, 2)} '
+                        f'· Grupo {rng.randint(1, 30)}'
+                    ),
+                    owner_id=plan['owner'],
+                    color=rng.choice(COLORES),
+                    due_date=plan['due_date'],
+                    archived=plan['archived'],
+                    archived_at=ahora if plan['archived'] else None,
+                )
+                for plan in planes
+            ])
+            _insertar(Board.members.through, ['board', 'user'], [
+                (board.pk, user_id)
+                for board, plan in zip(boards, planes)
+                for user_id in [plan['owner'], *plan['members']]
+            ])
+
+            listas = List.objects.bulk_create(
+                [
+                    List(board_id=board.pk, title=LISTAS[i], position=i, rank=rank)
+                    for board, plan in zip(boards, planes)
+                    for i, rank in enumerate(spread_keys(len(plan['tarjetas_por_lista'])))
+                ],
+                batch_size=5000,
+            )
+            etiquetas = Label.objects.bulk_create(
+                [
+                    Label(board_id=board.pk, name=nombre, color=color)
+                    for board, plan in zip(boards, planes)
+                    for nombre, color in rng.sample(ETIQUETAS, plan['n_etiquetas'])
+                ],
+                batch_size=5000,
+            )
+
+            # Tarjetas; se guarda junto a cada una el tablero al que pertenece
+            listas_iter = iter(listas)
+            etiquetas_iter = iter(etiquetas)
+            cards = []
+            contexto = []
+            for board, plan in zip(boards, planes):
+                personas = [plan['owner'], *plan['members']]
+                board_etiquetas = [next(etiquetas_iter) for _ in range(plan['n_etiquetas'])]
+                for n in plan['tarjetas_por_lista']:
+                    lista = next(listas_iter)
+                    for position, rank in enumerate(spread_keys(n) if n else []):
+                        due = None
+                        if rng.random() < 0.7:
+                            dias = rng.randint(-45, 120)
+                            due = min(plan['due_date'], self.hoy + timedelta(days=dias))
+                        cards.append(Card(
+                            list_id=lista.pk,
+                            title=(
+                                f'{rng.choice(ACCIONES)} {rng.choice(OBJETOS)} '
+                                f'de {rng.choice(TEMAS).lower()}'
+                            ),
+                            description=rng.choice(COMENTARIOS) if rng.random() < 0.4 else '',
+                            due_date=due,
+                            priority=rng.choices(Card.Priority.values, weights=[3, 5, 2])[0],
+                            position=position,
+                            rank=rank,
+                            created_by_id=(
+                                plan['owner'] if rng.random() < 0.7
+                                else rng.choice(plan['members'])
+                            ),
+                            updated_at=ahora,
+                            archived=plan['archived'],
+                        ))
+                        contexto.append((board, plan, personas, board_etiquetas))
+            Card.objects.bulk_create(cards, batch_size=2000)
+
+            asignaciones = []
+            etiquetado = []
+            comentarios = []
+            checklist = []
+            actividad = []
+            notificaciones = []
+            for card, (board, plan, personas, board_etiquetas) in zip(cards, contexto):
+                cuantos = rng.choices([0, 1, 2, 3], weights=[2, 5, 2, 1])[0]
+                responsables = rng.sample(plan['members'], min(len(plan['members']), cuantos))
+                for user_id in responsables:
+                    asignaciones.append((card.pk, user_id))
+                    notificaciones.append((
+                        user_id, board.pk, 'card_assigned', 'Tarea asignada',
+                        f"Te asignaron la tarea '{card.title}' en el tablero '{board.name}'",
+                        {'card_id': card.pk, 'card_title': card.title}, rng.random() < 0.6, ahora,
+                    ))
+                cuantas = rng.choices([0, 1, 2], weights=[4, 4, 2])[0]
+                for etiqueta in rng.sample(board_etiquetas, cuantas):
+                    etiquetado.append((etiqueta.pk, card.pk))
+                # Comentarios: la mayoría de tarjetas no tiene, unas pocas tienen muchos
+                for _ in range(int(rng.expovariate(1.5))):
+                    autor = rng.choice(personas)
+                    comentarios.append((card.pk, autor, rng.choice(COMENTARIOS), ahora))
+                if rng.random() < 0.3:
+                    for position in range(rng.randint(2, 6)):
+                        hecho = rng.random() < 0.5
+                        checklist.append((card.pk, f'Paso {position + 1}', hecho, position))
+                actividad.append((
+                    board.pk, card.created_by_id, 'card_created',
+                    {'card_id': card.pk, 'card_title': card.title, 'list_id': card.list_id}, ahora,
+                ))
+                if rng.random() < 0.3:
+                    actividad.append((
+                        board.pk, rng.choice(personas), 'card_moved',
+                        {'card_id': card.pk, 'card_title': card.title}, ahora,
+                    ))
+
+            _insertar(Card.assignees.through, ['card', 'user'], asignaciones)
+            _insertar(Label.cards.through, ['label', 'card'], etiquetado)
+            _insertar(Comment, ['card', 'author', 'content', 'created_at'], comentarios)
+            _insertar(ChecklistItem, ['card', 'text', 'done', 'position'], checklist)
+            _insertar(ActivityLog, ['board', 'actor', 'action', 'meta', 'created_at'], actividad)
+            _insertar(Notification, [
+                'recipient', 'board', 'notification_type', 'title', 'message', 'data', 'read',
+                'created_at',
+            ], notificaciones)
+
+        self.contar('Tableros', len(boards))
+        self.contar('Miembros', sum(len(plan['members']) + 1 for plan in planes))
+        self.contar('Listas', len(listas))
+        self.contar('Etiquetas', len(etiquetas))
+        self.contar('Tarjetas', len(cards))
+        self.contar('Responsables', len(asignaciones))
+        self.contar('Tarjetas etiquetadas', len(etiquetado))
+        self.contar('Comentarios', len(comentarios))
+        self.contar('Elementos de checklist', len(checklist))
+        self.contar('Actividad', len(actividad))
+        self.contar('Notificaciones', len(notificaciones))
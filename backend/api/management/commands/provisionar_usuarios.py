@@ -0,0 +1,231 @@
+"""
+Comando de Django para dar de alta usuarios en bloque desde un CSV.
+Uso: python manage.py provisionar_usuarios estudiantes.csv [--password CLAVE]
+         [--workers N] [--batch-size N]
+
+Columnas del CSV (con cabecera): username, email, role, id_number y,
+opcionalmente, password, first_name y last_name. Si una fila no trae
+password se usa la de --password.
+
+Las contraseñas se cifran en paralelo con un pool de procesos (el hash es
+lo que más tarda: cientos de milisegundos por usuario con PBKDF2) y los
+User y Profile se insertan con bulk_create por lotes, cada lote en su
+propia transacción. Las filas inválidas o ya existentes se informan y se
+omiten sin detener el resto.
+
+bulk_create no emite post_save, y aunque se invalidara aquí la búsqueda de
+usuarios (api.lookup), la invalidación no llegaría a los procesos web con
+la caché local por proceso. Los usuarios nuevos aparecen en el typeahead
+cuando caducan los resultados cacheados (LOOKUP_CACHE_TTL) y, en SQLite,
+el índice en memoria de cada worker (LOOKUP_INDEX_MAX_AGE).
+"""
+
+import csv
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.lookup import LOOKUP_CACHE_TTL, LOOKUP_INDEX_MAX_AGE
+from api.models import Profile
+
+COLUMNAS = ('username', 'email', 'role', 'id_number')
+# Campos de User que se validan con los validadores del modelo (bulk_create no lo hace)
+CAMPOS_USER = ('username', 'email', 'first_name', 'last_name')
+
+
+def _iniciar_worker():
+    # Con el método "spawn" (Windows/macOS) el proceso hijo no hereda Django configurado
+    import django
+    django.setup()
+
+
+def _cifrar(password):
+    return make_password(password)
+
+
+def _error_de_campos(fila):
+    """Primer error de los validadores de User (longitud, caracteres, formato del email) o None."""
+    for campo in CAMPOS_USER:
+        try:
+            User._meta.get_field(campo).clean(fila.get(campo, ''), None)
+        except ValidationError as e:
+            return f'{campo} inválido: {" ".join(e.messages)}'
+    return None
+
+
+def _en_lotes(valores, tamano):
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+class Command(BaseCommand):
+    help = 'Crea usuarios (docentes y estudiantes) en bloque a partir de un archivo CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv', help='Ruta del archivo CSV')
+        parser.add_argument('--password', help='Contraseña para las filas sin columna password')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Procesos para cifrar contraseñas',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Filas por bulk_create')
+
+    def leer_filas(self, ruta):
+        try:
+            with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+                lector = csv.DictReader(archivo)
+                cabecera = [(nombre or '').strip().lower() for nombre in lector.fieldnames or []]
+                faltan = [columna for columna in COLUMNAS if columna not in cabecera]
+                if faltan:
+                    raise CommandError(f'Faltan columnas en el CSV: {", ".join(faltan)}')
+                return [
+                    {
+                        (clave or '').strip().lower(): (valor or '').strip()
+                        for clave, valor in fila.items()
+                    }
+                    for fila in lector
+                ]
+        except OSError as e:
+            raise CommandError(f'No se puede leer {ruta}: {e}')
+
+    def validar(self, filas, password_defecto):
+        """Devuelve (válidas, errores). Comprueba duplicados en el archivo y en la base de datos."""
+        existentes_username = set()
+        existentes_id = set()
+        for lote in _en_lotes({fila['username'] for fila in filas}, 1000):
+            existentes_username.update(
+                User.objects.filter(username__in=lote).values_list('username', flat=True)
+            )
+        for lote in _en_lotes({fila['id_number'] for fila in filas}, 1000):
+            existentes_id.update(
+                Profile.objects.filter(id_number__in=lote).values_list('id_number', flat=True)
+            )
+
+        roles = set(Profile.Role.values)
+        validas = []
+        errores = []
+        vistos_username = set()
+        vistos_id = set()
+        for numero, fila in enumerate(filas, start=2):  # la fila 1 es la cabecera
+            username = fila['username']
+            id_number = fila['id_number']
+            password = fila.get('password') or password_defecto
+            role = (fila['role'] or Profile.Role.STUDENT).lower()
+            error_campo = _error_de_campos(fila)
+            if not username:
+                error = 'username vacío'
+            elif error_campo:
+                error = error_campo
+            elif username in existentes_username:
+                error = 'username ya existe'
+            elif username in vistos_username:
+                error = 'username repetido en el archivo'
+            elif not (id_number.isdigit() and len(id_number) == 10):
+                error = 'id_number debe tener exactamente 10 dígitos'
+            elif id_number in existentes_id:
+                error = f'ID {id_number} ya existe'
+            elif id_number in vistos_id:
+                error = f'ID {id_number} repetido en el archivo'
+            elif role not in roles:
+                error = f'role inválido ({role})'
+            elif not password:
+                error = 'sin contraseña (usa la columna password o --password)'
+            elif len(password) < 8:
+                error = 'la contraseña debe tener al menos 8 caracteres'
+            else:
+                vistos_username.add(username)
+                vistos_id.add(id_number)
+                validas.append({**fila, 'role': role, 'password': password})
+                continue
+            errores.append((numero, username, error))
+        return validas, errores
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+
+        inicio = time.perf_counter()
+        filas = self.leer_filas(options['csv'])
+        validas, errores = self.validar(filas, options['password'])
+        self.stdout.write(
+            f'Filas leídas: {len(filas)} (válidas: {len(validas)}, omitidas: {len(errores)})'
+        )
+
+        # Cifrado de contraseñas en paralelo
+        t = time.perf_counter()
+        passwords = [fila['password'] for fila in validas]
+        if workers > 1 and len(passwords) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker) as pool:
+                chunksize = max(1, len(passwords) // (workers * 4))
+                hashes = list(pool.map(_cifrar, passwords, chunksize=chunksize))
+        else:
+            hashes = [_cifrar(password) for password in passwords]
+        t_hash = time.perf_counter() - t
+        if hashes:
+            ritmo = len(hashes) / max(t_hash, 1e-6)
+            self.stdout.write(
+                f'Contraseñas cifradas: {len(hashes)} en {t_hash:.1f}s '
+                f'con {workers} procesos ({ritmo:.0f}/s)'
+            )
+
+        # Inserción por lotes
+        t = time.perf_counter()
+        creados = 0
+        for lote in _en_lotes(zip(validas, hashes), batch_size):
+            with transaction.atomic():
+                usuarios = User.objects.bulk_create([
+                    User(
+                        username=fila['username'],
+                        email=fila['email'],
+                        first_name=fila.get('first_name', ''),
+                        last_name=fila.get('last_name', ''),
+                        password=password,
+                        is_active=True,
+                    )
+                    for fila, password in lote
+                ])
+                if any(usuario.pk is None for usuario in usuarios):
+                    # Backends sin RETURNING en bulk_create: recuperar los ids por username
+                    nombres = [usuario.username for usuario in usuarios]
+                    ids = dict(
+                        User.objects.filter(username__in=nombres).values_list('username', 'id')
+                    )
+                    for usuario in usuarios:
+                        usuario.pk = ids[usuario.username]
+                Profile.objects.bulk_create([
+                    Profile(user_id=usuario.pk, role=fila['role'], id_number=fila['id_number'])
+                    for usuario, (fila, _) in zip(usuarios, lote)
+                ])
+            creados += len(usuarios)
+            self.stdout.write(f'  {creados}/{len(validas)} usuarios insertados')
+        t_insert = time.perf_counter() - t
+
+        total = time.perf_counter() - inicio
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('RESUMEN'))
+        self.stdout.write('=' * 60)
+        self.stdout.write(f'Usuarios creados: {creados}')
+        self.stdout.write(f'Filas omitidas: {len(errores)}')
+        self.stdout.write(
+            f'Cifrado: {t_hash:.1f}s  Inserción: {t_insert:.1f}s  Total: {total:.1f}s'
+        )
+        if creados:
+            self.stdout.write(f'Rendimiento: {creados / max(total, 1e-6):.0f} usuarios/s')
+            espera = math.ceil((LOOKUP_INDEX_MAX_AGE + LOOKUP_CACHE_TTL) / 60)
+            self.stdout.write(
+                f'Los usuarios nuevos aparecerán en la búsqueda en {espera} minutos como mucho'
+            )
+
+        if errores:
+            self.stdout.write('\nFilas omitidas:')
+            for numero, username, error in errores:
+                mensaje = f'  - Fila {numero} ({username or "?"}): {error}'
+                self.stdout.write(self.style.WARNING(mensaje))
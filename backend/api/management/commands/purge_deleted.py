@@ -0,0 +1,21 @@
+"""
+Comando de Django para completar las eliminaciones pendientes de tableros y cuentas.
+Normalmente se ejecutan solas en segundo plano; este comando retoma las que
+quedaron a medias (p. ej. tras un reinicio del servidor).
+Uso: python manage.py purge_deleted
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.deletion import run_pending_jobs
+from api.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = 'Completa las eliminaciones pendientes de tableros y cuentas de usuario'
+
+    def handle(self, *args, **options):
+        pendientes = DeletionJob.objects.filter(finished_at__isnull=True).count()
+        self.stdout.write(f'Eliminaciones pendientes: {pendientes}')
+        completadas = run_pending_jobs()
+        self.stdout.write(self.style.SUCCESS(f'Eliminaciones completadas: {completadas}'))
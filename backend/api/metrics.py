@@ -0,0 +1,180 @@
+"""
+Métricas en formato Prometheus (endpoint /metrics).
+
+Se recogen con prometheus_client, que guarda los contadores en memoria del
+proceso. Con varios procesos (workers de daphne/gunicorn) hay que definir
+PROMETHEUS_MULTIPROC_DIR con un directorio vacío y escribible antes de
+arrancarlos: cada proceso escribe sus valores en archivos mmap de ese
+directorio y /metrics los suma todos.
+
+Métricas:
+  kanban_http_request_duration_seconds   latencia por vista, método y estado
+  kanban_http_db_queries                 consultas SQL por petición y vista
+  kanban_http_db_duration_seconds        tiempo en la base de datos por petición y vista
+  kanban_websocket_connections           conexiones abiertas en NotificationConsumer
+  kanban_websocket_connects_total        intentos de conexión (accepted / rejected)
+  kanban_channel_group_send_seconds      latencia de channel_layer.group_send
+  kanban_push_total                      envíos push por origen del servicio y resultado
+  kanban_push_duration_seconds           latencia de los envíos push por origen
+  kanban_notification_fanout_recipients  notificaciones en tiempo real enviadas por petición
+"""
+import os
+import secrets
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+	CONTENT_TYPE_LATEST,
+	REGISTRY,
+	CollectorRegistry,
+	Counter,
+	Gauge,
+	Histogram,
+	generate_latest,
+	multiprocess,
+)
+
+HTTP_LATENCY = Histogram(
+	"kanban_http_request_duration_seconds", "Latencia de las peticiones HTTP",
+	["view", "method", "status"],
+)
+HTTP_QUERIES = Histogram(
+	"kanban_http_db_queries", "Consultas SQL por petición",
+	["view"], buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 200, 500),
+)
+HTTP_DB_TIME = Histogram(
+	"kanban_http_db_duration_seconds", "Tiempo de base de datos por petición",
+	["view"],
+)
+WS_CONNECTIONS = Gauge(
+	"kanban_websocket_connections", "Conexiones WebSocket de notificaciones abiertas",
+	multiprocess_mode="livesum",
+)
+WS_CONNECTS = Counter(
+	"kanban_websocket_connects_total", "Intentos de conexión WebSocket",
+	["result"],
+)
+GROUP_SEND_LATENCY = Histogram(
+	"kanban_channel_group_send_seconds", "Latencia de channel_layer.group_send",
+	buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+PUSH_SENDS = Counter(
+	"kanban_push_total", "Envíos de notificaciones push",
+	["origin", "result"],
+)
+PUSH_LATENCY = Histogram(
+	"kanban_push_duration_seconds", "Latencia de los envíos push",
+	["origin"],
+)
+NOTIFICATION_FANOUT = Histogram(
+	"kanban_notification_fanout_recipients",
+	"Notificaciones en tiempo real enviadas por petición",
+	["view"], buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+
+# Contador de notificaciones de la petición en curso (lo crea MetricsMiddleware).
+# Es una lista para que las vistas síncronas que corren en otro contexto bajo
+# ASGI modifiquen el mismo objeto.
+_fanout = ContextVar("kanban_notification_fanout", default=None)
+
+
+def record_notifications(count=1):
+	current = _fanout.get()
+	if current is not None:
+		current[0] += count
+
+
+def record_group_send(started):
+	GROUP_SEND_LATENCY.observe(time.perf_counter() - started)
+
+
+def record_push(endpoint, result, started):
+	origin = urlparse(endpoint).netloc or "unknown"
+	PUSH_SENDS.labels(origin, result).inc()
+	PUSH_LATENCY.labels(origin).observe(time.perf_counter() - started)
+
+
+def websocket_connected():
+	WS_CONNECTS.labels("accepted").inc()
+	WS_CONNECTIONS.inc()
+
+
+def websocket_rejected():
+	WS_CONNECTS.labels("rejected").inc()
+
+
+def websocket_disconnected():
+	WS_CONNECTIONS.dec()
+
+
+class _QueryTimer:
+	def __init__(self):
+		self.count = 0
+		self.seconds = 0.0
+
+	def __call__(self, execute, sql, params, many, context):
+		started = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.count += 1
+			self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		timer = _QueryTimer()
+		fanout = [0]
+		token = _fanout.set(fanout)
+		started = time.perf_counter()
+		try:
+			with ExitStack() as stack:
+				for conn in connections.all():
+					stack.enter_context(conn.execute_wrapper(timer))
+				response = self.get_response(request)
+		finally:
+			_fanout.reset(token)
+
+		match = getattr(request, "resolver_match", None)
+		# Nombre de la ruta y no la URL, para no crear una serie por cada id
+		view = match.view_name if match is not None and match.view_name else "unmatched"
+		elapsed = time.perf_counter() - started
+		HTTP_LATENCY.labels(view, request.method, str(response.status_code)).observe(elapsed)
+		HTTP_QUERIES.labels(view).observe(timer.count)
+		HTTP_DB_TIME.labels(view).observe(timer.seconds)
+		if fanout[0]:
+			NOTIFICATION_FANOUT.labels(view).observe(fanout[0])
+		return response
+
+
+def metrics_view(request):
+	"""
+	Exposición en texto para Prometheus. Con METRICS_TOKEN hay que enviar
+	"Authorization: Bearer <token>"; sin él sólo está abierto en DEBUG.
+	"""
+	expected = getattr(settings, "METRICS_TOKEN", "")
+	if expected:
+		provided = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+		if not secrets.compare_digest(provided.encode(), expected.encode()):
+			return HttpResponse(
+				"Token de métricas inválido", status=401, content_type="text/plain"
+			)
+	elif not settings.DEBUG:
+		return HttpResponse(
+			"Define METRICS_TOKEN para exponer las métricas", status=403, content_type="text/plain"
+		)
+
+	if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+		registry = CollectorRegistry()
+		multiprocess.MultiProcessCollector(registry)
+	else:
+		registry = REGISTRY
+	return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
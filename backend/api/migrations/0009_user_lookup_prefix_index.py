@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def create_prefix_index(apps, schema_editor):
+    # Solo PostgreSQL: índice de patrón sobre UPPER(username) para que
+    # username__istartswith use el índice. Los campos únicos (username,
+    # id_number) ya tienen su índice *_like creado por Django.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS auth_user_username_upper_like '
+        'ON auth_user (UPPER("username"::text) text_pattern_ops)'
+    )
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS auth_user_username_upper_like')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_pushsubscription'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_card_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['due_date', 'list'], name='card_due_date_list_idx'),
+        ),
+    ]
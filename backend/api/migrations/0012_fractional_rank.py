@@ -0,0 +1,74 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def spread_keys(count):
+    # Copia de api.ranking.spread_keys: la migración no debe depender del código actual
+    length = 1
+    while len(DIGITS) ** length < (count + 1) * 2:
+        length += 1
+    step = len(DIGITS) ** length // (count + 1)
+    keys = []
+    for i in range(1, count + 1):
+        value = step * i
+        digits = []
+        for _ in range(length):
+            value, remainder = divmod(value, len(DIGITS))
+            digits.append(DIGITS[remainder])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def populate_ranks(apps, schema_editor):
+    # Convertir el orden actual (position, id) en claves fraccionarias
+    List = apps.get_model('api', 'List')
+    Card = apps.get_model('api', 'Card')
+    for model, parent in ((List, 'board_id'), (Card, 'list_id')):
+        parent_ids = model.objects.values_list(parent, flat=True).distinct()
+        for parent_id in parent_ids.iterator():
+            items = list(model.objects.filter(**{parent: parent_id}).order_by('position', 'id').only('id'))
+            for item, key in zip(items, spread_keys(len(items))):
+                item.rank = key
+            model.objects.bulk_update(items, ['rank'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_card_due_date_list_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='card',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.AlterModelOptions(
+            name='list',
+            options={'ordering': ['rank', 'id']},
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='rank',
+            field=models.CharField(default='', help_text='Clave de orden fraccionaria (ver api.ranking)', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='rank',
+            field=models.CharField(default='', help_text='Clave de orden fraccionaria (ver api.ranking)', max_length=255),
+        ),
+        migrations.RunPython(populate_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['list', 'rank'], name='card_list_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='list',
+            index=models.Index(fields=['board', 'rank'], name='list_board_rank_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_fractional_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='is_template',
+            field=models.BooleanField(default=False, help_text='Plantilla reutilizable (no aparece en el listado de tableros)'),
+        ),
+    ]
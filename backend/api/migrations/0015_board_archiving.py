@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_deletion_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='card',
+            name='card_due_date_list_idx',
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='archived',
+            field=models.BooleanField(default=False, help_text='Tablero de un periodo anterior: fuera de listados, calendario y búsqueda'),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(condition=models.Q(('archived', False)), fields=['due_date', 'list'], name='card_active_due_date_idx'),
+        ),
+    ]
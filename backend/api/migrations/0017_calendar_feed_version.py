@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_request_user_proxy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='feed_version',
+            field=models.PositiveIntegerField(default=1, help_text='Se incrementa al cambiar datos del feed .ics que no tocan Card.updated_at'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='calendar_secret',
+            field=models.CharField(blank=True, default='', help_text='Se mezcla en la firma de las URLs del feed .ics; al cambiarlo dejan de valer', max_length=32),
+        ),
+    ]
@@ -10,17 +10,84 @@ class Profile(models.Model):
 	user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
 	role = models.CharField(max_length=10, choices=Role.choices, default=Role.STUDENT)
 	id_number = models.CharField(max_length=10, unique=True, null=True, blank=True, help_text="ID de 10 dígitos")
+	calendar_secret = models.CharField(
+		max_length=32, blank=True, default="",
+		help_text="Se mezcla en la firma de las URLs del feed .ics; al cambiarlo dejan de valer",
+	)
 
 	def __str__(self) -> str:
 		return f"{self.user.username} ({self.get_role_display()})"
 
 
+class RequestUser(User):
+	"""
+	Usuario autenticado construido desde los claims del JWT (ver
+	api.authentication). Los campos que no vienen en el token y el perfil se
+	cargan bajo demanda desde la caché local de usuarios en vez de con una
+	consulta por campo.
+	"""
+
+	class Meta:
+		proxy = True
+
+	def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+		deferred = self.get_deferred_fields()
+		if fields is None or not set(fields) <= deferred:
+			return super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+		from .authentication import load_user_values
+
+		values = load_user_values(self.pk)
+		if values is None:
+			raise User.DoesNotExist("El usuario ya no existe")
+		for name in deferred:
+			setattr(self, name, values["user"][name])
+		self._state.fields_cache.setdefault("profile", self._profile_from(values))
+
+	@staticmethod
+	def _profile_from(values):
+		profile = values["profile"]
+		if profile is None:
+			return None
+		return Profile.from_db("default", list(profile), list(profile.values()))
+
+	@property
+	def profile(self):
+		if "profile" not in self._state.fields_cache:
+			from .authentication import load_user_values
+
+			values = load_user_values(self.pk)
+			self._state.fields_cache["profile"] = self._profile_from(values) if values else None
+		profile = self._state.fields_cache["profile"]
+		if profile is None:
+			raise User.profile.RelatedObjectDoesNotExist("El usuario no tiene perfil.")
+		return profile
+
+	@profile.setter
+	def profile(self, value):
+		self._state.fields_cache["profile"] = value
+
+
 class Board(models.Model):
 	name = models.CharField(max_length=200)
 	owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="owned_boards")
 	members = models.ManyToManyField(User, related_name="boards", blank=True)
 	color = models.CharField(max_length=20, blank=True, default="")
 	due_date = models.DateField(null=True, blank=True, help_text="Fecha límite del proyecto/tablero")
+	is_template = models.BooleanField(
+		default=False, help_text="Plantilla reutilizable (no aparece en el listado de tableros)"
+	)
+	pending_delete = models.BooleanField(
+		default=False, help_text="Eliminación en curso en segundo plano (oculto)"
+	)
+	archived = models.BooleanField(
+		default=False,
+		help_text="Tablero de un periodo anterior: fuera de listados, calendario y búsqueda",
+	)
+	archived_at = models.DateTimeField(null=True, blank=True)
+	feed_version = models.PositiveIntegerField(
+		default=1,
+		help_text="Se incrementa al cambiar datos del feed .ics que no tocan Card.updated_at",
+	)
 	created_at = models.DateTimeField(auto_now_add=True)
 
 	class Meta:
@@ -34,9 +101,15 @@ class List(models.Model):
 	board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name="lists")
 	title = models.CharField(max_length=200)
 	position = models.PositiveIntegerField(default=0)
+	rank = models.CharField(
+		max_length=255, default="", help_text="Clave de orden fraccionaria (ver api.ranking)"
+	)
 
 	class Meta:
-		ordering = ["position", "id"]
+		ordering = ["rank", "id"]
+		indexes = [
+			models.Index(fields=["board", "rank"], name="list_board_rank_idx"),
+		]
 
 	def __str__(self) -> str:
 		return f"{self.title} ({self.board.name})"
@@ -64,12 +137,26 @@ class Card(models.Model):
 	due_date = models.DateField(null=True, blank=True)
 	priority = models.CharField(max_length=10, choices=Priority.choices, default=Priority.MED)
 	position = models.PositiveIntegerField(default=0)
+	rank = models.CharField(
+		max_length=255, default="", help_text="Clave de orden fraccionaria (ver api.ranking)"
+	)
 	created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="created_cards")
 	assignees = models.ManyToManyField(User, related_name="assigned_cards", blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True)
+	# Copia de Board.archived para que las consultas calientes usen índices parciales
+	archived = models.BooleanField(default=False)
 
 	class Meta:
-		ordering = ["position", "id"]
+		ordering = ["rank", "id"]
+		indexes = [
+			# Consultas de calendario por rango de fechas (sólo tarjetas activas)
+			models.Index(
+				fields=["due_date", "list"], name="card_active_due_date_idx",
+				condition=models.Q(archived=False),
+			),
+			models.Index(fields=["list", "rank"], name="card_list_rank_idx"),
+		]
 
 	def __str__(self) -> str:
 		return self.title
@@ -152,3 +239,30 @@ class PushSubscription(models.Model):
 		return f"{self.user.username} - {self.endpoint[:50]}..."
 
 # Create your models here.
+
+
+class DeletionJob(models.Model):
+	"""
+	Eliminación pendiente de un tablero o de una cuenta. El objeto queda oculto
+	al crear el trabajo y sus datos se borran por lotes en segundo plano
+	(ver api.deletion).
+	"""
+	class Kind(models.TextChoices):
+		BOARD = "board", "Tablero"
+		USER = "user", "Usuario"
+
+	kind = models.CharField(max_length=10, choices=Kind.choices)
+	object_id = models.PositiveIntegerField()
+	requested_by = models.ForeignKey(
+		User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+	)
+	created_at = models.DateTimeField(auto_now_add=True)
+	started_at = models.DateTimeField(null=True, blank=True)
+	finished_at = models.DateTimeField(null=True, blank=True)
+	deleted_rows = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		ordering = ["id"]
+
+	def __str__(self) -> str:
+		return f"{self.kind} {self.object_id}"
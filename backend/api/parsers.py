@@ -0,0 +1,30 @@
+"""
+Parsers de la API: JSON con orjson y MessagePack.
+"""
+import msgpack
+import orjson
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+from .renderers import MessagePackRenderer, ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+	renderer_class = ORJSONRenderer
+
+	def parse(self, stream, media_type=None, parser_context=None):
+		try:
+			return orjson.loads(stream.read())
+		except orjson.JSONDecodeError as exc:
+			raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackParser(BaseParser):
+	media_type = 'application/msgpack'
+	renderer_class = MessagePackRenderer
+
+	def parse(self, stream, media_type=None, parser_context=None):
+		try:
+			return msgpack.unpackb(stream.read(), raw=False)
+		except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+			raise ParseError('MessagePack parse error - %s' % str(exc))
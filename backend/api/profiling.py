@@ -0,0 +1,251 @@
+"""
+Perfilado bajo demanda de una petición.
+
+Un usuario staff añade a cualquier petición la cabecera "X-Profile: sample"
+(o "cprofile"), o el parámetro ?_profile=sample. Sólo esa petición se
+perfila; el resto sigue igual. Hay dos modos:
+
+  sample    un hilo toma la pila del hilo de la petición cada SAMPLE_INTERVAL
+            segundos y la guarda en formato "folded" (una línea por pila con
+            su número de muestras), que leen directamente flamegraph.pl y
+            speedscope. Es el modo por defecto y el de menos sobrecoste.
+  cprofile  cProfile con todas las llamadas; se guarda el .prof (pstats,
+            para snakeviz o flameprof) y las funciones con más tiempo acumulado.
+
+En los dos modos se guardan también las consultas SQL (texto, duración y
+origen en el código del proyecto) en un JSON. Los archivos quedan en
+PROFILING["DIR"] y la respuesta lleva su id en X-Profile-Id; se descargan
+con GET /api/profiles/<id>/?file=json|folded|prof.
+
+Las respuestas en streaming (p. ej. calendar/export/) hacen el trabajo al
+recorrer el cuerpo: se leen enteras dentro del perfil y se devuelven ya
+generadas, así que esa petición pierde el streaming.
+
+Sólo se perfila una petición a la vez por proceso: si ya hay otra en curso
+la petición se atiende normalmente con "X-Profile: busy".
+"""
+import cProfile
+import io
+import json
+import logging
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .authentication import ClaimsJWTAuthentication
+from .query_budget import call_site
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+	"ENABLED": False,
+	"DIR": None,  # por defecto BASE_DIR / "profiles"
+	"SAMPLE_INTERVAL": 0.005,
+	"TOP_FUNCTIONS": 40,
+}
+
+MODES = ("sample", "cprofile")
+FORMATS = {"json": ".json", "folded": ".folded", "prof": ".prof"}
+
+_PROFILE_ID = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}$")
+_PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+_lock = threading.Lock()
+
+
+def _config():
+	return {**DEFAULTS, **getattr(settings, "PROFILING", {})}
+
+
+def _profile_dir(config=None):
+	return Path((config or _config())["DIR"] or Path(settings.BASE_DIR) / "profiles")
+
+
+def profile_file(profile_id, fmt):
+	"""Ruta de un archivo de perfil existente, o None si el id o el formato no son válidos."""
+	if fmt not in FORMATS or not _PROFILE_ID.match(profile_id or ""):
+		return None
+	path = _profile_dir() / f"{profile_id}{FORMATS[fmt]}"
+	return path if path.is_file() else None
+
+
+def _requested_mode(request):
+	value = (request.headers.get("X-Profile") or request.GET.get("_profile") or "").strip().lower()
+	if not value:
+		return None
+	return value if value in MODES else "sample"
+
+
+def _is_staff(request):
+	user = getattr(request, "user", None)
+	if user is None or not user.is_authenticated:
+		# Las peticiones a la API se autentican con JWT dentro de la vista: comprobarlo aquí
+		try:
+			result = ClaimsJWTAuthentication().authenticate(request)
+		except (AuthenticationFailed, InvalidToken, TokenError):
+			return False
+		if result is None:
+			return False
+		user = result[0]
+	# is_staff sale de los claims del token, que pueden ser de antes de quitarle el
+	# permiso: se confirma en la base de datos (sólo cuando se pide un perfil)
+	staff = User.objects.filter(pk=user.pk, is_staff=True, is_active=True)
+	return user.is_staff and staff.exists()
+
+
+def _frame_label(code):
+	filename = code.co_filename
+	if filename.startswith(_PROJECT_ROOT):
+		filename = filename[len(_PROJECT_ROOT) + 1:]
+	elif "site-packages" in filename:
+		filename = filename.split("site-packages", 1)[1].lstrip("/\\")
+	return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+	"""Muestrea la pila de otro hilo y acumula las pilas en formato folded."""
+
+	def __init__(self, thread_id, interval):
+		super().__init__(name="request-profiler", daemon=True)
+		self.thread_id = thread_id
+		self.interval = interval
+		self.stacks = Counter()
+		self.stopped = threading.Event()
+
+	def run(self):
+		while not self.stopped.wait(self.interval):
+			frame = sys._current_frames().get(self.thread_id)
+			labels = []
+			while frame is not None:
+				labels.append(_frame_label(frame.f_code))
+				frame = frame.f_back
+			if labels:
+				self.stacks[";".join(reversed(labels))] += 1
+
+	def stop(self):
+		self.stopped.set()
+		self.join()
+
+	def folded(self):
+		return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class _QueryLog:
+	def __init__(self):
+		self.queries = []
+
+	def __call__(self, execute, sql, params, many, context):
+		started = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			self.queries.append({
+				"sql": sql,
+				"ms": round((time.perf_counter() - started) * 1000, 3),
+				"many": many,
+				"from": [f"{path}:{line} {name}" for path, line, name in call_site()],
+			})
+
+
+class ProfilingMiddleware:
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		mode = _requested_mode(request)
+		if mode is None:
+			return self.get_response(request)
+		config = _config()
+		if not config["ENABLED"] or not _is_staff(request):
+			return self.get_response(request)
+		if not _lock.acquire(blocking=False):
+			response = self.get_response(request)
+			response["X-Profile"] = "busy"
+			return response
+		try:
+			return self.profile(request, mode, config)
+		finally:
+			_lock.release()
+
+	def profile(self, request, mode, config):
+		queries = _QueryLog()
+		profiler = sampler = None
+		if mode == "cprofile":
+			profiler = cProfile.Profile()
+		else:
+			sampler = _Sampler(threading.get_ident(), config["SAMPLE_INTERVAL"])
+
+		started = time.perf_counter()
+		with ExitStack() as stack:
+			for conn in connections.all():
+				stack.enter_context(conn.execute_wrapper(queries))
+			if sampler is not None:
+				sampler.start()
+				stack.callback(sampler.stop)
+			if profiler is not None:
+				profiler.enable()
+				stack.callback(profiler.disable)
+			response = self.get_response(request)
+			if response.streaming:
+				response.streaming_content = [b"".join(response.streaming_content)]
+		elapsed = time.perf_counter() - started
+
+		profile_id = f"{datetime.now():%Y%m%d-%H%M%S}-{secrets.token_hex(4)}"
+		try:
+			self.save(
+				profile_id, request, response, mode, elapsed, queries, profiler, sampler, config
+			)
+		except OSError:
+			logger.exception("No se pudo guardar el perfil %s", profile_id)
+			response["X-Profile"] = "error"
+			return response
+		logger.info(
+			"Perfil %s: %s %s %.0f ms, %s consultas",
+			profile_id, request.method, request.path, elapsed * 1000, len(queries.queries),
+		)
+		response["X-Profile"] = mode
+		response["X-Profile-Id"] = profile_id
+		return response
+
+	def save(
+		self, profile_id, request, response, mode, elapsed, queries, profiler, sampler, config
+	):
+		directory = _profile_dir(config)
+		directory.mkdir(parents=True, exist_ok=True)
+		match = getattr(request, "resolver_match", None)
+		summary = {
+			"id": profile_id,
+			"mode": mode,
+			"method": request.method,
+			"path": request.get_full_path(),
+			"view": match.view_name if match is not None else None,
+			"status": response.status_code,
+			"total_ms": round(elapsed * 1000, 2),
+			"sql_count": len(queries.queries),
+			"sql_ms": round(sum(query["ms"] for query in queries.queries), 2),
+			"queries": queries.queries,
+		}
+		if sampler is not None:
+			summary["samples"] = sum(sampler.stacks.values())
+			(directory / f"{profile_id}.folded").write_text(sampler.folded(), encoding="utf-8")
+		if profiler is not None:
+			profiler.dump_stats(directory / f"{profile_id}.prof")
+			output = io.StringIO()
+			stats = pstats.Stats(profiler, stream=output).sort_stats("cumulative")
+			stats.print_stats(config["TOP_FUNCTIONS"])
+			summary["top_functions"] = output.getvalue()
+		(directory / f"{profile_id}.json").write_text(
+			json.dumps(summary, indent=2, default=str), encoding="utf-8"
+		)
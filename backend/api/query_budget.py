@@ -0,0 +1,166 @@
+"""
+Presupuesto de consultas SQL por petición y detector de N+1.
+
+QueryBudgetMiddleware cuenta las consultas de cada petición (en desarrollo
+todas, en producción una muestra) con un execute_wrapper sobre las
+conexiones. Agrupa las consultas por forma (el SQL con los parámetros ya
+separados y las listas IN (...) colapsadas) y por el punto del código del
+proyecto que las lanzó: si la misma forma se repite desde el mismo sitio al
+menos N_PLUS_ONE_THRESHOLD veces, se registra como N+1 con un resumen de la
+pila.
+
+Las vistas pueden declarar su presupuesto con @query_budget(n) (en una
+función, una clase APIView o un método / acción de ViewSet). Si una
+petición lo supera se registra y, con QUERY_BUDGET["RAISE"] (pensado para
+tests), se lanza QueryBudgetExceeded.
+
+Configuración en settings.QUERY_BUDGET (se lee en cada petición, así que
+override_settings funciona en tests).
+"""
+import logging
+import random
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+	"ENABLED": False,
+	"SAMPLE_RATE": 1.0,
+	"RAISE": False,
+	"N_PLUS_ONE_THRESHOLD": 5,
+	"DEFAULT_BUDGET": None,
+	"HEADER": False,  # añade X-Query-Count a la respuesta
+}
+
+_PLACEHOLDER_LIST = re.compile(r"(?:%s|\?)(?:\s*,\s*(?:%s|\?))+")
+_PROJECT_ROOT = str(Path(settings.BASE_DIR).resolve())
+_STACK_DEPTH = 3
+# Módulos con execute_wrapper propios: nunca son el origen de una consulta
+_INSTRUMENTATION = {
+	str(Path(__file__).with_name(name))
+	for name in ("query_budget.py", "metrics.py", "profiling.py")
+}
+
+
+class QueryBudgetExceeded(AssertionError):
+	"""Una vista hizo más consultas que las declaradas con @query_budget."""
+
+
+def query_budget(max_queries):
+	"""Declara el número máximo de consultas SQL de una vista."""
+
+	def decorator(view):
+		view.query_budget = max_queries
+		return view
+
+	return decorator
+
+
+def _shape(sql):
+	return _PLACEHOLDER_LIST.sub("%s, ...", sql)
+
+
+def call_site(depth=_STACK_DEPTH):
+	"""Últimos frames del proyecto (no de Django ni de librerías) que llevaron a la consulta."""
+	frames = []
+	frame = sys._getframe(2)
+	while frame is not None and len(frames) < depth:
+		filename = frame.f_code.co_filename
+		if (
+			filename.startswith(_PROJECT_ROOT)
+			and filename not in _INSTRUMENTATION
+			and "site-packages" not in filename
+		):
+			path = filename[len(_PROJECT_ROOT) + 1:]
+			frames.append((path, frame.f_lineno, frame.f_code.co_name))
+		frame = frame.f_back
+	return tuple(frames)
+
+
+class _Recorder:
+	def __init__(self):
+		self.count = 0
+		self.shapes = Counter()
+		self.stacks = {}
+
+	def __call__(self, execute, sql, params, many, context):
+		self.count += 1
+		stack = call_site()
+		key = (_shape(sql), stack[0] if stack else None)
+		self.shapes[key] += 1
+		self.stacks.setdefault(key, stack)
+		return execute(sql, params, many, context)
+
+
+def _view_budget(request):
+	match = getattr(request, "resolver_match", None)
+	if match is None:
+		return None
+	func = match.func
+	cls = getattr(func, "cls", None) or getattr(func, "view_class", None)
+	if cls is not None:
+		# ViewSet: método de la acción (list, retrieve, acciones @action...)
+		action = (getattr(func, "actions", None) or {}).get(request.method.lower())
+		handler = getattr(cls, action or request.method.lower(), None)
+		if hasattr(handler, "query_budget"):
+			return handler.query_budget
+		return getattr(cls, "query_budget", None)
+	return getattr(func, "query_budget", None)
+
+
+def _view_name(request):
+	match = getattr(request, "resolver_match", None)
+	return match.view_name if match is not None and match.view_name else request.path
+
+
+class QueryBudgetMiddleware:
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		config = {**DEFAULTS, **getattr(settings, "QUERY_BUDGET", {})}
+		if not config["ENABLED"] or random.random() >= config["SAMPLE_RATE"]:
+			return self.get_response(request)
+
+		recorder = _Recorder()
+		with ExitStack() as stack:
+			for conn in connections.all():
+				stack.enter_context(conn.execute_wrapper(recorder))
+			response = self.get_response(request)
+
+		if config["HEADER"]:
+			response["X-Query-Count"] = str(recorder.count)
+		self.report(request, recorder, config)
+		return response
+
+	def report(self, request, recorder, config):
+		view = _view_name(request)
+		for key, repeated in recorder.shapes.items():
+			if repeated < config["N_PLUS_ONE_THRESHOLD"]:
+				continue
+			origin = " <- ".join(
+				f"{path}:{line} {name}" for path, line, name in recorder.stacks[key]
+			) or "?"
+			logger.warning(
+				"Posible N+1 en %s %s: %s consultas iguales\n   SQL: %s\n   Desde: %s",
+				request.method, view, repeated, key[0][:200], origin,
+			)
+
+		budget = _view_budget(request)
+		if budget is None:
+			budget = config["DEFAULT_BUDGET"]
+		if budget is not None and recorder.count > budget:
+			message = (
+				f"{request.method} {view} hizo {recorder.count} consultas SQL "
+				f"(presupuesto {budget})"
+			)
+			logger.warning(message)
+			if config["RAISE"]:
+				raise QueryBudgetExceeded(message)
@@ -0,0 +1,171 @@
+"""
+Claves de orden fraccionarias (lexicográficas) para Card.rank y List.rank.
+
+Una clave es una cadena de dígitos base 36 ("0-9a-z") que se interpreta como
+la parte fraccionaria de un número en [0, 1) y nunca termina en "0"; así el
+orden lexicográfico coincide con el numérico y siempre existe una clave entre
+dos claves distintas. Mover un elemento sólo requiere calcular una clave entre
+sus nuevos vecinos y actualizar esa fila.
+
+Se usan sólo dígitos y minúsculas porque su orden es el mismo en cualquier
+collation (en PostgreSQL con locale, mayúsculas y minúsculas se intercalan).
+"""
+import logging
+
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+
+# Si una clave nueva supera esta longitud se redistribuyen las de su contenedor
+RANK_REBALANCE_LENGTH = 24
+
+
+def _midpoint(a, b):
+	"""Clave estrictamente entre a y b ("" = 0, None = 1). Requiere a < b."""
+	if b is not None:
+		# Copiar el prefijo común
+		n = 0
+		while n < len(b) and (a[n] if n < len(a) else "0") == b[n]:
+			n += 1
+		if n > 0:
+			return b[:n] + _midpoint(a[n:], b[n:])
+	digit_a = DIGITS.index(a[0]) if a else 0
+	digit_b = DIGITS.index(b[0]) if b is not None else BASE
+	if digit_b - digit_a > 1:
+		return DIGITS[(digit_a + digit_b) // 2]
+	# Dígitos consecutivos
+	if b is not None and len(b) > 1:
+		return b[:1]
+	return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a=None, b=None):
+	"""
+	Devuelve una clave entre a y b (None = sin vecino por ese lado).
+	Para añadir al final o al principio se incrementa / decrementa el primer
+	dígito mientras se pueda, de modo que las claves crecen despacio.
+	"""
+	a = a or None
+	b = b or None
+	if a is not None and b is not None and a >= b:
+		raise ValueError(f"{a!r} >= {b!r}")
+	if a is None and b is None:
+		return DIGITS[BASE // 2]
+	if b is None:
+		digit = DIGITS.index(a[0])
+		if digit < BASE - 1:
+			return DIGITS[digit + 1]
+		return a[0] + key_between(a[1:] or None, None)
+	if a is None:
+		digit = DIGITS.index(b[0])
+		if digit > 1:
+			return DIGITS[digit - 1]
+		if digit == 1:
+			return DIGITS[1] if len(b) > 1 else DIGITS[0] + key_between(None, None)
+		return DIGITS[0] + key_between(None, b[1:])
+	return _midpoint(a, b)
+
+
+def spread_keys(count):
+	"""count claves de igual longitud repartidas uniformemente (para redistribuir)."""
+	length = 1
+	while BASE ** length < (count + 1) * 2:
+		length += 1
+	step = BASE ** length // (count + 1)
+	keys = []
+	for i in range(1, count + 1):
+		value = step * i
+		digits = []
+		for _ in range(length):
+			value, remainder = divmod(value, BASE)
+			digits.append(DIGITS[remainder])
+		keys.append("".join(reversed(digits)).rstrip("0"))
+	return keys
+
+
+def rank_for_index(queryset, index=None):
+	"""
+	Clave para colocar un elemento en la posición ``index`` (0 = primero) de
+	``queryset`` (los hermanos, ya sin el propio elemento). Sin índice, o con uno
+	mayor que el número de hermanos, va al final. Una sola consulta.
+	"""
+	queryset = queryset.order_by("rank", "id").values_list("rank", flat=True)
+	if index is None:
+		last = queryset.reverse().first()
+		return key_between(last, None)
+	index = max(0, int(index))
+	if index == 0:
+		return key_between(None, queryset.first())
+	neighbours = list(queryset[index - 1:index + 1])
+	before = neighbours[0] if neighbours else queryset.reverse().first()
+	after = neighbours[1] if len(neighbours) > 1 else None
+	if after is not None and before == after:
+		# Claves duplicadas (datos antiguos): no hay hueco, redistribuir después
+		after = None
+	return key_between(before, after)
+
+
+def rebalance(queryset):
+	"""Reasigna claves cortas y equiespaciadas a todos los elementos del queryset."""
+	items = list(queryset.order_by("rank", "id").only("id", "rank"))
+	for item, key in zip(items, spread_keys(len(items))):
+		item.rank = key
+	queryset.model.objects.bulk_update(items, ["rank"], batch_size=500)
+
+
+def rebalance_if_needed(rank, queryset):
+	"""
+	Si la clave ya es larga, redistribuye el contenedor cuando se confirme la
+	transacción en curso. Un fallo sólo se registra: el movimiento ya está guardado.
+	"""
+	if len(rank) <= RANK_REBALANCE_LENGTH:
+		return
+
+	def run():
+		try:
+			with transaction.atomic():
+				rebalance(queryset)
+		except DatabaseError:
+			logger.exception(
+				"No se pudieron redistribuir las claves de orden de %s", queryset.model.__name__
+			)
+
+	transaction.on_commit(run)
+
+
+def ranks_for_inserts(existing, positions):
+	"""
+	Claves para insertar varios elementos a la vez.
+	``existing``: claves ordenadas de los elementos que se quedan en su sitio.
+	``positions``: índice final (en la secuencia resultante) de cada elemento nuevo.
+	Devuelve una clave por posición, en el mismo orden que ``positions``.
+	"""
+	sequence = [(key, False) for key in existing]
+	for i in sorted(range(len(positions)), key=lambda i: positions[i]):
+		index = min(max(int(positions[i]), 0), len(sequence))
+		sequence.insert(index, (i, True))
+
+	result = [None] * len(positions)
+	previous = None
+	j = 0
+	while j < len(sequence):
+		value, inserted = sequence[j]
+		if not inserted:
+			previous = value or None
+			j += 1
+			continue
+		# Tramo de elementos nuevos consecutivos entre dos claves existentes
+		k = j
+		while k < len(sequence) and sequence[k][1]:
+			k += 1
+		following = sequence[k][0] if k < len(sequence) else None
+		if previous is not None and following is not None and previous >= following:
+			following = None  # claves duplicadas de datos antiguos
+		for m in range(j, k):
+			previous = key_between(previous, following)
+			result[sequence[m][0]] = previous
+		j = k
+	return result
@@ -0,0 +1,41 @@
+"""
+Renderers de la API: JSON con orjson y MessagePack.
+"""
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Tipos que orjson / msgpack no conocen (lazy strings, Decimal, QuerySet, ...)
+# se convierten igual que en el encoder JSON de DRF
+_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+	"""JSONRenderer respaldado por orjson (misma negociación: application/json)."""
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		if data is None:
+			return b''
+
+		# Las fechas también pasan por el encoder de DRF ("Z" en lugar de "+00:00")
+		option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+		if self.get_indent(accepted_media_type, renderer_context or {}):
+			option |= orjson.OPT_INDENT_2
+		ret = orjson.dumps(data, default=_default, option=option)
+		# Igual que DRF: escapar U+2028 / U+2029 para que la salida sea JavaScript válido
+		return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class MessagePackRenderer(BaseRenderer):
+	"""Renderer para Accept: application/msgpack."""
+
+	media_type = 'application/msgpack'
+	format = 'msgpack'
+	charset = None
+	render_style = 'binary'
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		if data is None:
+			return b''
+		return msgpack.packb(data, default=_default, use_bin_type=True)
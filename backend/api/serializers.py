@@ -1,29 +1,109 @@
 from django.contrib.auth.models import User
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import Board, List, Card, Label, Comment, ChecklistItem, ActivityLog, Notification, PushSubscription
 
 
+def _split_param(request, name):
+	if request is None or name not in request.query_params:
+		return None
+	return {value.strip() for value in request.query_params[name].split(",") if value.strip()}
+
+
+class SparseFieldsetMixin:
+	"""
+	Campos dispersos para lecturas (GET):
+	- ?fields=id,title  -> sólo se devuelven esos campos.
+	- ?expand=assignees -> de expandable_fields, sólo los indicados se anidan y
+	el resto se devuelve como ids. Sin ?expand se mantiene la salida de siempre.
+	setup_eager_loading() ajusta select_related/prefetch_related a lo pedido.
+	"""
+
+	# nombre del campo -> serializer usado al expandirlo
+	expandable_fields = {}
+
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		request = self.context.get("request")
+		if request is None or request.method != "GET":
+			return
+		fields = _split_param(request, "fields")
+		expand = _split_param(request, "expand")
+		if fields is not None:
+			for name in set(self.fields) - fields:
+				self.fields.pop(name)
+		if expand is not None:
+			for name, serializer_class in self.expandable_fields.items():
+				if name not in self.fields:
+					continue
+				many = self._is_many(name)
+				if name in expand:
+					self.fields[name] = serializer_class(many=many, read_only=True)
+				else:
+					self.fields[name] = serializers.PrimaryKeyRelatedField(
+						many=many, read_only=True
+					)
+
+	@classmethod
+	def _is_many(cls, name):
+		field = cls.Meta.model._meta.get_field(name)
+		return field.many_to_many or field.one_to_many
+
+	@classmethod
+	def setup_eager_loading(cls, queryset, request):
+		"""Precarga sólo las relaciones que la respuesta va a incluir."""
+		reading = request is not None and request.method == "GET"
+		fields = _split_param(request, "fields") if reading else None
+		expand = _split_param(request, "expand") if reading else None
+		for name, serializer_class in cls.expandable_fields.items():
+			if fields is not None and name not in fields:
+				continue
+			declared = cls._declared_fields.get(name)
+			nested = isinstance(declared, serializers.BaseSerializer)
+			expanded = name in expand if expand is not None else nested
+			related_model = cls.Meta.model._meta.get_field(name).related_model
+			if cls._is_many(name):
+				if expanded:
+					queryset = queryset.prefetch_related(name)
+				else:
+					only_ids = related_model.objects.only("id")
+					queryset = queryset.prefetch_related(Prefetch(name, queryset=only_ids))
+			elif expanded:
+				queryset = queryset.select_related(name)
+		return queryset
+
+
 class UserSlimSerializer(serializers.ModelSerializer):
 	class Meta:
 		model = User
 		fields = ("id", "username")
 
 
-class BoardSerializer(serializers.ModelSerializer):
+class BoardSlimSerializer(serializers.ModelSerializer):
+	class Meta:
+		model = Board
+		fields = ("id", "name")
+
+
+class BoardSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	owner = UserSlimSerializer(read_only=True)
 	members = UserSlimSerializer(many=True, read_only=True)
+	expandable_fields = {"owner": UserSlimSerializer, "members": UserSlimSerializer}
 
 	class Meta:
 		model = Board
-		fields = ("id", "name", "owner", "members", "color", "due_date", "created_at")
-		read_only_fields = ("id", "owner", "members", "created_at")
+		fields = (
+			"id", "name", "owner", "members", "color", "due_date", "is_template",
+			"archived", "archived_at", "created_at",
+		)
+		read_only_fields = ("id", "owner", "members", "archived", "archived_at", "created_at")
 
 
 class ListSerializer(serializers.ModelSerializer):
 	class Meta:
 		model = List
-		fields = ("id", "board", "title", "position")
-		read_only_fields = ("id", "board")
+		fields = ("id", "board", "title", "position", "rank")
+		read_only_fields = ("id", "board", "rank")
 
 
 class LabelSerializer(serializers.ModelSerializer):
@@ -33,11 +113,16 @@ class LabelSerializer(serializers.ModelSerializer):
 		read_only_fields = ("id", "board")
 
 
-class CardSerializer(serializers.ModelSerializer):
+class CardSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	assignees = UserSlimSerializer(many=True, read_only=True)
 	labels = LabelSerializer(many=True, read_only=True)
 	created_by = UserSlimSerializer(read_only=True)
 	list = serializers.PrimaryKeyRelatedField(queryset=List.objects.all(), required=False)
+	expandable_fields = {
+		"assignees": UserSlimSerializer,
+		"labels": LabelSerializer,
+		"created_by": UserSlimSerializer,
+	}
 
 	class Meta:
 		model = Card
@@ -49,12 +134,13 @@ class CardSerializer(serializers.ModelSerializer):
 			"due_date",
 			"priority",
 			"position",
+			"rank",
 			"created_by",
 			"assignees",
 			"labels",
 			"created_at",
 		)
-		read_only_fields = ("id", "created_by", "assignees", "labels", "created_at")
+		read_only_fields = ("id", "rank", "created_by", "assignees", "labels", "created_at")
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -82,8 +168,9 @@ class ActivityLogSerializer(serializers.ModelSerializer):
 		read_only_fields = ("id", "actor", "created_at")
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
 	board = serializers.PrimaryKeyRelatedField(read_only=True)
+	expandable_fields = {"board": BoardSlimSerializer}
 
 	class Meta:
 		model = Notification
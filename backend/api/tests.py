@@ -1,3 +1,1147 @@
-from django.test import TestCase
+import json
+import os
+import random
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import jwt
+import msgpack
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import deletion, views
+from .authentication import REVOCATION_CACHE, _TTLCache, _user_cache, invalidate_user_cache
+from .models import (
+	Board, Card, ChecklistItem, DeletionJob, Label, List, Notification, Profile,
+)
+from .query_budget import QueryBudgetExceeded, QueryBudgetMiddleware
+from .ranking import RANK_REBALANCE_LENGTH, key_between, ranks_for_inserts, spread_keys
+from .renderers import ORJSONRenderer
+
+PASSWORD = "clave-segura-123"
+
+
+def crear_usuario(username, role=Profile.Role.STUDENT, id_number=None, **extra):
+	user = User.objects.create_user(username, password=PASSWORD, **extra)
+	Profile.objects.create(user=user, role=role, id_number=id_number)
+	return user
+
+
+def crear_tablero(owner, members=(), cards=3, **extra):
+	"""Tablero con tres listas y `cards` tarjetas repartidas entre ellas."""
+	board = Board.objects.create(
+		name="Tablero", owner=owner, due_date=date.today() + timedelta(days=30), **extra
+	)
+	board.members.add(owner, *members)
+	lists = [
+		List.objects.create(board=board, title=title, position=i, rank="hmt"[i])
+		for i, title in enumerate(["Por hacer", "En curso", "Hecho"])
+	]
+	for i in range(cards):
+		Card.objects.create(
+			list=lists[0], title=f"Tarea {i}", position=i, rank=f"h{i:03d}", created_by=owner
+		)
+	return board, lists
+
+
+class ApiTestCase(TestCase):
+	def setUp(self):
+		cache.clear()
+		caches[REVOCATION_CACHE].clear()
+		_user_cache.clear()
+
+	def login(self, user):
+		"""Cliente con el access token que devuelve el login real."""
+		client = APIClient()
+		credentials = {"username": user.username, "password": PASSWORD}
+		response = client.post("/api/auth/login/", credentials, format="json")
+		self.assertEqual(response.status_code, 200, response.content)
+		client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+		client.tokens = response.json()
+		return client
+
+
+class ClaimsAuthenticationTests(ApiTestCase):
+	"""Autenticación desde los claims del JWT y revocación de tokens (api.authentication)."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER, "9000000000")
+
+	def test_token_lleva_los_claims_del_perfil(self):
+		client = self.login(self.teacher)
+		payload = jwt.decode(client.tokens["access"], options={"verify_signature": False})
+		self.assertEqual((payload["role"], payload["id_number"]), ("teacher", "9000000000"))
+		self.assertFalse(payload["is_staff"])
+
+	def test_login_y_refresh_llevan_los_claims(self):
+		client = self.login(self.teacher)
+		refresh = {"refresh": client.tokens["refresh"]}
+		refrescado = APIClient().post("/api/auth/refresh/", refresh, format="json").json()
+		tokens = {"login": client.tokens["access"], "refresh": refrescado["access"]}
+		for nombre, token in tokens.items():
+			with self.subTest(nombre):
+				payload = jwt.decode(token, options={"verify_signature": False})
+				self.assertEqual(payload["username"], "docente")
+				self.assertEqual(payload["profile_id"], self.teacher.profile.id)
+				self.assertEqual((payload["role"], payload["id_number"]), ("teacher", "9000000000"))
+				self.assertIn("claims_at", payload)
+
+	def test_rol_desde_el_token_sin_consultar_el_perfil(self):
+		board, lists = crear_tablero(self.teacher, cards=1)
+		card = lists[0].cards.get()
+		client = self.login(self.teacher)
+		with CaptureQueriesContext(connection) as queries:
+			me = client.get("/api/me/")
+			# Editar la fecha límite depende del rol de quien edita
+			cambio = {"due_date": str(board.due_date)}
+			response = client.patch(f"/api/cards/{card.id}/", cambio, format="json")
+		self.assertEqual((me.json()["role"], me.json()["id_number"]), ("teacher", "9000000000"))
+		self.assertEqual(response.status_code, 200, response.content)
+		sql = [query["sql"] for query in queries.captured_queries]
+		self.assertFalse([query for query in sql if 'FROM "api_profile"' in query])
+
+	def test_no_consulta_el_usuario_en_cada_peticion(self):
+		client = self.login(self.teacher)
+		with CaptureQueriesContext(connection) as queries:
+			response = client.get("/api/notifications/")
+		self.assertEqual(response.status_code, 200)
+		sql = [query["sql"] for query in queries.captured_queries]
+		self.assertFalse([query for query in sql if 'FROM "auth_user"' in query])
+
+	def test_usuario_desactivado_deja_de_autenticar(self):
+		client = self.login(self.teacher)
+		self.teacher.is_active = False
+		self.teacher.save()
+		self.assertEqual(client.get("/api/notifications/").status_code, 401)
+
+	def test_staff_degradado_pierde_el_permiso(self):
+		self.teacher.is_staff = True
+		self.teacher.save()
+		client = self.login(self.teacher)
+		self.assertTrue(client.get("/api/me/").json()["is_staff"])
+		self.teacher.is_staff = False
+		self.teacher.save()
+		self.assertFalse(client.get("/api/me/").json()["is_staff"])
+
+	def test_eliminar_cuenta_revoca_el_token(self):
+		client = self.login(self.teacher)
+		self.assertEqual(client.delete("/api/me/").status_code, 200)
+		self.assertEqual(client.get("/api/notifications/").status_code, 401)
+
+	def test_cache_local_de_otro_proceso_no_se_usa_tras_un_cambio(self):
+		client = self.login(self.teacher)
+		client.get("/api/me/")  # carga el usuario en la caché local
+		# Otro proceso desactiva la cuenta: su marca llega a la caché compartida,
+		# pero la caché local de este proceso sigue con la fila antigua
+		User.objects.filter(id=self.teacher.id).update(is_active=False)
+		with mock.patch.object(_user_cache, "pop"):
+			invalidate_user_cache(self.teacher.id)
+		self.assertEqual(client.get("/api/notifications/").status_code, 401)
+
+	def test_sin_cache_de_revocacion_se_lee_la_base_de_datos(self):
+		client = self.login(self.teacher)
+		# Cambio sin señales ni marca; la caché de revocación no responde
+		User.objects.filter(id=self.teacher.id).update(is_active=False)
+		with mock.patch.object(caches[REVOCATION_CACHE], "get", side_effect=ConnectionError):
+			self.assertEqual(client.get("/api/notifications/").status_code, 401)
+
+	def test_cache_local_acotada(self):
+		cache_local = _TTLCache(ttl=60, maxsize=2)
+		with mock.patch("api.authentication.time.monotonic", return_value=0):
+			cache_local.set(1, "a")
+			cache_local.set(2, "b")
+			cache_local.get(1)  # la 2 pasa a ser la usada hace más tiempo
+			cache_local.set(3, "c")
+			self.assertEqual([cache_local.get(key) for key in (1, 2, 3)], ["a", None, "c"])
+		with mock.patch("api.authentication.time.monotonic", return_value=61):
+			cache_local.set(4, "d")
+			self.assertEqual(len(cache_local), 1)
+			self.assertEqual(cache_local.get(4), "d")
+
+	def test_refresh_renueva_el_rol(self):
+		client = self.login(self.teacher)
+		self.teacher.profile.role = Profile.Role.STUDENT
+		self.teacher.profile.save()
+		self.assertEqual(client.get("/api/me/").json()["role"], "student")
+		refresh = {"refresh": client.tokens["refresh"]}
+		response = APIClient().post("/api/auth/refresh/", refresh, format="json")
+		self.assertEqual(response.status_code, 200)
+		payload = jwt.decode(response.json()["access"], options={"verify_signature": False})
+		self.assertEqual(payload["role"], "student")
+
+
+class UserLookupTests(ApiTestCase):
+	"""Typeahead de usuarios (GET /api/users/lookup/)."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER, "9000000000")
+		self.student = crear_usuario("ana", id_number="1000000001")
+		self.stranger = crear_usuario("andres", id_number="1000000002")
+		crear_tablero(self.teacher, members=[self.student], cards=0)
+
+	def buscar(self, user, q):
+		response = self.login(user).get("/api/users/lookup/", {"q": q})
+		self.assertEqual(response.status_code, 200)
+		return response.json()
+
+	def test_docente_encuentra_estudiantes_sin_tablero_compartido(self):
+		self.assertEqual(
+			[row["username"] for row in self.buscar(self.teacher, "an")], ["ana", "andres"]
+		)
+		self.assertEqual(
+			self.buscar(self.teacher, "andr"),
+			[{"id": self.stranger.id, "username": "andres", "role": "student"}],
+		)
+
+	def test_estudiante_solo_encuentra_docentes_por_prefijo(self):
+		# La misma consulta de un docente queda cacheada; no debe servirse al estudiante
+		self.buscar(self.teacher, "an")
+		self.assertEqual(self.buscar(self.student, "an"), [])
+		self.assertEqual([row["username"] for row in self.buscar(self.student, "doc")], ["docente"])
+
+	def test_staff_ve_a_todos(self):
+		staff = crear_usuario("soporte", is_staff=True)
+		self.assertEqual([row["username"] for row in self.buscar(staff, "an")], ["ana", "andres"])
+
+	def test_no_expone_ni_enumera_el_id_number(self):
+		self.assertNotIn("id_number", self.buscar(self.teacher, "ana")[0])
+		self.assertEqual(self.buscar(self.teacher, "100000000"), [])
+		for user in (self.teacher, self.student):
+			with self.subTest(user=user.username):
+				encontrados = self.buscar(user, "1000000002")
+				self.assertEqual([row["username"] for row in encontrados], ["andres"])
+
+
+class CalendarFeedTests(ApiTestCase):
+	"""Feed .ics suscribible: tokens rotables y versión del contenido en Board.feed_version."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER, "9000000000")
+		self.student = crear_usuario("ana")
+		self.board, lists = crear_tablero(self.teacher, members=[self.student], cards=2)
+		self.card = lists[0].cards.first()
+		self.card.due_date = date.today()
+		self.card.save()
+		self.card.assignees.add(self.student)
+		self.client_api = self.login(self.teacher)
+		self.url = self.client_api.get("/api/calendar/feed-url/").json()["url"]
+
+	def feed(self, url=None, **headers):
+		return APIClient().get(url or self.url, headers=headers)
+
+	def test_regenerar_el_secreto_invalida_las_urls_anteriores(self):
+		self.assertEqual(self.feed().status_code, 200)
+		nueva = self.client_api.post("/api/calendar/feed-url/").json()["url"]
+		self.assertNotEqual(nueva, self.url)
+		self.assertEqual(self.feed().status_code, 404)
+		self.assertEqual(self.feed(nueva).status_code, 200)
+
+	def test_cambios_sin_updated_at_cambian_el_etag(self):
+		etag = self.feed()["ETag"]
+		self.student.username = "ana.maria"
+		self.student.save()
+		response = self.feed(If_None_Match=etag)
+		self.assertEqual(response.status_code, 200)
+		self.assertIn("Responsables: ana.maria", response.content.decode())
+
+		etag = response["ETag"]
+		self.board.name = "Otro nombre"
+		self.board.save()
+		self.assertNotEqual(self.feed()["ETag"], etag)
+
+	def test_el_login_no_invalida_el_feed(self):
+		etag = self.feed()["ETag"]
+		self.login(self.student)
+		self.assertEqual(self.feed(If_None_Match=etag).status_code, 304)
+
+
+class CalendarSummaryTests(ApiTestCase):
+	"""GET calendar/summary/: conteo de tarjetas por día y prioridad."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		self.student = crear_usuario("ana")
+		self.board, lists = crear_tablero(self.teacher, members=[self.student], cards=4)
+		self.otro, otras = crear_tablero(crear_usuario("otro", Profile.Role.TEACHER), cards=1)
+		self.hoy = date.today()
+		prioridades = [Card.Priority.HIGH, Card.Priority.MED, Card.Priority.MED, Card.Priority.LOW]
+		for card, priority in zip(lists[0].cards.all(), prioridades):
+			due_date = self.hoy if priority != Card.Priority.LOW else self.hoy + timedelta(days=2)
+			Card.objects.filter(id=card.id).update(due_date=due_date, priority=priority)
+		# Tarjeta de un tablero ajeno con la misma fecha
+		otras[0].cards.update(due_date=self.hoy)
+		self.client_api = self.login(self.student)
+
+	def resumen(self, **params):
+		params.setdefault("start", str(self.hoy))
+		params.setdefault("end", str(self.hoy + timedelta(days=6)))
+		return self.client_api.get("/api/calendar/summary/", params)
+
+	def test_conteo_por_dia_y_prioridad(self):
+		with self.assertNumQueries(1):
+			response = self.resumen()
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json(), [
+			{"date": str(self.hoy), "total": 3, "high": 1, "med": 2, "low": 0},
+			{"date": str(self.hoy + timedelta(days=2)), "total": 1, "high": 0, "med": 0, "low": 1},
+		])
+
+	def test_filtra_por_tablero_y_excluye_archivadas(self):
+		Card.objects.filter(list__board=self.board, priority=Card.Priority.HIGH).update(
+			archived=True
+		)
+		response = self.resumen(board_id=self.board.id, end=str(self.hoy))
+		self.assertEqual(
+			response.json(), [{"date": str(self.hoy), "total": 2, "high": 0, "med": 2, "low": 0}]
+		)
+		self.assertEqual(self.resumen(board_id=self.otro.id).json(), [])
+
+	def test_parametros_invalidos(self):
+		casos = [
+			{"start": "ayer"},
+			{"end": str(self.hoy - timedelta(days=1))},
+			{"end": str(self.hoy + timedelta(days=400))},
+			{"board_id": "uno"},
+		]
+		for params in casos:
+			with self.subTest(params=params):
+				self.assertEqual(self.resumen(**params).status_code, 400)
+
+
+class SparseFieldsetTests(ApiTestCase):
+	"""?fields= y ?expand= en las lecturas (api.serializers.SparseFieldsetMixin)."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		self.student = crear_usuario("ana")
+		self.board, self.lists = crear_tablero(self.teacher, members=[self.student], cards=0)
+		label = Label.objects.create(board=self.board, name="Docs")
+		# 2 tarjetas en la primera lista y 10 en la segunda, todas con responsable y etiqueta
+		for lst, total in ((self.lists[0], 2), (self.lists[1], 10)):
+			for i in range(total):
+				card = Card.objects.create(
+					list=lst, title=f"Tarea {i}", rank=f"h{i:03d}", created_by=self.teacher
+				)
+				card.assignees.add(self.student)
+				label.cards.add(card)
+		self.client_api = self.login(self.teacher)
+
+	def tarjetas(self, lst, **params):
+		with CaptureQueriesContext(connection) as queries:
+			response = self.client_api.get(f"/api/lists/{lst.id}/cards/", params)
+		self.assertEqual(response.status_code, 200)
+		return response.json(), len(queries)
+
+	def test_fields_filtra_los_campos(self):
+		cards, _ = self.tarjetas(self.lists[0], fields="id,title")
+		self.assertEqual([set(card) for card in cards], [{"id", "title"}] * 2)
+
+		Notification.objects.create(
+			recipient=self.teacher, board=self.board, notification_type="card_updated",
+			title="Tarea actualizada", message="Cambio",
+		)
+		response = self.client_api.get("/api/notifications/", {"fields": "id,read,board"})
+		self.assertEqual(set(response.json()[0]), {"id", "read", "board"})
+		self.assertEqual(response.json()[0]["board"], self.board.id)
+		response = self.client_api.get("/api/notifications/", {"expand": "board"})
+		self.assertEqual(response.json()[0]["board"]["id"], self.board.id)
+
+	def test_campos_desconocidos_se_ignoran(self):
+		cards, _ = self.tarjetas(self.lists[0], fields="id,no_existe")
+		self.assertEqual(set(cards[0]), {"id"})
+		# Un expand desconocido deja todas las relaciones como ids
+		cards, _ = self.tarjetas(self.lists[0], expand="no_existe")
+		self.assertEqual(cards[0]["assignees"], [self.student.id])
+		self.assertEqual(cards[0]["created_by"], self.teacher.id)
+
+	def test_expand_anida_solo_lo_pedido(self):
+		cards, _ = self.tarjetas(self.lists[0], expand="assignees")
+		self.assertEqual(cards[0]["assignees"], [{"id": self.student.id, "username": "ana"}])
+		self.assertEqual(cards[0]["labels"], [Label.objects.get().id])
+		self.assertEqual(cards[0]["created_by"], self.teacher.id)
+
+	def test_consultas_no_dependen_del_numero_de_tarjetas(self):
+		casos = {
+			"sin parámetros": {},
+			"expand": {"expand": "assignees,labels,created_by"},
+			"expand vacío": {"expand": ""},
+			"fields": {"fields": "id,title,assignees"},
+		}
+		consultas = {}
+		for nombre, params in casos.items():
+			with self.subTest(nombre):
+				_, pocas = self.tarjetas(self.lists[0], **params)
+				_, muchas = self.tarjetas(self.lists[1], **params)
+				self.assertEqual(pocas, muchas)
+				consultas[nombre] = pocas
+		# Sin relaciones pedidas no se precargan etiquetas ni se une created_by
+		_, solo_campos = self.tarjetas(self.lists[1], fields="id,title")
+		self.assertLess(solo_campos, consultas["fields"])
+		self.assertLess(consultas["fields"], consultas["sin parámetros"])
+
+
+class RenderersTests(ApiTestCase):
+	"""JSON con orjson y MessagePack (api.renderers / api.parsers)."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		self.board, self.lists = crear_tablero(self.teacher, cards=2)
+		self.client_api = self.login(self.teacher)
+
+	def test_orjson_igual_que_el_renderer_json_de_drf(self):
+		data = {
+			"aware": datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+			"naive": datetime(2024, 1, 2, 3, 4, 5),
+			"fecha": date(2024, 1, 2),
+			"hora": dt_time(3, 4, 5, 678901),
+			"decimal": Decimal("1.10"),
+			"uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+			"lazy": gettext_lazy("Docente"),
+			"tupla": (1, 2),
+			"separadores": "a\u2028b\u2029c",
+			"ñandú": None,
+		}
+		self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+		indentado = "application/json; indent=2"
+		self.assertEqual(
+			ORJSONRenderer().render(data, indentado), JSONRenderer().render(data, indentado)
+		)
+
+	def test_accept_msgpack(self):
+		url = f"/api/lists/{self.lists[0].id}/cards/"
+		response = self.client_api.get(url, HTTP_ACCEPT="application/msgpack")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response["Content-Type"], "application/msgpack")
+		self.assertEqual(msgpack.unpackb(response.content), self.client_api.get(url).json())
+
+	def test_cuerpo_msgpack(self):
+		url = f"/api/lists/{self.lists[0].id}/cards/"
+		body = msgpack.packb({"title": "Desde msgpack", "priority": "high"})
+		response = self.client_api.post(url, body, content_type="application/msgpack")
+		self.assertEqual(response.status_code, 201, response.content)
+		card = Card.objects.get(title="Desde msgpack")
+		self.assertEqual(card.priority, Card.Priority.HIGH)
+
+		response = self.client_api.post(url, b"\xc1", content_type="application/msgpack")
+		self.assertEqual(response.status_code, 400)
+		self.assertIn("MessagePack parse error", response.json()["detail"])
+
+
+class FastSerializersTests(ApiTestCase):
+	"""api.fast_serializers debe producir exactamente el mismo JSON que los serializers de DRF."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER, "9000000000")
+		students = [crear_usuario(f"ana{i}") for i in range(3)]
+		self.board, self.lists = crear_tablero(self.teacher, members=students, cards=6)
+		labels = [
+			Label.objects.create(board=self.board, name=name, color="#f00")
+			for name in ("examen", "tarea")
+		]
+		for i, card in enumerate(Card.objects.filter(list__board=self.board)):
+			card.description = f"informe {i}" if i % 2 else ""
+			card.due_date = date.today() + timedelta(days=i) if i % 3 else None
+			card.priority = ["low", "med", "high"][i % 3]
+			card.save()
+			card.assignees.add(*students[: i % 4])
+			card.labels.add(*labels[: i % 3])
+		self.client_api = self.login(self.teacher)
+
+	def assertMismaRespuesta(self, url, params=None):
+		with override_settings(API_FAST_SERIALIZERS=False):
+			drf = self.client_api.get(url, params)
+		with override_settings(API_FAST_SERIALIZERS=True):
+			fast = self.client_api.get(url, params)
+		self.assertEqual(drf.status_code, 200)
+		self.assertTrue(drf.json())
+		self.assertEqual(fast.json(), drf.json())
+
+	def test_listas_y_tarjetas(self):
+		self.assertMismaRespuesta(f"/api/boards/{self.board.id}/lists/")
+		self.assertMismaRespuesta(f"/api/lists/{self.lists[0].id}/cards/")
+
+	def test_busqueda(self):
+		self.assertMismaRespuesta("/api/cards/search/", {"q": "informe"})
+
+	def test_calendario(self):
+		hoy = date.today()
+		rango = {"start_date": str(hoy), "end_date": str(hoy + timedelta(days=10))}
+		self.assertMismaRespuesta("/api/calendar/", rango)
+
+
+class RankingTests(ApiTestCase):
+	"""Claves de orden fraccionarias (api.ranking) y movimientos con PATCH."""
+
+	def test_key_between_siempre_queda_entre_los_vecinos(self):
+		rng = random.Random(7)
+		keys = [key_between()]
+		for _ in range(2000):
+			i = rng.randrange(len(keys) + 1)
+			before = keys[i - 1] if i > 0 else None
+			after = keys[i] if i < len(keys) else None
+			key = key_between(before, after)
+			self.assertFalse(key.endswith("0"))
+			self.assertTrue(before is None or before < key, (before, key))
+			self.assertTrue(after is None or key < after, (key, after))
+			keys.insert(i, key)
+		self.assertEqual(keys, sorted(keys))
+
+	def test_spread_keys_y_ranks_for_inserts(self):
+		for count in (1, 5, 36, 500):
+			keys = spread_keys(count)
+			self.assertEqual(len(set(keys)), count)
+			self.assertEqual(keys, sorted(keys))
+		existing = ["h", "m", "t"]
+		ranks = ranks_for_inserts(existing, [0, 2, 5, 3])
+		merged = sorted(existing + ranks)
+		self.assertEqual([merged.index(rank) for rank in ranks], [0, 2, 5, 3])
+
+	def test_mover_tarjeta_solo_cambia_su_clave(self):
+		teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		board, lists = crear_tablero(teacher, cards=4)
+		cards = list(lists[0].cards.order_by("rank"))
+		antes = {card.id: card.rank for card in cards}
+		url = f"/api/cards/{cards[3].id}/"
+		response = self.login(teacher).patch(url, {"position": 1}, format="json")
+		self.assertEqual(response.status_code, 200)
+		orden = list(lists[0].cards.order_by("rank", "id").values_list("id", "rank"))
+		self.assertEqual(
+			[card_id for card_id, _ in orden], [cards[0].id, cards[3].id, cards[1].id, cards[2].id]
+		)
+		del antes[cards[3].id]
+		self.assertEqual({card_id: rank for card_id, rank in orden if card_id in antes}, antes)
+
+	def test_clave_larga_redistribuye_la_lista_tras_el_commit(self):
+		teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		board, lists = crear_tablero(teacher, cards=3)
+		first, second, moved = lists[0].cards.order_by("rank")
+		larga = first.rank + "0" * RANK_REBALANCE_LENGTH + "1"
+		Card.objects.filter(id=second.id).update(rank=larga)
+		client = self.login(teacher)
+		with self.captureOnCommitCallbacks(execute=True) as callbacks:
+			response = client.patch(f"/api/cards/{moved.id}/", {"position": 1}, format="json")
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(len(callbacks), 1)
+		orden = list(lists[0].cards.order_by("rank", "id").values_list("id", "rank"))
+		self.assertEqual([card_id for card_id, _ in orden], [first.id, moved.id, second.id])
+		self.assertTrue(all(len(rank) <= 2 for _, rank in orden), orden)
+
+
+class CardNotificationTests(ApiTestCase):
+	"""Notificaciones a estudiantes al crear y editar tarjetas: una inserción para todos."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		self.client_api = self.login(self.teacher)
+
+	def tablero(self, students):
+		members = [crear_usuario(f"alumno{User.objects.count()}") for _ in range(students)]
+		_, lists = crear_tablero(self.teacher, members=members, cards=1)
+		return lists[0]
+
+	def contar(self, peticion, students):
+		lst = self.tablero(students)
+		batch = mock.patch.object(
+			views, "send_notifications_batch", wraps=views.send_notifications_batch
+		)
+		with batch as enviar, CaptureQueriesContext(connection) as queries:
+			response = peticion(lst)
+		self.assertIn(response.status_code, (200, 201), response.content)
+		enviar.assert_called_once()
+		notifications = enviar.call_args.args[0]
+		self.assertEqual(len(notifications), students)
+		self.assertEqual(Notification.objects.filter(board=lst.board).count(), students)
+		return len(queries), notifications
+
+	def test_editar_tarjeta(self):
+		def editar(lst):
+			url = f"/api/cards/{lst.cards.get().id}/"
+			return self.client_api.patch(url, {"title": "Otro título"}, format="json")
+
+		pocos, _ = self.contar(editar, 1)
+		muchos, notifications = self.contar(editar, 6)
+		self.assertEqual(pocos, muchos)
+		self.assertEqual(notifications[0].notification_type, "card_updated")
+		self.assertEqual(notifications[0].data["changes"], ["título"])
+
+	def test_crear_tarjeta(self):
+		def crear(lst):
+			url = f"/api/lists/{lst.id}/cards/"
+			return self.client_api.post(url, {"title": "Nueva"}, format="json")
+
+		pocos, _ = self.contar(crear, 1)
+		muchos, notifications = self.contar(crear, 6)
+		self.assertEqual(pocos, muchos)
+		self.assertEqual(notifications[0].notification_type, "card_created")
+
+
+class ReorderCardsTests(ApiTestCase):
+	"""POST boards/{id}/cards/reorder/: varios movimientos en una transacción."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		self.board, self.lists = crear_tablero(self.teacher, cards=4)
+		self.cards = list(self.lists[0].cards.order_by("rank"))
+		self.client_api = self.login(self.teacher)
+
+	def reorder(self, moves):
+		url = f"/api/boards/{self.board.id}/cards/reorder/"
+		return self.client_api.post(url, {"moves": moves}, format="json")
+
+	def orden(self, lst):
+		return list(lst.cards.order_by("rank", "id").values_list("id", flat=True))
+
+	def test_mueve_varias_tarjetas_y_devuelve_el_orden(self):
+		a, b, c, d = self.cards
+		response = self.reorder([
+			{"card_id": d.id, "list_id": self.lists[1].id, "position": 0},
+			{"card_id": b.id, "list_id": self.lists[1].id, "position": 1},
+			{"card_id": a.id, "list_id": self.lists[0].id, "position": 1},
+		])
+		self.assertEqual(response.status_code, 200, response.content)
+		self.assertEqual(self.orden(self.lists[0]), [c.id, a.id])
+		self.assertEqual(self.orden(self.lists[1]), [d.id, b.id])
+		devuelto = {
+			lst["id"]: [card["id"] for card in lst["cards"]] for lst in response.json()["lists"]
+		}
+		self.assertEqual(devuelto, {self.lists[0].id: [c.id, a.id], self.lists[1].id: [d.id, b.id]})
+
+	def test_un_movimiento_invalido_no_aplica_ninguno(self):
+		_, otras_listas = crear_tablero(self.teacher, cards=1)
+		ajena = otras_listas[0].cards.get()
+		antes = self.orden(self.lists[0])
+		response = self.reorder([
+			{"card_id": self.cards[0].id, "list_id": self.lists[1].id, "position": 0},
+			{"card_id": ajena.id, "list_id": self.lists[1].id, "position": 1},
+		])
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(self.orden(self.lists[0]), antes)
+		self.assertFalse(self.lists[1].cards.exists())
+
+	def test_rechaza_tarjetas_repetidas_y_no_miembros(self):
+		card = self.cards[0]
+		move = {"card_id": card.id, "list_id": self.lists[1].id, "position": 0}
+		self.assertEqual(self.reorder([move, move]).status_code, 400)
+		ajeno = self.login(crear_usuario("ajeno"))
+		url = f"/api/boards/{self.board.id}/cards/reorder/"
+		response = ajeno.post(url, {"moves": [move]}, format="json")
+		self.assertEqual(response.status_code, 404)
+
+
+class BatchTests(ApiTestCase):
+	"""POST batch/: varias operaciones en una petición."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		self.board, self.lists = crear_tablero(self.teacher, cards=1)
+		self.client_api = self.login(self.teacher)
+		self.crear_tarjeta = {
+			"method": "POST",
+			"path": f"lists/{self.lists[0].id}/cards/",
+			"body": {"title": "Nueva"},
+		}
+
+	def batch(self, operations, atomic=False):
+		payload = {"atomic": atomic, "operations": operations}
+		return self.client_api.post("/api/batch/", payload, format="json")
+
+	def test_referencias_a_operaciones_anteriores(self):
+		card = self.lists[0].cards.get()
+		response = self.batch([
+			{"method": "GET", "path": f"cards/{card.id}/"},
+			{"method": "GET", "path": "lists/{{0.list}}/cards/"},
+		])
+		self.assertEqual(response.status_code, 200)
+		results = response.json()["results"]
+		self.assertEqual([result["status"] for result in results], [200, 200])
+		self.assertEqual(results[1]["body"][0]["id"], card.id)
+
+	def test_atomico_deshace_todo_si_falla_una_operacion(self):
+		response = self.batch([
+			self.crear_tarjeta,
+			{"method": "PATCH", "path": "cards/999999/", "body": {"title": "No existe"}},
+			{"method": "GET", "path": "me/"},
+		], atomic=True)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([result["status"] for result in response.json()["results"]], [201, 404])
+		self.assertFalse(Card.objects.filter(title="Nueva").exists())
+
+	def test_sin_atomico_conserva_las_operaciones_correctas(self):
+		response = self.batch([
+			self.crear_tarjeta,
+			{"method": "PATCH", "path": "cards/999999/", "body": {"title": "No existe"}},
+		])
+		self.assertEqual([result["status"] for result in response.json()["results"]], [201, 404])
+		self.assertTrue(Card.objects.filter(title="Nueva").exists())
+
+	def test_solo_rutas_de_la_api(self):
+		rutas = (
+			"/admin/", "/metrics", "../admin/", "/api/../admin/",
+			"http://evil.test/api/me/", "batch/",
+		)
+		for path in rutas:
+			with self.subTest(path=path):
+				self.assertEqual(self.batch([{"method": "GET", "path": path}]).status_code, 400)
+		self.assertEqual(self.batch([{"method": "GET", "path": "/api/me/"}]).status_code, 200)
+
+	def test_excepcion_de_una_vista_da_500_y_deshace_el_lote(self):
+		with mock.patch("api.views.MeView.get", side_effect=RuntimeError("fallo")), \
+				self.assertLogs("api.batch", "ERROR"):
+			operations = [self.crear_tarjeta, {"method": "GET", "path": "me/"}]
+			response = self.batch(operations, atomic=True)
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual([result["status"] for result in response.json()["results"]], [201, 500])
+		self.assertFalse(Card.objects.filter(title="Nueva").exists())
+
+
+class EnrollmentTests(ApiTestCase):
+	"""POST boards/{id}/enroll/: matrícula masiva por cédula o username."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER, "9000000000")
+		self.colega = crear_usuario("colega", Profile.Role.TEACHER, "9000000001")
+		self.students = [
+			crear_usuario(f"alumno{i}", id_number=f"10000000{i:02d}") for i in range(6)
+		]
+		self.board, _ = crear_tablero(self.teacher, cards=0)
+		self.client_api = self.login(self.teacher)
+
+	def matricular(self, board=None, **payload):
+		url = f"/api/boards/{(board or self.board).id}/enroll/"
+		return self.client_api.post(url, payload, format="json")
+
+	def test_informe_por_fila(self):
+		response = self.matricular(
+			id_numbers="1000000000; 1000000000\n9999999999",
+			usernames=["colega", "docente"],
+		)
+		self.assertEqual(response.status_code, 200, response.content)
+		data = response.json()
+		self.assertEqual(data["enrolled"], 2)
+		self.assertEqual([user["username"] for user in data["members"]], ["alumno0", "colega"])
+		self.assertEqual([error["error"] for error in data["errors"]], [
+			"Repetido en la lista",
+			"Usuario no encontrado",
+			"El propietario del tablero ya es miembro automáticamente",
+		])
+		self.assertEqual(
+			set(self.board.members.values_list("username", flat=True)),
+			{"docente", "alumno0", "colega"},
+		)
+
+	def test_rematricular_es_idempotente(self):
+		self.matricular(usernames=["alumno0", "alumno1"])
+		response = self.matricular(usernames=["alumno1", "alumno2"])
+		self.assertEqual(response.json()["enrolled"], 1)
+		self.assertEqual(response.json()["errors"], [
+			{"row": 1, "username": "alumno1", "error": "Ya es miembro del tablero"},
+		])
+		self.assertEqual(self.board.members.count(), 4)
+		# Cada estudiante recibe una sola invitación
+		invitaciones = Notification.objects.filter(notification_type="member_invited")
+		self.assertEqual(invitaciones.count(), 3)
+		self.assertEqual(self.matricular(usernames=["alumno1"]).json()["enrolled"], 0)
+		self.assertEqual(invitaciones.count(), 3)
+
+	def test_invitaciones_en_un_lote_solo_para_estudiantes(self):
+		batch = mock.patch.object(
+			views, "send_notifications_batch", wraps=views.send_notifications_batch
+		)
+		with batch as enviar:
+			self.matricular(usernames=["alumno0", "alumno1", "colega"])
+		enviar.assert_called_once()
+		recipients = {notification.recipient_id for notification in enviar.call_args.args[0]}
+		self.assertEqual(recipients, {self.students[0].id, self.students[1].id})
+
+	def test_consultas_no_dependen_del_numero_de_usuarios(self):
+		consultas = []
+		for total in (2, 6):
+			board, _ = crear_tablero(self.teacher, cards=0)
+			usernames = [student.username for student in self.students[:total]]
+			with CaptureQueriesContext(connection) as queries:
+				response = self.matricular(board, usernames=usernames)
+			self.assertEqual(response.json()["enrolled"], total)
+			consultas.append(len(queries))
+		self.assertEqual(consultas[0], consultas[1])
+
+
+class CardImportTests(ApiTestCase):
+	"""POST boards/{id}/import/: importación masiva de tarjetas."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		self.student = crear_usuario("alumno", id_number="1000000001")
+		self.board, self.lists = crear_tablero(self.teacher, members=[self.student], cards=0)
+		self.client_api = self.login(self.teacher)
+
+	def importar(self, cards):
+		url = f"/api/boards/{self.board.id}/import/"
+		return self.client_api.post(url, {"cards": cards}, format="json")
+
+	def test_etiquetas_repetidas_con_distinta_capitalizacion(self):
+		Label.objects.create(board=self.board, name="Urgente")
+		response = self.importar([
+			{"list": "Por hacer", "title": "Una", "labels": "Tag;tag;TAG;urgente"},
+			{"list": "Por hacer", "title": "Dos", "labels": ["x" * 60, "X" * 55]},
+		])
+		self.assertEqual(response.status_code, 201, response.content)
+		self.assertEqual(
+			sorted(Label.objects.filter(board=self.board).values_list("name", flat=True)),
+			["Tag", "Urgente", "x" * 50],
+		)
+		una, dos = Card.objects.filter(list=self.lists[0]).order_by("rank")
+		self.assertEqual(sorted(una.labels.values_list("name", flat=True)), ["Tag", "Urgente"])
+		self.assertEqual(list(dos.labels.values_list("name", flat=True)), ["x" * 50])
+
+	def test_titulo_de_lista_demasiado_largo(self):
+		titulo = "L" * 250
+		response = self.importar([
+			{"list": titulo, "title": "Una"},
+			{"list": titulo.lower(), "title": "Dos"},
+		])
+		self.assertEqual(response.status_code, 201, response.content)
+		lista = List.objects.get(board=self.board, title="L" * 200)
+		self.assertEqual(lista.cards.count(), 2)
+
+	def test_ida_y_vuelta(self):
+		filas = [
+			{
+				"list": "En curso", "title": "Informe", "description": "Primer borrador",
+				"due_date": str(date.today() + timedelta(days=7)), "priority": "high",
+				"assignees": "alumno", "labels": "Docs",
+			},
+			{"list": "Revisión", "title": "Presentación", "assignees": "1000000001"},
+		]
+		response = self.importar(filas)
+		self.assertEqual(response.status_code, 201, response.content)
+		self.assertEqual(response.json()["imported"], 2)
+
+		lista = List.objects.get(board=self.board, title="Revisión")
+		for fila, lista_id in zip(filas, (self.lists[1].id, lista.id)):
+			with self.subTest(title=fila["title"]):
+				cards = self.client_api.get(f"/api/lists/{lista_id}/cards/").json()
+				self.assertEqual(len(cards), 1)
+				card = cards[0]
+				self.assertEqual(card["title"], fila["title"])
+				self.assertEqual(card["description"], fila.get("description", ""))
+				self.assertEqual(card["due_date"], fila.get("due_date"))
+				self.assertEqual([user["username"] for user in card["assignees"]], ["alumno"])
+				self.assertEqual(
+					[label["name"] for label in card["labels"]],
+					[fila["labels"]] if "labels" in fila else [],
+				)
+		self.assertEqual(Card.objects.get(title="Informe").priority, Card.Priority.HIGH)
+
+	def test_filas_invalidas_no_importan_nada(self):
+		response = self.importar([
+			{"list": "Por hacer", "title": "Una"},
+			{"list": "Por hacer", "title": "", "assignees": "desconocido"},
+		])
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.json()["errors"][0]["row"], 2)
+		self.assertFalse(Card.objects.filter(list__board=self.board).exists())
+
+
+class BoardCloneTests(ApiTestCase):
+	"""POST boards/{id}/clone/: copia profunda de tableros y plantillas."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER)
+		self.student = crear_usuario("ana")
+		self.board, lists = crear_tablero(self.teacher, [self.student], cards=3, color="#123")
+		etiqueta = Label.objects.create(board=self.board, name="examen", color="#f00")
+		for i, card in enumerate(lists[0].cards.order_by("rank")):
+			card.due_date = self.board.due_date - timedelta(days=10 * i)
+			card.priority = Card.Priority.HIGH
+			card.save()
+			card.assignees.add(self.student)
+			ChecklistItem.objects.create(card=card, text=f"paso {i}", done=True, position=i)
+			if i:
+				etiqueta.cards.add(card)
+		Card.objects.create(list=lists[2], title="Hecha", rank="h", created_by=self.teacher)
+		self.client_api = self.login(self.teacher)
+
+	def clonar(self, **payload):
+		url = f"/api/boards/{self.board.id}/clone/"
+		response = self.client_api.post(url, payload, format="json")
+		self.assertEqual(response.status_code, 201, response.content)
+		return Board.objects.get(id=response.json()["id"])
+
+	def contenido(self, board):
+		"""Estructura comparable de un tablero: listas, tarjetas, etiquetas y checklist."""
+		return [
+			(lst.title, lst.rank, [
+				(
+					card.title, card.description, card.rank, card.position,
+					sorted(label.name for label in card.labels.all()),
+					list(card.checklist_items.order_by("position").values_list("text", "position")),
+				)
+				for card in lst.cards.order_by("rank", "id")
+			])
+			for lst in board.lists.order_by("rank", "id")
+		]
+
+	def test_copia_fiel_sin_miembros_ni_responsables(self):
+		copia = self.clonar()
+		self.assertEqual(copia.name, "Tablero (copia)")
+		self.assertEqual((copia.color, copia.due_date), (self.board.color, self.board.due_date))
+		self.assertEqual(self.contenido(copia), self.contenido(self.board))
+		self.assertEqual(list(copia.members.all()), [self.teacher])
+		cards = Card.objects.filter(list__board=copia)
+		self.assertFalse(cards.filter(assignees__isnull=False).exists())
+		self.assertFalse(ChecklistItem.objects.filter(card__in=cards, done=True).exists())
+
+	def test_sin_fecha_conserva_fechas_y_prioridades(self):
+		copia = self.clonar()
+		originales = Card.objects.filter(list__board=self.board).order_by("rank", "id")
+		copiadas = Card.objects.filter(list__board=copia).order_by("rank", "id")
+		self.assertEqual(
+			[(card.due_date, card.priority) for card in copiadas],
+			[(card.due_date, card.priority) for card in originales],
+		)
+
+	def test_desplaza_las_fechas_con_la_del_tablero(self):
+		nueva = self.board.due_date + timedelta(days=120)
+		copia = self.clonar(due_date=str(nueva), shift_due_dates=True)
+		self.assertEqual(copia.due_date, nueva)
+		fechas = list(
+			Card.objects.filter(list__board=copia, due_date__isnull=False)
+			.order_by("rank").values_list("due_date", flat=True)
+		)
+		self.assertEqual(fechas, [nueva - timedelta(days=10 * i) for i in range(3)])
+
+	def test_plantilla_la_copia_un_miembro(self):
+		self.board.is_template = True
+		self.board.save()
+		url = f"/api/boards/{self.board.id}/clone/"
+		response = self.login(self.student).post(url, {}, format="json")
+		self.assertEqual(response.status_code, 201)
+		self.assertEqual(Board.objects.get(id=response.json()["id"]).owner, self.student)
+
+
+class DeletionTests(ApiTestCase):
+	"""Eliminación en segundo plano de tableros (api.deletion)."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER, "9000000000")
+		self.board, self.lists = crear_tablero(self.teacher)
+		self.card = self.board.lists.get(rank="h").cards.first()
+		self.label = Label.objects.create(board=self.board, name="Urgente")
+
+	def test_recoge_trabajos_creados_con_el_lock_ocupado(self):
+		otro, _ = crear_tablero(self.teacher)
+		deletion.request_board_deletion(self.board, self.teacher)
+		original = deletion.run_pending_jobs
+
+		def run_pending_jobs():
+			done = original()
+			if not DeletionJob.objects.filter(object_id=otro.id).exists():
+				# Otro hilo confirma su trabajo mientras este tiene el lock
+				deletion.request_board_deletion(otro, self.teacher)
+				deletion.drain_queue()
+			return done
+
+		with mock.patch.object(deletion, "run_pending_jobs", run_pending_jobs):
+			deletion.drain_queue()
+		self.assertFalse(Board.objects.filter(id__in=[self.board.id, otro.id]).exists())
+		self.assertFalse(DeletionJob.objects.filter(finished_at__isnull=True).exists())
+
+	def test_tablero_pendiente_queda_oculto(self):
+		deletion.request_board_deletion(self.board, self.teacher)
+		client = self.login(self.teacher)
+		for url in (
+			f"/api/comments/?card={self.card.id}",
+			f"/api/checklist/?card={self.card.id}",
+			f"/api/labels/?board={self.board.id}",
+		):
+			self.assertEqual(client.get(url).json(), [], url)
+		self.assertEqual(client.get(f"/api/boards/{self.board.id}/activity/").status_code, 400)
+		etiqueta = f"/api/labels/{self.label.id}/cards/?board={self.board.id}"
+		for url, data in (
+			("/api/comments/", {"card": self.card.id, "content": "Hola"}),
+			("/api/checklist/", {"card": self.card.id, "text": "Paso"}),
+			(etiqueta, {"card_id": self.card.id, "action": "add"}),
+		):
+			self.assertEqual(client.post(url, data, format="json").status_code, 404, url)
+
+
+class ArchivedBoardTests(ApiTestCase):
+	"""Los tableros archivados son de sólo lectura hasta que se restauran."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER, "9000000000")
+		self.student = crear_usuario("ana", id_number="1000000001")
+		self.board, self.lists = crear_tablero(self.teacher, members=[self.student])
+		self.card = self.lists[0].cards.first()
+		self.label = Label.objects.create(board=self.board, name="Urgente")
+		self.item = ChecklistItem.objects.create(card=self.card, text="Paso")
+		self.client = self.login(self.teacher)
+		response = self.client.post(f"/api/boards/{self.board.id}/archive/")
+		self.assertEqual(response.status_code, 200, response.content)
+
+	def test_rechaza_escrituras(self):
+		board = f"/api/boards/{self.board.id}/"
+		etiqueta = f"/api/labels/{self.label.id}/cards/?board={self.board.id}"
+		for method, url, data in (
+			("patch", board, {"name": "Otro"}),
+			("post", f"{board}members/", {"user_id": self.student.id, "action": "remove"}),
+			("post", f"{board}enroll/", {"usernames": ["ana"]}),
+			("post", "/api/comments/", {"card": self.card.id, "content": "Hola"}),
+			("post", "/api/checklist/", {"card": self.card.id, "text": "Otro paso"}),
+			("patch", f"/api/checklist/{self.item.id}/?card={self.card.id}", {"done": True}),
+			("post", etiqueta, {"card_id": self.card.id, "action": "add"}),
+		):
+			response = getattr(self.client, method)(url, data, format="json")
+			self.assertEqual(response.status_code, 403, (method, url))
+		self.assertEqual(Board.objects.get(id=self.board.id).name, "Tablero")
+		self.assertTrue(self.board.members.filter(id=self.student.id).exists())
+
+	def test_no_se_mueven_tarjetas_al_tablero_archivado(self):
+		otro, listas = crear_tablero(self.teacher)
+		card = listas[0].cards.first()
+		url = f"/api/cards/{card.id}/"
+		response = self.client.patch(url, {"list_id": self.lists[1].id}, format="json")
+		self.assertEqual(response.status_code, 403)
+		self.assertEqual(Card.objects.get(id=card.id).list_id, listas[0].id)
+
+	def test_al_mover_copia_archived_del_destino(self):
+		otro, listas = crear_tablero(self.teacher)
+		card = listas[0].cards.first()
+		Card.objects.filter(id=card.id).update(archived=True)
+		url = f"/api/cards/{card.id}/"
+		response = self.client.patch(url, {"list_id": listas[1].id}, format="json")
+		self.assertEqual(response.status_code, 200, response.content)
+		self.assertFalse(Card.objects.get(id=card.id).archived)
+
+
+class ProvisionarUsuariosTests(TestCase):
+	"""Alta masiva desde CSV (manage.py provisionar_usuarios)."""
+
+	def provisionar(self, filas):
+		csv = tempfile.NamedTemporaryFile("w", suffix=".csv", encoding="utf-8", delete=False)
+		with csv as archivo:
+			archivo.write("username,email,role,id_number\n")
+			archivo.writelines(f"{fila}\n" for fila in filas)
+		self.addCleanup(os.remove, archivo.name)
+		salida = StringIO()
+		call_command(
+			"provisionar_usuarios", archivo.name, password="x" * 8, workers=1, stdout=salida
+		)
+		return salida.getvalue()
+
+	def test_omite_filas_que_no_pasan_los_validadores_de_user(self):
+		salida = self.provisionar([
+			"ana,ana@example.com,student,1000000001",
+			f"{'a' * 151},largo@example.com,student,1000000002",
+			"luis,no-es-un-email,student,1000000003",
+			"mal nombre,mal@example.com,student,1000000004",
+		])
+		self.assertEqual(list(User.objects.values_list("username", flat=True)), ["ana"])
+		self.assertIn("Fila 3", salida)
+		self.assertIn("Fila 4 (luis): email inválido", salida)
+		self.assertIn("Fila 5 (mal nombre): username inválido", salida)
+		self.assertIn("Los usuarios nuevos aparecerán en la búsqueda en 6 minutos", salida)
+
+
+@override_settings(QUERY_BUDGET={"ENABLED": True, "RAISE": True, "HEADER": True})
+class QueryBudgetTests(ApiTestCase):
+	"""Presupuesto de consultas por vista y detector de N+1 (api.query_budget)."""
+
+	def setUp(self):
+		super().setUp()
+		self.teacher = crear_usuario("docente", Profile.Role.TEACHER, "9000000000")
+		crear_tablero(self.teacher)
+		self.client = self.login(self.teacher)
+
+	def test_dentro_del_presupuesto(self):
+		response = self.client.get("/api/cards/search/", {"q": "tarea"})
+		self.assertEqual(response.status_code, 200)
+		self.assertLessEqual(int(response["X-Query-Count"]), views.CardsSearchView.get.query_budget)
+
+	def test_supera_el_presupuesto_de_la_vista(self):
+		with (
+			mock.patch.object(views.CardsSearchView.get, "query_budget", 0),
+			self.assertLogs("api.query_budget", "WARNING") as logs,
+			self.assertRaises(QueryBudgetExceeded),
+		):
+			self.client.get("/api/cards/search/", {"q": "tarea"})
+		self.assertIn("(presupuesto 0)", logs.output[-1])
+
+	def test_presupuesto_de_la_clase_en_un_viewset(self):
+		with (
+			mock.patch.object(views.NotificationViewSet, "query_budget", 0),
+			self.assertLogs("api.query_budget", "WARNING"),
+			self.assertRaises(QueryBudgetExceeded),
+		):
+			self.client.get("/api/notifications/")
+
+	def test_detecta_n_mas_uno(self):
+		def vista(request):
+			for user_id in range(6):
+				list(User.objects.filter(id=user_id))
+			return HttpResponse()
+
+		request = RequestFactory().get("/api/prueba/")
+		with self.assertLogs("api.query_budget", "WARNING") as logs:
+			QueryBudgetMiddleware(vista)(request)
+		self.assertIn("Posible N+1 en GET /api/prueba/: 6 consultas iguales", logs.output[0])
+		self.assertIn("api/tests.py", logs.output[0])
+
+
+class ProfilingTests(ApiTestCase):
+	"""Perfilado bajo demanda de una petición (api.profiling)."""
+
+	def setUp(self):
+		super().setUp()
+		directorio = tempfile.TemporaryDirectory()
+		self.addCleanup(directorio.cleanup)
+		perfilado = override_settings(PROFILING={"ENABLED": True, "DIR": directorio.name})
+		perfilado.enable()
+		self.addCleanup(perfilado.disable)
+		self.staff = crear_usuario("admin", Profile.Role.TEACHER, "9000000000", is_staff=True)
+		crear_tablero(self.staff)
+
+	def test_perfila_el_cuerpo_de_las_respuestas_en_streaming(self):
+		client = self.login(self.staff)
+		with self.assertLogs("api.profiling", "INFO"):
+			response = client.get("/api/calendar/export/", HTTP_X_PROFILE="sample")
+		self.assertEqual(response["X-Profile"], "sample")
+		self.assertTrue(b"".join(response.streaming_content).startswith(b"BEGIN:VCALENDAR"))
+		perfil = client.get(f"/api/profiles/{response['X-Profile-Id']}/")
+		self.assertGreater(json.loads(b"".join(perfil.streaming_content))["sql_count"], 0)
+
+	def test_staff_revocado_con_token_antiguo(self):
+		client = self.login(self.staff)
+		User.objects.filter(id=self.staff.id).update(is_staff=False)
+		response = client.get("/api/calendar/", HTTP_X_PROFILE="sample")
+		self.assertEqual(response.status_code, 200)
+		self.assertNotIn("X-Profile", response)
@@ -8,6 +8,8 @@ from api.views import (
 	ListViewSet,
 	CardViewSet,
 	CardsSearchView,
+	UserLookupView,
+	BatchView,
 	CommentViewSet,
 	ChecklistItemViewSet,
 	LabelViewSet,
@@ -15,7 +17,11 @@ from api.views import (
 	NotificationViewSet,
 	PushSubscriptionViewSet,
 	CalendarView,
+	CalendarSummaryView,
 	CalendarExportView,
+	CalendarFeedURLView,
+	CalendarFeedView,
+	ProfileDownloadView,
 )
 
 router = DefaultRouter()
@@ -34,9 +40,15 @@ urlpatterns = [
 	path("auth/register/", RegisterView.as_view(), name="auth_register"),
 	path("me/", MeView.as_view(), name="me"),
 	path("cards/search/", CardsSearchView.as_view(), name="cards_search"),
+	path("users/lookup/", UserLookupView.as_view(), name="users_lookup"),
+	path("batch/", BatchView.as_view(), name="batch"),
 	path("boards/<int:board_id>/activity/", ActivityLogView.as_view(), name="board_activity"),
 	path("calendar/", CalendarView.as_view(), name="calendar"),
+	path("calendar/summary/", CalendarSummaryView.as_view(), name="calendar_summary"),
 	path("calendar/export/", CalendarExportView.as_view(), name="calendar_export"),
+	path("calendar/feed-url/", CalendarFeedURLView.as_view(), name="calendar_feed_url"),
+	path("calendar/feed/<str:token>.ics", CalendarFeedView.as_view(), name="calendar_feed"),
+	path("profiles/<str:profile_id>/", ProfileDownloadView.as_view(), name="profile_download"),
 	path("", include(router.urls)),
 ]
 
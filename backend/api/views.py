@@ -5,11 +5,18 @@ from rest_framework.views import APIView
 from rest_framework import serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import viewsets, decorators
-from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
 from django.db.models import Q
 from datetime import date, timedelta
+import time
 
 from .models import Board, List, Card, Profile, Label, Comment, ChecklistItem, ActivityLog, Notification, PushSubscription
+from .lookup import lookup_users, LOOKUP_DEFAULT_LIMIT
+from . import fast_serializers, metrics
+from .ranking import rank_for_index, rebalance_if_needed
+from .deletion import request_board_deletion, request_user_deletion
+from .authentication import invalidate_user_cache
+from .query_budget import query_budget
 from .serializers import (
 	BoardSerializer,
 	ListSerializer,
@@ -129,27 +136,29 @@ class MeView(APIView):
 		return Response(MeSerializer(request.user).data)
 
 	def patch(self, request):
-		serializer = MeSerializer(instance=request.user, data=request.data, partial=True)
+		# request.user puede venir de los claims / caché: para escribir se usa la fila actual
+		user = User.objects.select_related("profile").get(id=request.user.id)
+		serializer = MeSerializer(instance=user, data=request.data, partial=True)
 		if serializer.is_valid():
 			serializer.save()
+			invalidate_user_cache(user.id)
 			return Response(serializer.data)
 		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 	def delete(self, request):
 		"""
 		Elimina la cuenta del usuario autenticado.
-		Esto eliminará todos los datos relacionados (tableros, tareas, notificaciones, etc.)
-		debido a las relaciones CASCADE en los modelos.
+		La cuenta se desactiva al instante y sus datos (tableros, tareas,
+		notificaciones, etc.) se borran por lotes en segundo plano.
 		"""
 		user = request.user
 		username = user.username
 		
 		print(f"🗑️ Usuario {username} (ID: {user.id}) solicitó eliminar su cuenta")
 		
-		# Eliminar el usuario (esto eliminará en cascada todos los datos relacionados)
-		user.delete()
+		request_user_deletion(user)
 		
-		print(f"✅ Cuenta de usuario {username} eliminada exitosamente")
+		print(f"✅ Eliminación de la cuenta {username} programada")
 		
 		return Response(
 			{"message": "Cuenta eliminada exitosamente"},
@@ -179,6 +188,7 @@ def send_notification_to_user(user_id, notification_data):
 	# Enviar vía WebSocket (tiempo real en la app)
 	channel_layer = get_channel_layer()
 	if channel_layer:
+		started = time.perf_counter()
 		async_to_sync(channel_layer.group_send)(
 			f"notifications_user_{user_id}",
 			{
@@ -186,6 +196,8 @@ def send_notification_to_user(user_id, notification_data):
 				'data': notification_data
 			}
 		)
+		metrics.record_group_send(started)
+	metrics.record_notifications()
 	
 	# Enviar notificación push del navegador (si está disponible)
 	# IMPORTANTE: Las notificaciones push se mostrarán incluso si la página está en primer plano
@@ -201,6 +213,56 @@ def send_notification_to_user(user_id, notification_data):
 		print(f"   Traceback: {traceback.format_exc()}")
 
 
+def send_notifications_batch(notifications):
+	"""
+	Envía en bloque notificaciones ya guardadas (p. ej. con bulk_create): todos
+	los mensajes WebSocket se envían en una sola pasada por el event loop y las
+	suscripciones push se buscan con una única consulta para todos los destinatarios.
+	"""
+	from asgiref.sync import async_to_sync
+	from channels.layers import get_channel_layer
+	
+	if not notifications:
+		return
+	payloads = []
+	for notification in notifications:
+		data = {
+			'id': notification.id,
+			'type': notification.notification_type,
+			'title': notification.title,
+			'message': notification.message,
+			'board_id': notification.board_id,
+			'created_at': notification.created_at.isoformat()
+		}
+		if 'card_id' in (notification.data or {}):
+			data['card_id'] = notification.data['card_id']
+		payloads.append((notification.recipient_id, data))
+	
+	channel_layer = get_channel_layer()
+	if channel_layer:
+		async def send_all():
+			for user_id, data in payloads:
+				started = time.perf_counter()
+				await channel_layer.group_send(
+					f"notifications_user_{user_id}", {'type': 'send_notification', 'data': data}
+				)
+				metrics.record_group_send(started)
+		async_to_sync(send_all)()
+	metrics.record_notifications(len(payloads))
+	
+	# Sólo se intenta el push para los usuarios que tienen alguna suscripción
+	subscribed = set(
+		PushSubscription.objects.filter(user_id__in={user_id for user_id, _ in payloads})
+		.values_list("user_id", flat=True)
+	)
+	for user_id, data in payloads:
+		if user_id in subscribed:
+			try:
+				send_push_notification_to_user(user_id, data)
+			except Exception as e:
+				print(f"⚠️ Error al enviar push notification (no crítico): {e}")
+
+
 def send_push_notification_to_user(user_id, notification_data):
 	"""
 	Envía notificación push del navegador a todas las suscripciones del usuario.
@@ -231,6 +293,7 @@ def send_push_notification_to_user(user_id, notification_data):
 			return
 		
 		for subscription in subscriptions:
+			started = None
 			try:
 				print(f"🔄 Enviando push notification a suscripción {subscription.id} (endpoint: {subscription.endpoint[:50]}...)")
 				
@@ -270,6 +333,7 @@ def send_push_notification_to_user(user_id, notification_data):
 				print(f"📤 Payload: {payload[:100]}...")
 				print(f"📤 Enviando push notification (se mostrará incluso si la página está en primer plano)")
 				
+				started = time.perf_counter()
 				webpush(
 					subscription_info=subscription_info,
 					data=payload,
@@ -279,10 +343,15 @@ def send_push_notification_to_user(user_id, notification_data):
 					ttl=86400,  # Tiempo de vida de 24 horas
 				)
 				
+				metrics.record_push(subscription.endpoint, "success", started)
 				print(f"✅ Push notification enviada exitosamente a suscripción {subscription.id}")
 			except WebPushException as e:
 				# Si la suscripción es inválida (usuario desinstaló, etc.), eliminarla
 				print(f"❌ WebPushException al enviar push notification: {e}")
+				response = getattr(e, 'response', None)
+				gone = bool(response) and response.status_code in [410, 404]
+				result = "expired" if gone else "failure"
+				metrics.record_push(subscription.endpoint, result, started)
 				if hasattr(e, 'response') and e.response:
 					print(f"   Status code: {e.response.status_code}")
 					if e.response.status_code in [410, 404]:
@@ -292,6 +361,8 @@ def send_push_notification_to_user(user_id, notification_data):
 				else:
 					print(f"   No se pudo obtener información de la respuesta")
 			except Exception as e:
+				if started is not None:
+					metrics.record_push(subscription.endpoint, "failure", started)
 				print(f"❌ Error inesperado al enviar push notification: {e}")
 				import traceback
 				print(f"   Traceback: {traceback.format_exc()}")
@@ -337,13 +408,181 @@ def calculate_auto_priority(card_due_date, board_due_date):
 		return Card.Priority.LOW
 
 
+# Helper function para aplicar cambios a una tarjeta calculando el diff una sola vez
+def apply_card_changes(card, values):
+	"""
+	Asigna en la tarjeta los valores que difieren de los actuales y devuelve el
+	diff {campo: (anterior, nuevo)}. Sirve para guardar con update_fields y para
+	que actividad y notificaciones trabajen sobre el mismo conjunto de cambios.
+	"""
+	changes = {}
+	for field, value in values.items():
+		old = getattr(card, field)
+		if old != value:
+			changes[field] = (old, value)
+			setattr(card, field, value)
+	return changes
+
+
+# Helper function para registrar actividad y notificar los cambios de una tarjeta
+def notify_card_changes(actor, card, changes):
+	board = card.list.board
+	
+	if "list" in changes:
+		old_list, new_list = changes["list"]
+		create_activity_log(
+			board,
+			actor,
+			"card_moved",
+			{
+				"card_id": card.id,
+				"card_title": card.title,
+				"from_list": old_list.title,
+				"to_list": new_list.title,
+			},
+		)
+		
+		# Notificar a docente cuando estudiante mueve tarjeta
+		try:
+			# El rol del actor viene del token; el del propietario sólo se consulta si hace falta
+			if (
+				actor.profile.role == Profile.Role.STUDENT
+				and Profile.objects.get(user_id=board.owner_id).role == Profile.Role.TEACHER
+			):
+				notification = Notification.objects.create(
+					recipient_id=board.owner_id,
+					board=board,
+					notification_type='card_moved',
+					title='Tarjeta movida',
+					message=(
+						f"{actor.username} movió '{card.title}' "
+						f"de '{old_list.title}' a '{new_list.title}'"
+					),
+					data={
+						'card_id': card.id,
+						'card_title': card.title,
+						'from_list': old_list.title,
+						'to_list': new_list.title,
+						'actor_username': actor.username
+					}
+				)
+				send_notification_to_user(board.owner_id, {
+					'id': notification.id,
+					'type': 'card_moved',
+					'title': notification.title,
+					'message': notification.message,
+					'board_id': board.id,
+					'card_id': card.id,
+					'created_at': notification.created_at.isoformat()
+				})
+		except Profile.DoesNotExist:
+			pass
+	
+	# Detectar cambios visibles y notificar a estudiantes miembros del tablero
+	changes_detected = []
+	notification_message_parts = []
+	
+	if "title" in changes:
+		changes_detected.append("título")
+		notification_message_parts.append(f"título cambió a '{card.title}'")
+	
+	if "due_date" in changes:
+		changes_detected.append("fecha límite")
+		if card.due_date:
+			due_date = card.due_date.strftime('%d/%m/%Y')
+			notification_message_parts.append(f"fecha límite cambió a {due_date}")
+		else:
+			notification_message_parts.append("fecha límite fue eliminada")
+	
+	if "priority" in changes:
+		changes_detected.append("prioridad")
+		priority_names = {"high": "Alta", "med": "Media", "low": "Baja"}
+		new_priority_name = priority_names.get(card.priority, card.priority)
+		notification_message_parts.append(f"prioridad cambió a {new_priority_name}")
+	
+	if "description" in changes:
+		changes_detected.append("descripción")
+		notification_message_parts.append("descripción fue actualizada")
+	
+	if not notification_message_parts:
+		return
+	
+	try:
+		# Estudiantes del tablero (miembros y owner), excluyendo al que hizo el cambio
+		student_ids = list(
+			User.objects.filter(
+				Q(boards=board) | Q(id=board.owner_id), profile__role=Profile.Role.STUDENT
+			)
+			.exclude(id=actor.id)
+			.distinct()
+			.values_list("id", flat=True)
+		)
+		
+		# Crear mensaje de notificación
+		changes_text = ", ".join(notification_message_parts)
+		notification_title = "Tarea actualizada"
+		notification_message = f"{actor.username} actualizó la tarea '{card.title}': {changes_text}"
+		
+		# Un solo INSERT y un solo envío para todos los estudiantes
+		notifications = Notification.objects.bulk_create([
+			Notification(
+				recipient_id=student_id,
+				board=board,
+				notification_type='card_updated',
+				title=notification_title,
+				message=notification_message,
+				data={
+					'board_id': board.id,
+					'card_id': card.id,
+					'card_title': card.title,
+					'changes': changes_detected,
+					'actor_username': actor.username
+				}
+			)
+			for student_id in student_ids
+		])
+		send_notifications_batch(notifications)
+	except Exception as e:
+		import traceback
+		print(f"Error al notificar cambios en tarjeta: {e}")
+		traceback.print_exc()
+
+# Helper function para impedir cambios en tableros archivados
+def ensure_board_writable(board):
+	"""Los tableros archivados son de sólo lectura hasta que se restauran."""
+	if board.archived:
+		raise PermissionDenied("El tablero está archivado; restáuralo para modificarlo.")
+
+
+# Helper function con los tableros que cuentan para calendario y búsqueda
+def active_board_ids(user):
+	"""
+	Subconsulta con los ids de los tableros del usuario (owner o miembro) que no
+	son plantillas ni están archivados o pendientes de eliminación. Se usa como
+	subconsulta en lugar de JOIN + DISTINCT para aprovechar los índices de Card.
+	"""
+	return Board.objects.filter(
+		Q(owner=user) | Q(members=user),
+		is_template=False,
+		archived=False,
+		pending_delete=False,
+	).values("id")
+
+
 class BoardViewSet(viewsets.ModelViewSet):
 	serializer_class = BoardSerializer
 	permission_classes = [IsAuthenticated]
 
 	def get_queryset(self):
 		user = self.request.user
-		return Board.objects.filter(Q(owner=user) | Q(members=user)).distinct()
+		# Los tableros pendientes de eliminación quedan ocultos al instante
+		queryset = Board.objects.filter(
+			Q(owner=user) | Q(members=user), pending_delete=False
+		).distinct()
+		if self.action == "list":
+			# Las plantillas y los archivados se listan aparte (boards/templates/, boards/archived/)
+			queryset = queryset.filter(is_template=False, archived=False)
+		return BoardSerializer.setup_eager_loading(queryset, self.request)
 
 	def perform_create(self, serializer):
 		board = serializer.save(owner=self.request.user)
@@ -352,10 +591,10 @@ class BoardViewSet(viewsets.ModelViewSet):
 		
 		# Notificar a estudiantes miembros cuando docente crea tablero
 		try:
-			owner_profile = board.owner.profile
+			owner_profile = self.request.user.profile  # rol tomado del token
 			if owner_profile.role == Profile.Role.TEACHER:
 				# Notificar a todos los miembros estudiantes
-				for member in board.members.all():
+				for member in board.members.select_related("profile"):
 					try:
 						member_profile = member.profile
 						if member_profile.role == Profile.Role.STUDENT:
@@ -384,10 +623,12 @@ class BoardViewSet(viewsets.ModelViewSet):
 		board = self.get_object()
 		if board.owner != self.request.user:
 			raise PermissionDenied("Sólo el propietario puede editar el tablero.")
+		ensure_board_writable(board)
 		# Validar que solo docentes puedan editar la fecha límite
 		if 'due_date' in serializer.validated_data:
 			try:
-				profile = board.owner.profile
+				# El propietario es el usuario autenticado: su rol viene en el token
+				profile = self.request.user.profile
 				if profile.role != Profile.Role.TEACHER:
 					raise PermissionDenied("Solo los docentes pueden editar la fecha límite del tablero.")
 			except Profile.DoesNotExist:
@@ -433,8 +674,8 @@ class BoardViewSet(viewsets.ModelViewSet):
 					# Si hay error al notificar, continuar con la eliminación
 					print(f"Error al notificar eliminación de tablero a {member.username}: {e}")
 		
-		# Eliminar el tablero (esto eliminará en cascada las listas, tarjetas, etc.)
-		instance.delete()
+		# Ocultar el tablero y borrar su contenido por lotes en segundo plano
+		request_board_deletion(instance, self.request.user)
 
 	@decorators.action(detail=True, methods=["post"], url_path="members", permission_classes=[IsAuthenticated])
 	def manage_members(self, request, pk=None):
@@ -445,6 +686,7 @@ class BoardViewSet(viewsets.ModelViewSet):
 		board = self.get_object()
 		if board.owner != request.user and not request.user.is_staff:
 			raise PermissionDenied("Sólo el propietario puede gestionar miembros.")
+		ensure_board_writable(board)
 		user_id = request.data.get("user_id")
 		id_number = request.data.get("id_number")
 		username = request.data.get("username")
@@ -508,27 +750,420 @@ class BoardViewSet(viewsets.ModelViewSet):
 			create_activity_log(board, request.user, "member_removed", {"user_id": member.id, "username": member.username})
 		return Response(BoardSerializer(board).data)
 
+	@decorators.action(
+		detail=True, methods=["post"], url_path="enroll", permission_classes=[IsAuthenticated]
+	)
+	def enroll_members(self, request, pk=None):
+		"""
+		Matrícula masiva: payload { \"id_numbers\": [str], \"usernames\": [str] }
+		Agrega a todos los usuarios encontrados y devuelve un informe por fila con los
+		que no se agregaron.
+		"""
+		from .calendar_feed import bump_feed_version
+		from .enrollment import EnrollmentError, enroll_members, read_identifiers
+		
+		board = self.get_object()
+		if board.owner != request.user and not request.user.is_staff:
+			raise PermissionDenied("Sólo el propietario puede gestionar miembros.")
+		ensure_board_writable(board)
+		try:
+			rows = read_identifiers(request.data)
+		except EnrollmentError as e:
+			raise ValidationError({"detail": str(e)})
+		
+		added, errors = enroll_members(board, rows)
+		if added:
+			# bulk_create no emite m2m_changed
+			bump_feed_version([board.id])
+			create_activity_log(board, request.user, "members_enrolled", {
+				"count": len(added),
+				"user_ids": [user["id"] for user in added],
+			})
+			
+			# Invitaciones a los estudiantes matriculados, enviadas en bloque
+			try:
+				notifications = Notification.objects.bulk_create([
+					Notification(
+						recipient_id=user["id"],
+						board=board,
+						notification_type='member_invited',
+						title='Invitación a tablero',
+						message=f"{request.user.username} te invitó al tablero '{board.name}'",
+						data={
+							'board_id': board.id,
+							'board_name': board.name,
+							'inviter_username': request.user.username,
+						}
+					)
+					for user in added
+					if user["role"] == Profile.Role.STUDENT
+				])
+				send_notifications_batch(notifications)
+			except Exception as e:
+				print(f"Error al procesar invitaciones de matrícula: {e}")
+		
+		return Response({
+			"enrolled": len(added),
+			"members": added,
+			"errors": errors,
+		}, status=status.HTTP_200_OK)
+
 	@decorators.action(detail=True, methods=["get", "post"], url_path="lists", permission_classes=[IsAuthenticated])
 	def board_lists(self, request, pk=None):
 		board = self.get_object()
 		if not (board.owner == request.user or board.members.filter(id=request.user.id).exists()):
 			raise PermissionDenied("No eres miembro de este tablero.")
 		if request.method == "GET":
-			lists = List.objects.filter(board=board).order_by("position", "id")
+			lists = List.objects.filter(board=board).order_by("rank", "id")
+			if fast_serializers.fast_serializers_enabled(request):
+				return Response(fast_serializers.serialize_lists(lists))
 			return Response(ListSerializer(lists, many=True).data)
 		# POST para crear lista
+		ensure_board_writable(board)
 		serializer = ListSerializer(data=request.data)
 		if serializer.is_valid():
+			position = serializer.validated_data.get("position")
 			new_list = List.objects.create(
 				board=board,
 				title=serializer.validated_data.get("title"),
-				position=serializer.validated_data.get("position", 0),
+				position=position or 0,
+				rank=rank_for_index(List.objects.filter(board=board), position),
 			)
 			create_activity_log(board, request.user, "list_created", {"list_id": new_list.id, "list_title": new_list.title})
 			return Response(ListSerializer(new_list).data, status=status.HTTP_201_CREATED)
 		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+	@decorators.action(
+		detail=False, methods=["get"], url_path="archived", permission_classes=[IsAuthenticated]
+	)
+	def archived_boards(self, request):
+		"""Tableros archivados visibles para el usuario."""
+		queryset = self.get_queryset().filter(archived=True)
+		return Response(BoardSerializer(queryset, many=True, context={"request": request}).data)
+
+	@decorators.action(
+		detail=True, methods=["post"], url_path="archive", permission_classes=[IsAuthenticated]
+	)
+	def archive(self, request, pk=None):
+		"""
+		Archiva el tablero: deja de aparecer en el listado, el calendario y la búsqueda,
+		y queda de sólo lectura. Sus tarjetas se marcan con una sola UPDATE para que
+		salgan de los índices parciales de tarjetas activas.
+		"""
+		return self._set_archived(request, archived=True)
+
+	@decorators.action(
+		detail=True, methods=["post"], url_path="restore", permission_classes=[IsAuthenticated]
+	)
+	def restore(self, request, pk=None):
+		"""Restaura un tablero archivado."""
+		return self._set_archived(request, archived=False)
+
+	def _set_archived(self, request, archived):
+		from django.db import transaction
+		from django.utils import timezone
+		
+		board = self.get_object()
+		if board.owner_id != request.user.id:
+			raise PermissionDenied("Sólo el propietario puede archivar o restaurar el tablero.")
+		if board.archived != archived:
+			with transaction.atomic():
+				board.archived = archived
+				board.archived_at = timezone.now() if archived else None
+				board.save(update_fields=["archived", "archived_at"])
+				Card.objects.filter(list__board=board).update(archived=archived)
+				action = "board_archived" if archived else "board_restored"
+				create_activity_log(board, request.user, action, {
+					"board_id": board.id,
+					"board_name": board.name,
+				})
+		return Response(BoardSerializer(board, context={"request": request}).data)
+
+	@decorators.action(
+		detail=False, methods=["get"], url_path="templates", permission_classes=[IsAuthenticated]
+	)
+	def templates(self, request):
+		"""Biblioteca de plantillas: tableros marcados como plantilla visibles para el usuario."""
+		queryset = self.get_queryset().filter(is_template=True)
+		return Response(BoardSerializer(queryset, many=True, context={"request": request}).data)
+
+	@decorators.action(
+		detail=True, methods=["post"], url_path="clone", permission_classes=[IsAuthenticated]
+	)
+	def clone(self, request, pk=None):
+		"""
+		Copia el tablero (listas, tarjetas, etiquetas y checklists) para el usuario actual.
+		payload { "name": str?, "due_date": "YYYY-MM-DD"?,
+			"shift_due_dates": bool?, "is_template": bool? }
+		Sin due_date la copia conserva la fecha límite del original. Con
+		shift_due_dates, las fechas de las tarjetas se desplazan igual que la del tablero.
+		"""
+		from .board_clone import clone_board
+		
+		source = self.get_object()
+		# Cualquier miembro puede usar una plantilla; un tablero normal sólo lo copia su propietario
+		if not source.is_template and source.owner_id != request.user.id:
+			raise PermissionDenied("Sólo el propietario puede copiar este tablero.")
+		
+		name = str(request.data.get("name") or "").strip() or f"{source.name} (copia)"
+		due_date = request.data.get("due_date") or None
+		if due_date:
+			try:
+				due_date = date.fromisoformat(str(due_date))
+			except ValueError:
+				raise ValidationError({"due_date": "Formato de fecha inválido (AAAA-MM-DD)"})
+			# Igual que al editar el tablero: sólo docentes fijan la fecha límite
+			try:
+				is_teacher = request.user.profile.role == Profile.Role.TEACHER
+			except Profile.DoesNotExist:
+				is_teacher = False
+			if not is_teacher:
+				raise PermissionDenied(
+					"Solo los docentes pueden editar la fecha límite del tablero."
+				)
+		
+		board = clone_board(
+			source,
+			request.user,
+			name=name[:200],
+			due_date=due_date,
+			shift_due_dates=bool(request.data.get("shift_due_dates", False)),
+			is_template=bool(request.data.get("is_template", False)),
+		)
+		create_activity_log(board, request.user, "board_created", {
+			"board_id": board.id,
+			"board_name": board.name,
+			"cloned_from": source.id,
+		})
+		data = BoardSerializer(board, context={"request": request}).data
+		return Response(data, status=status.HTTP_201_CREATED)
+
+	@decorators.action(
+		detail=True,
+		methods=["post"],
+		url_path="cards/reorder",
+		permission_classes=[IsAuthenticated],
+	)
+	def reorder_cards(self, request, pk=None):
+		"""
+		Mueve/reordena varias tarjetas del tablero en una sola transacción.
+		payload { "moves": [ { "card_id": int, "list_id": int, "position": int }, ... ] }
+		position es el índice final de la tarjeta dentro de la lista destino.
+		Devuelve el nuevo orden de las listas afectadas.
+		"""
+		from django.db import transaction
+		from django.utils import timezone
+
+		from .ranking import ranks_for_inserts
+		
+		board = self.get_object()
+		ensure_board_writable(board)
+		moves = request.data.get("moves")
+		if not isinstance(moves, list) or not moves:
+			raise ValidationError({"moves": "Debe ser una lista no vacía de movimientos"})
+		if len(moves) > 500:
+			raise ValidationError({"moves": "Máximo 500 movimientos por petición"})
+		try:
+			moves = [
+				{
+					"card_id": int(m["card_id"]),
+					"list_id": int(m["list_id"]),
+					"position": max(0, int(m.get("position", 0))),
+				}
+				for m in moves
+			]
+		except (KeyError, TypeError, ValueError):
+			raise ValidationError(
+				{"moves": "Cada movimiento requiere card_id, list_id y position numéricos"}
+			)
+		card_ids = [m["card_id"] for m in moves]
+		if len(set(card_ids)) != len(card_ids):
+			raise ValidationError({"moves": "Una tarjeta aparece más de una vez"})
+		
+		with transaction.atomic():
+			locked = (
+				Card.objects.select_for_update()
+				.select_related("list")
+				.filter(id__in=card_ids, list__board=board)
+			)
+			cards = {card.id: card for card in locked}
+			missing = [card_id for card_id in card_ids if card_id not in cards]
+			if missing:
+				raise ValidationError(
+					{"moves": f"Tarjetas no encontradas en este tablero: {missing}"}
+				)
+			list_ids = {m["list_id"] for m in moves}
+			target_lists = {
+				lst.id: lst for lst in List.objects.filter(id__in=list_ids, board=board)
+			}
+			missing = sorted(list_ids - set(target_lists))
+			if missing:
+				raise ValidationError(
+					{"moves": f"Listas no encontradas en este tablero: {missing}"}
+				)
+			
+			# Claves de las tarjetas que se quedan en cada lista destino (una consulta)
+			existing = {list_id: [] for list_id in target_lists}
+			stationary = (
+				Card.objects.filter(list_id__in=target_lists).exclude(id__in=card_ids)
+				.order_by("rank", "id").values_list("list_id", "rank")
+			)
+			for list_id, rank in stationary:
+				existing[list_id].append(rank)
+			
+			now = timezone.now()
+			changed_lists = []
+			for list_id in target_lists:
+				list_moves = [m for m in moves if m["list_id"] == list_id]
+				ranks = ranks_for_inserts(existing[list_id], [m["position"] for m in list_moves])
+				for move, rank in zip(list_moves, ranks):
+					card = cards[move["card_id"]]
+					if card.list_id != list_id:
+						changed_lists.append({
+							"card_id": card.id,
+							"card_title": card.title,
+							"from_list": card.list.title,
+							"to_list": target_lists[list_id].title,
+						})
+					card.list = target_lists[list_id]
+					card.position = move["position"]
+					card.rank = rank
+					card.updated_at = now
+			Card.objects.bulk_update(
+				cards.values(), ["list", "position", "rank", "updated_at"], batch_size=500
+			)
+			
+			create_activity_log(board, request.user, "cards_reordered", {
+				"count": len(moves),
+				"card_ids": card_ids,
+				"moved": changed_lists,
+			})
+			
+			for list_id in target_lists:
+				longest = max((c.rank for c in cards.values() if c.list_id == list_id), key=len)
+				rebalance_if_needed(longest, Card.objects.filter(list_id=list_id))
+		
+		# Notificar al docente (una sola notificación) si un estudiante movió tarjetas entre listas
+		if changed_lists:
+			try:
+				is_student = request.user.profile.role == Profile.Role.STUDENT
+				if is_student and board.owner.profile.role == Profile.Role.TEACHER:
+					names = ", ".join(f"'{m['card_title']}'" for m in changed_lists[:3])
+					if len(changed_lists) > 3:
+						names += f" y {len(changed_lists) - 3} más"
+					notification = Notification.objects.create(
+						recipient=board.owner,
+						board=board,
+						notification_type='card_moved',
+						title='Tarjetas movidas',
+						message=f"{request.user.username} movió {names}",
+						data={
+							'board_id': board.id,
+							'moves': changed_lists,
+							'actor_username': request.user.username,
+						}
+					)
+					send_notification_to_user(board.owner.id, {
+						'id': notification.id,
+						'type': 'card_moved',
+						'title': notification.title,
+						'message': notification.message,
+						'board_id': board.id,
+						'created_at': notification.created_at.isoformat()
+					})
+			except Profile.DoesNotExist:
+				pass
+		
+		ordering = {list_id: [] for list_id in target_lists}
+		rows = (
+			Card.objects.filter(list_id__in=target_lists)
+			.order_by("rank", "id")
+			.values("id", "list_id", "position", "rank")
+		)
+		for row in rows:
+			ordering[row["list_id"]].append(
+				{"id": row["id"], "position": row["position"], "rank": row["rank"]}
+			)
+		lists = [{"id": list_id, "cards": ordering[list_id]} for list_id in target_lists]
+		return Response({"lists": lists})
+
+	@decorators.action(
+		detail=True,
+		methods=["post"],
+		url_path="import",
+		permission_classes=[IsAuthenticated],
+	)
+	def import_cards(self, request, pk=None):
+		"""
+		Importa tarjetas en bloque desde JSON ({"cards": [...]}) o un archivo
+		CSV/JSON (campo "file").
+		Columnas: list, title, description, due_date, priority, assignees, labels.
+		"""
+		from .card_import import CardImportError, import_cards, read_rows
+		
+		board = self.get_object()
+		if board.owner != request.user:
+			raise PermissionDenied("Sólo el propietario del tablero puede importar tarjetas.")
+		ensure_board_writable(board)
+		try:
+			rows = read_rows(request)
+		except CardImportError as e:
+			raise ValidationError({"detail": str(e)})
+		
+		cards, errors = import_cards(board, request.user, rows)
+		if errors:
+			return Response(
+				{"imported": 0, "errors": errors}, status=status.HTTP_400_BAD_REQUEST
+			)
+		
+		create_activity_log(board, request.user, "cards_imported", {
+			"count": len(cards),
+			"list_ids": sorted({card.list_id for card in cards}),
+		})
+		
+		# Una sola notificación resumen por estudiante (en lugar de una por tarjeta)
+		try:
+			others = board.members.select_related("profile").exclude(id=request.user.id)
+			students = [
+				member for member in others
+				if getattr(getattr(member, "profile", None), "role", None) == Profile.Role.STUDENT
+			]
+			notifications = Notification.objects.bulk_create([
+				Notification(
+					recipient=student,
+					board=board,
+					notification_type='cards_imported',
+					title='Nuevas tareas creadas',
+					message=(
+						f"{request.user.username} creó {len(cards)} tareas "
+						f"en el tablero '{board.name}'"
+					),
+					data={
+						'board_id': board.id,
+						'count': len(cards),
+						'actor_username': request.user.username,
+					}
+				)
+				for student in students
+			])
+			send_notifications_batch(notifications)
+		except Exception as e:
+			print(f"Error al procesar notificaciones de importación: {e}")
+		
+		return Response({
+			"imported": len(cards),
+			"cards": [
+				{
+					"id": card.id,
+					"list": card.list_id,
+					"title": card.title,
+					"priority": card.priority,
+				}
+				for card in cards
+			],
+		}, status=status.HTTP_201_CREATED)
+
 class ListViewSet(viewsets.GenericViewSet):
 	queryset = List.objects.all()
 	serializer_class = ListSerializer
@@ -537,16 +1172,23 @@ class ListViewSet(viewsets.GenericViewSet):
 	def get_object(self):
 		obj = super().get_object()
 		board = obj.board
+		if board.pending_delete:
+			raise NotFound()
 		if not (board.owner == self.request.user or board.members.filter(id=self.request.user.id).exists()):
 			raise PermissionDenied("No eres miembro de este tablero.")
+		if self.request.method not in permissions.SAFE_METHODS:
+			ensure_board_writable(board)
 		return obj
 
 	@decorators.action(detail=True, methods=["get", "post"], url_path="cards")
 	def list_cards(self, request, pk=None):
 		lst = self.get_object()
 		if request.method == "GET":
-			cards = Card.objects.filter(list=lst).order_by("position", "id")
-			return Response(CardSerializer(cards, many=True).data)
+			cards = Card.objects.filter(list=lst).order_by("rank", "id")
+			if fast_serializers.fast_serializers_enabled(request):
+				return Response(fast_serializers.serialize_cards(cards))
+			cards = CardSerializer.setup_eager_loading(cards, request)
+			return Response(CardSerializer(cards, many=True, context={"request": request}).data)
 		# POST para crear tarjeta
 		# Crear datos sin el campo 'list' ya que lo obtenemos de la lista actual
 		data = dict(request.data)
@@ -569,13 +1211,15 @@ class ListViewSet(viewsets.GenericViewSet):
 			elif not priority:
 				priority = Card.Priority.MED
 			
+			position = serializer.validated_data.get("position")
 			card = Card.objects.create(
 				list=lst,
 				title=serializer.validated_data["title"],
 				description=serializer.validated_data.get("description", ""),
 				due_date=card_due_date,
 				priority=priority,
-				position=serializer.validated_data.get("position", 0),
+				position=position or 0,
+				rank=rank_for_index(Card.objects.filter(list=lst), position),
 				created_by=request.user,
 			)
 			create_activity_log(lst.board, request.user, "card_created", {"card_id": card.id, "card_title": card.title, "list_id": lst.id})
@@ -587,7 +1231,7 @@ class ListViewSet(viewsets.GenericViewSet):
 				students_to_notify = []
 				
 				# Obtener estudiantes de los miembros del tablero
-				for member in board.members.all():
+				for member in board.members.select_related("profile"):
 					if member.id != request.user.id:  # No notificar al creador
 						try:
 							member_profile = member.profile
@@ -605,29 +1249,27 @@ class ListViewSet(viewsets.GenericViewSet):
 					except Profile.DoesNotExist:
 						pass
 				
-				# Notificar a cada estudiante
-				for student in students_to_notify:
-					try:
-						notification = Notification.objects.create(
-							recipient=student,
-							board=board,
-							notification_type='card_created',
-							title='Nueva tarea creada',
-							message=f"{request.user.username} creó la tarea '{card.title}' en el tablero '{board.name}'",
-							data={'board_id': board.id, 'card_id': card.id, 'card_title': card.title, 'list_id': lst.id}
-						)
-						send_notification_to_user(student.id, {
-							'id': notification.id,
-							'type': 'card_created',
-							'title': notification.title,
-							'message': notification.message,
+				# Un solo INSERT y un solo envío para todos los estudiantes
+				notifications = Notification.objects.bulk_create([
+					Notification(
+						recipient=student,
+						board=board,
+						notification_type='card_created',
+						title='Nueva tarea creada',
+						message=(
+							f"{request.user.username} creó la tarea '{card.title}' "
+							f"en el tablero '{board.name}'"
+						),
+						data={
 							'board_id': board.id,
 							'card_id': card.id,
-							'created_at': notification.created_at.isoformat()
-						})
-					except Exception as e:
-						print(f"Error al notificar a estudiante {student.id}: {e}")
-						continue
+							'card_title': card.title,
+							'list_id': lst.id,
+						}
+					)
+					for student in students_to_notify
+				])
+				send_notifications_batch(notifications)
 			except Exception as e:
 				print(f"Error al procesar notificaciones de tarjeta creada: {e}")
 				import traceback
@@ -640,7 +1282,14 @@ class ListViewSet(viewsets.GenericViewSet):
 		lst = self.get_object()
 		serializer = self.get_serializer(lst, data=request.data, partial=True)
 		if serializer.is_valid():
-			serializer.save()
+			extra = {}
+			if "position" in serializer.validated_data:
+				# Reordenar: nueva clave entre los vecinos, sin renumerar las demás listas
+				siblings = List.objects.filter(board_id=lst.board_id).exclude(id=lst.id)
+				extra["rank"] = rank_for_index(siblings, serializer.validated_data["position"])
+			serializer.save(**extra)
+			if "rank" in extra:
+				rebalance_if_needed(extra["rank"], List.objects.filter(board_id=lst.board_id))
 			return Response(serializer.data)
 		return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -661,11 +1310,22 @@ class CardViewSet(viewsets.GenericViewSet):
 	serializer_class = CardSerializer
 	permission_classes = [IsAuthenticated]
 
+	def get_queryset(self):
+		queryset = super().get_queryset()
+		if self.action in ("retrieve", "partial_update"):
+			queryset = CardSerializer.setup_eager_loading(queryset, self.request)
+		return queryset
+
 	def get_object(self):
 		obj = super().get_object()
 		board = obj.list.board
-		if not (board.owner == self.request.user or board.members.filter(id=self.request.user.id).exists()):
+		if board.pending_delete:
+			raise NotFound()
+		user_id = self.request.user.id
+		if not (board.owner_id == user_id or board.members.filter(id=user_id).exists()):
 			raise PermissionDenied("No eres miembro de este tablero.")
+		if self.request.method not in permissions.SAFE_METHODS:
+			ensure_board_writable(board)
 		return obj
 
 	@decorators.action(detail=False, methods=["post"], url_path=r"lists/(?P<list_id>[^/.]+)/cards")
@@ -675,17 +1335,22 @@ class CardViewSet(viewsets.GenericViewSet):
 		except List.DoesNotExist:
 			raise ValidationError({"detail": "Lista no encontrada"})
 		board = lst.board
+		if board.pending_delete:
+			raise NotFound()
 		if not (board.owner == request.user or board.members.filter(id=request.user.id).exists()):
 			raise PermissionDenied("No eres miembro de este tablero.")
+		ensure_board_writable(board)
 		serializer = CardSerializer(data=request.data)
 		if serializer.is_valid():
+			position = serializer.validated_data.get("position")
 			card = Card.objects.create(
 				list=lst,
 				title=serializer.validated_data["title"],
 				description=serializer.validated_data.get("description", ""),
 				due_date=serializer.validated_data.get("due_date"),
 				priority=serializer.validated_data.get("priority", Card.Priority.MED),
-				position=serializer.validated_data.get("position", 0),
+				position=position or 0,
+				rank=rank_for_index(Card.objects.filter(list=lst), position),
 				created_by=request.user,
 			)
 			create_activity_log(board, request.user, "card_created", {"card_id": card.id, "card_title": card.title, "list_id": lst.id})
@@ -696,7 +1361,7 @@ class CardViewSet(viewsets.GenericViewSet):
 				students_to_notify = []
 				
 				# Obtener estudiantes de los miembros del tablero
-				for member in board.members.all():
+				for member in board.members.select_related("profile"):
 					if member.id != request.user.id:  # No notificar al creador
 						try:
 							member_profile = member.profile
@@ -714,29 +1379,27 @@ class CardViewSet(viewsets.GenericViewSet):
 					except Profile.DoesNotExist:
 						pass
 				
-				# Notificar a cada estudiante
-				for student in students_to_notify:
-					try:
-						notification = Notification.objects.create(
-							recipient=student,
-							board=board,
-							notification_type='card_created',
-							title='Nueva tarea creada',
-							message=f"{request.user.username} creó la tarea '{card.title}' en el tablero '{board.name}'",
-							data={'board_id': board.id, 'card_id': card.id, 'card_title': card.title, 'list_id': lst.id}
-						)
-						send_notification_to_user(student.id, {
-							'id': notification.id,
-							'type': 'card_created',
-							'title': notification.title,
-							'message': notification.message,
+				# Un solo INSERT y un solo envío para todos los estudiantes
+				notifications = Notification.objects.bulk_create([
+					Notification(
+						recipient=student,
+						board=board,
+						notification_type='card_created',
+						title='Nueva tarea creada',
+						message=(
+							f"{request.user.username} creó la tarea '{card.title}' "
+							f"en el tablero '{board.name}'"
+						),
+						data={
 							'board_id': board.id,
 							'card_id': card.id,
-							'created_at': notification.created_at.isoformat()
-						})
-					except Exception as e:
-						print(f"Error al notificar a estudiante {student.id}: {e}")
-						continue
+							'card_title': card.title,
+							'list_id': lst.id,
+						}
+					)
+					for student in students_to_notify
+				])
+				send_notifications_batch(notifications)
 			except Exception as e:
 				print(f"Error al procesar notificaciones de tarjeta creada: {e}")
 				import traceback
@@ -750,42 +1413,48 @@ class CardViewSet(viewsets.GenericViewSet):
 		return Response(self.get_serializer(card).data)
 
 	def partial_update(self, request, pk=None):
-		try:
-			card = self.get_object()
-			data = request.data.copy()
-			board = card.list.board
-		except Exception as e:
-			import traceback
-			print(f"Error en get_object o data copy: {e}")
-			traceback.print_exc()
-			raise
+		card = self.get_object()
+		data = request.data
+		board = card.list.board
 		
 		# Validar que solo docentes puedan editar fechas
 		if "due_date" in data or "priority" in data:
 			try:
 				profile = request.user.profile
-				if profile.role != Profile.Role.TEACHER and board.owner != request.user:
+				if profile.role != Profile.Role.TEACHER and board.owner_id != request.user.id:
 					raise PermissionDenied("Solo los docentes pueden editar fechas límite y prioridades de las tareas.")
 			except Profile.DoesNotExist:
-				if board.owner != request.user:
+				if board.owner_id != request.user.id:
 					raise PermissionDenied("Solo los docentes pueden editar fechas límite y prioridades de las tareas.")
 		
-		# Validar que la fecha de la tarjeta no exceda la del tablero
-		if "due_date" in data and data.get("due_date"):
-			card_due_date = data.get("due_date")
+		# Valores nuevos de los campos editables
+		values = {}
+		if "title" in data:
+			values["title"] = data.get("title")
+		if "description" in data:
+			values["description"] = data.get("description", "")
+		if "due_date" in data:
+			card_due_date = data.get("due_date") or None
 			if isinstance(card_due_date, str):
-				from datetime import datetime
-				card_due_date = datetime.strptime(card_due_date, "%Y-%m-%d").date()
-			
-			if board.due_date and card_due_date > board.due_date:
+				try:
+					card_due_date = date.fromisoformat(card_due_date)
+				except ValueError:
+					raise ValidationError({"due_date": "Formato de fecha inválido (AAAA-MM-DD)"})
+			# Validar que la fecha de la tarjeta no exceda la del tablero
+			if card_due_date and board.due_date and card_due_date > board.due_date:
 				raise ValidationError({"due_date": f"La fecha límite de la tarjeta no puede ser posterior a la fecha límite del tablero ({board.due_date})"})
-			
+			values["due_date"] = card_due_date
 			# Recalcular prioridad automática si se cambia la fecha
-			if not data.get("priority") and board.due_date:
-				data["priority"] = calculate_auto_priority(card_due_date, board.due_date)
+			if card_due_date and not data.get("priority") and board.due_date:
+				values["priority"] = calculate_auto_priority(card_due_date, board.due_date)
+		if data.get("priority"):
+			if data.get("priority") not in Card.Priority.values:
+				choices = ", ".join(Card.Priority.values)
+				raise ValidationError({"priority": f"Prioridad inválida, usa: {choices}"})
+			values["priority"] = data.get("priority")
 		
 		# mover entre listas mediante list_id + position
-		old_list = card.list
+		new_list = card.list
 		new_list_id = data.get("list_id")
 		if new_list_id is not None:
 			# Convertir a entero si viene como string
@@ -793,191 +1462,48 @@ class CardViewSet(viewsets.GenericViewSet):
 				new_list_id = int(new_list_id)
 			except (TypeError, ValueError):
 				raise ValidationError({"detail": "list_id debe ser un número válido"})
-			
-			try:
-				new_list = List.objects.select_related("board").get(id=new_list_id)
-			except List.DoesNotExist:
-				raise ValidationError({"detail": "La lista destino no existe"})
-			
-			# validar membresía al tablero destino
-			new_board = new_list.board
-			if not (new_board.owner == request.user or new_board.members.filter(id=request.user.id).exists()):
-				raise PermissionDenied("No eres miembro del tablero destino.")
-			if old_list.id != new_list.id:
-				create_activity_log(
-					new_board,
-					request.user,
-					"card_moved",
-					{"card_id": card.id, "card_title": card.title, "from_list": old_list.title, "to_list": new_list.title},
-				)
-				
-				# Notificar a docente cuando estudiante mueve tarjeta
+			if new_list_id != card.list_id:
 				try:
-					actor_profile = request.user.profile
-					owner_profile = new_board.owner.profile
-					if actor_profile.role == Profile.Role.STUDENT and owner_profile.role == Profile.Role.TEACHER:
-						notification = Notification.objects.create(
-							recipient=new_board.owner,
-							board=new_board,
-							notification_type='card_moved',
-							title='Tarjeta movida',
-							message=f"{request.user.username} movió '{card.title}' de '{old_list.title}' a '{new_list.title}'",
-							data={
-								'card_id': card.id,
-								'card_title': card.title,
-								'from_list': old_list.title,
-								'to_list': new_list.title,
-								'actor_username': request.user.username
-							}
-						)
-						send_notification_to_user(new_board.owner.id, {
-							'id': notification.id,
-							'type': 'card_moved',
-							'title': notification.title,
-							'message': notification.message,
-							'board_id': new_board.id,
-							'card_id': card.id,
-							'created_at': notification.created_at.isoformat()
-						})
-				except Profile.DoesNotExist:
-					pass
-				
-			card.list = new_list
+					new_list = List.objects.select_related("board").get(id=new_list_id)
+				except List.DoesNotExist:
+					raise ValidationError({"detail": "La lista destino no existe"})
+				# validar membresía al tablero destino
+				new_board = new_list.board
+				if new_board.pending_delete:
+					raise ValidationError({"detail": "La lista destino no existe"})
+				membership = new_board.members.filter(id=request.user.id)
+				if not (new_board.owner_id == request.user.id or membership.exists()):
+					raise PermissionDenied("No eres miembro del tablero destino.")
+				ensure_board_writable(new_board)
+				values["list"] = new_list
+				# La copia desnormalizada sigue al tablero destino
+				values["archived"] = new_board.archived
 		if "position" in data:
 			try:
-				card.position = int(data.get("position"))
+				values["position"] = int(data.get("position"))
 			except (TypeError, ValueError):
 				raise ValidationError({"detail": "position debe ser numérico"})
+		if "position" in data or "list" in values:
+			# Nueva clave entre los vecinos del destino: sólo se actualiza esta fila
+			siblings = Card.objects.filter(list_id=new_list.id).exclude(id=card.id)
+			values["rank"] = rank_for_index(siblings, values.get("position"))
 		
-		# Guardar valores anteriores para detectar cambios
-		old_title = card.title
-		old_due_date = card.due_date
-		old_priority = card.priority
-		old_description = card.description
-		
-		# Aplicar cambios a los campos editables
-		if "title" in data:
-			card.title = data.get("title")
-		if "description" in data:
-			card.description = data.get("description", "")
-		if "due_date" in data:
-			card.due_date = data.get("due_date") if data.get("due_date") else None
-		if "priority" in data:
-			card.priority = data.get("priority")
-		
-		# Guardar los cambios manuales (list, position y otros campos)
-		try:
-			card.save()
-		except Exception as e:
-			import traceback
-			print(f"Error al guardar la tarjeta: {e}")
-			traceback.print_exc()
-			raise ValidationError({"detail": f"Error al guardar la tarjeta: {str(e)}"})
-		
-		# Refrescar el objeto desde la base de datos para asegurar que tenemos los datos más recientes
-		try:
-			card.refresh_from_db()
-		except Exception as e:
-			print(f"Advertencia: No se pudo refrescar la tarjeta desde la BD: {e}")
-		
-		# Detectar cambios y notificar a estudiantes miembros del tablero
-		changes_detected = []
-		notification_message_parts = []
-		
-		if "title" in data and old_title != card.title:
-			changes_detected.append("título")
-			notification_message_parts.append(f"título cambió a '{card.title}'")
-		
-		if "due_date" in data and old_due_date != card.due_date:
-			changes_detected.append("fecha límite")
-			if card.due_date:
-				from datetime import datetime
-				due_date_str = card.due_date.strftime("%d/%m/%Y") if isinstance(card.due_date, date) else card.due_date
-				notification_message_parts.append(f"fecha límite cambió a {due_date_str}")
-			else:
-				notification_message_parts.append("fecha límite fue eliminada")
-		
-		if "priority" in data and old_priority != card.priority:
-			changes_detected.append("prioridad")
-			priority_names = {"high": "Alta", "med": "Media", "low": "Baja"}
-			new_priority_name = priority_names.get(card.priority, card.priority)
-			notification_message_parts.append(f"prioridad cambió a {new_priority_name}")
-		
-		if "description" in data and old_description != card.description:
-			changes_detected.append("descripción")
-			notification_message_parts.append("descripción fue actualizada")
-		
-		# Notificar a todos los estudiantes miembros del tablero si hubo cambios
-		if changes_detected and notification_message_parts:
+		# Un único diff: se guardan sólo las columnas que cambian, sin releer la fila
+		changes = apply_card_changes(card, values)
+		if changes:
 			try:
-				# Obtener todos los estudiantes miembros del tablero (excluyendo al que hizo el cambio)
-				students_to_notify = []
-				
-				# Obtener estudiantes de los miembros del tablero
-				for member in board.members.all():
-					if member.id != request.user.id:
-						try:
-							if member.profile.role == Profile.Role.STUDENT:
-								students_to_notify.append(member)
-						except Profile.DoesNotExist:
-							pass
-				
-				# También incluir al owner si es estudiante (aunque normalmente es docente)
-				if board.owner.id != request.user.id:
-					try:
-						if board.owner.profile.role == Profile.Role.STUDENT:
-							if board.owner not in students_to_notify:
-								students_to_notify.append(board.owner)
-					except Profile.DoesNotExist:
-						pass
-				
-				# Crear mensaje de notificación
-				changes_text = ", ".join(notification_message_parts)
-				notification_title = "Tarea actualizada"
-				notification_message = f"{request.user.username} actualizó la tarea '{card.title}': {changes_text}"
-				
-				# Notificar a cada estudiante
-				for student in students_to_notify:
-					try:
-						notification = Notification.objects.create(
-							recipient=student,
-							board=board,
-							notification_type='card_updated',
-							title=notification_title,
-							message=notification_message,
-							data={
-								'board_id': board.id,
-								'card_id': card.id,
-								'card_title': card.title,
-								'changes': changes_detected,
-								'actor_username': request.user.username
-							}
-						)
-						send_notification_to_user(student.id, {
-							'id': notification.id,
-							'type': 'card_updated',
-							'title': notification.title,
-							'message': notification.message,
-							'board_id': board.id,
-							'card_id': card.id,
-							'created_at': notification.created_at.isoformat()
-						})
-					except Exception as e:
-						print(f"Error al notificar a estudiante {student.username}: {e}")
+				card.save(update_fields=[*changes, "updated_at"])
 			except Exception as e:
 				import traceback
-				print(f"Error al notificar cambios en tarjeta: {e}")
+				print(f"Error al guardar la tarjeta: {e}")
 				traceback.print_exc()
+				raise ValidationError({"detail": f"Error al guardar la tarjeta: {str(e)}"})
+			if "rank" in changes:
+				rebalance_if_needed(card.rank, Card.objects.filter(list_id=card.list_id))
+			notify_card_changes(request.user, card, changes)
 		
-		# Serializar y devolver la tarjeta actualizada
-		try:
-			serializer = self.get_serializer(card)
-			return Response(serializer.data)
-		except Exception as e:
-			import traceback
-			print(f"Error al serializar la tarjeta: {e}")
-			traceback.print_exc()
-			raise ValidationError({"detail": f"Error al serializar la tarjeta: {str(e)}"})
+		# Los responsables, etiquetas y creador ya vienen precargados por get_object
+		return Response(self.get_serializer(card).data)
 
 	def destroy(self, request, pk=None):
 		card = self.get_object()
@@ -990,7 +1516,7 @@ class CardViewSet(viewsets.GenericViewSet):
 		
 		# Guardar información antes de eliminar para las notificaciones
 		students_to_notify = []
-		for member in board.members.all():
+		for member in board.members.select_related("profile"):
 			if member.id != request.user.id:  # No notificar al que elimina
 				try:
 					member_profile = member.profile
@@ -1141,12 +1667,13 @@ class CardViewSet(viewsets.GenericViewSet):
 class CardsSearchView(APIView):
 	permission_classes = [IsAuthenticated]
 
+	@query_budget(5)
 	def get(self, request):
 		q = request.query_params.get("q", "").strip()
 		assignee = request.query_params.get("assignee")
 		due = request.query_params.get("due")
 		user = request.user
-		qs = Card.objects.filter(Q(list__board__owner=user) | Q(list__board__members=user)).distinct()
+		qs = Card.objects.filter(list__board_id__in=active_board_ids(user), archived=False)
 		if q:
 			qs = qs.filter(Q(title__icontains=q) | Q(description__icontains=q))
 		if assignee:
@@ -1158,10 +1685,56 @@ class CardsSearchView(APIView):
 			from django.utils.timezone import now
 			from datetime import timedelta
 			qs = qs.filter(due_date__lte=now().date() + timedelta(days=7))
-		data = CardSerializer(qs[:100], many=True).data
+		if fast_serializers.fast_serializers_enabled(request):
+			return Response(fast_serializers.serialize_cards(qs[:100]))
+		qs = CardSerializer.setup_eager_loading(qs, request)
+		data = CardSerializer(qs[:100], many=True, context={"request": request}).data
 		return Response(data)
 
 
+class UserLookupView(APIView):
+	"""
+	Typeahead de usuarios para invitar a tableros.
+	GET /api/users/lookup/?q=ana&limit=10
+	Busca por prefijo de username (sin distinguir mayúsculas) o por id_number
+	completo; el prefijo sólo encuentra los roles visibles para el rol de
+	quien busca (ver api.lookup). La respuesta no incluye el id_number.
+	"""
+	permission_classes = [IsAuthenticated]
+
+	def get(self, request):
+		q = request.query_params.get("q", "")
+		try:
+			limit = int(request.query_params.get("limit", LOOKUP_DEFAULT_LIMIT))
+		except ValueError:
+			raise ValidationError({"limit": "limit debe ser numérico"})
+		return Response(lookup_users(q, limit, user=request.user))
+
+
+class BatchView(APIView):
+	"""
+	Ejecuta varias operaciones de la API en una sola petición.
+	POST /api/batch/
+	{ "atomic": false, "operations": [
+		{ "method": "GET", "path": "cards/5/" },
+		{ "method": "GET", "path": "lists/{{0.list}}/cards/" } ] }
+	Devuelve { "results": [ { "status": 200, "body": {...} }, ... ] }.
+	Las rutas son relativas a /api/ y sólo llegan a endpoints de la API; una
+	operación que falla con una excepción no controlada da { "status": 500 }.
+	"""
+	permission_classes = [IsAuthenticated]
+
+	def post(self, request):
+		from .batch import BatchError, run_batch
+		
+		try:
+			atomic = bool(request.data.get("atomic", False))
+			results = run_batch(request, request.data.get("operations"), atomic=atomic)
+		except BatchError as e:
+			raise ValidationError({"detail": str(e)})
+		return Response({"results": results})
+
+
 # Endpoints para comentarios
 class CommentViewSet(viewsets.ModelViewSet):
 	queryset = Comment.objects.all()
@@ -1171,14 +1744,25 @@ class CommentViewSet(viewsets.ModelViewSet):
 	def get_queryset(self):
 		card_id = self.request.query_params.get("card")
 		if card_id:
-			return Comment.objects.filter(card_id=card_id).select_related("author")
+			return Comment.objects.filter(
+				card_id=card_id, card__list__board__pending_delete=False
+			).select_related("author")
 		return Comment.objects.none()
 
+	def get_object(self):
+		comment = super().get_object()
+		if self.request.method not in permissions.SAFE_METHODS:
+			ensure_board_writable(comment.card.list.board)
+		return comment
+
 	def perform_create(self, serializer):
 		card = serializer.validated_data["card"]
 		board = card.list.board
+		if board.pending_delete:
+			raise NotFound()
 		if not (board.owner == self.request.user or board.members.filter(id=self.request.user.id).exists()):
 			raise PermissionDenied("No eres miembro de este tablero.")
+		ensure_board_writable(board)
 		comment = serializer.save(author=self.request.user)
 		create_activity_log(board, self.request.user, "comment_added", {"card_id": card.id, "comment_id": comment.id})
 
@@ -1192,14 +1776,25 @@ class ChecklistItemViewSet(viewsets.ModelViewSet):
 	def get_queryset(self):
 		card_id = self.request.query_params.get("card")
 		if card_id:
-			return ChecklistItem.objects.filter(card_id=card_id)
+			return ChecklistItem.objects.filter(
+				card_id=card_id, card__list__board__pending_delete=False
+			)
 		return ChecklistItem.objects.none()
 
+	def get_object(self):
+		item = super().get_object()
+		if self.request.method not in permissions.SAFE_METHODS:
+			ensure_board_writable(item.card.list.board)
+		return item
+
 	def perform_create(self, serializer):
 		card = serializer.validated_data["card"]
 		board = card.list.board
+		if board.pending_delete:
+			raise NotFound()
 		if not (board.owner == self.request.user or board.members.filter(id=self.request.user.id).exists()):
 			raise PermissionDenied("No eres miembro de este tablero.")
+		ensure_board_writable(board)
 		serializer.save()
 
 	def perform_update(self, serializer):
@@ -1219,13 +1814,22 @@ class LabelViewSet(viewsets.ModelViewSet):
 	def get_queryset(self):
 		board_id = self.request.query_params.get("board")
 		if board_id:
-			return Label.objects.filter(board_id=board_id)
+			return Label.objects.filter(board_id=board_id, board__pending_delete=False)
 		return Label.objects.none()
 
+	def get_object(self):
+		label = super().get_object()
+		if self.request.method not in permissions.SAFE_METHODS:
+			ensure_board_writable(label.board)
+		return label
+
 	def perform_create(self, serializer):
 		board = serializer.validated_data["board"]
+		if board.pending_delete:
+			raise NotFound()
 		if board.owner != self.request.user and not self.request.user.is_staff:
 			raise PermissionDenied("Sólo el propietario puede crear etiquetas.")
+		ensure_board_writable(board)
 		serializer.save()
 
 	@decorators.action(detail=True, methods=["post"], url_path="cards")
@@ -1240,8 +1844,11 @@ class LabelViewSet(viewsets.ModelViewSet):
 		except Card.DoesNotExist:
 			raise ValidationError({"detail": "Tarjeta no encontrada"})
 		board = card.list.board
+		if board.pending_delete:
+			raise NotFound()
 		if not (board.owner == request.user or board.members.filter(id=request.user.id).exists()):
 			raise PermissionDenied("No eres miembro de este tablero.")
+		ensure_board_writable(board)
 		if action == "add":
 			label.cards.add(card)
 		else:
@@ -1253,9 +1860,10 @@ class LabelViewSet(viewsets.ModelViewSet):
 class ActivityLogView(APIView):
 	permission_classes = [IsAuthenticated]
 
+	@query_budget(5)
 	def get(self, request, board_id):
 		try:
-			board = Board.objects.get(id=board_id)
+			board = Board.objects.get(id=board_id, pending_delete=False)
 		except Board.DoesNotExist:
 			raise ValidationError({"detail": "Tablero no encontrado"})
 		if not (board.owner == request.user or board.members.filter(id=request.user.id).exists()):
@@ -1265,6 +1873,7 @@ class ActivityLogView(APIView):
 
 
 # ViewSet para notificaciones
+@query_budget(3)
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 	serializer_class = NotificationSerializer
 	permission_classes = [IsAuthenticated]
@@ -1278,6 +1887,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
 		if unread == 'true':
 			queryset = queryset.filter(read=False)
 		
+		queryset = NotificationSerializer.setup_eager_loading(queryset, self.request)
 		return queryset.order_by('-created_at')
 
 	@decorators.action(detail=True, methods=['post'])
@@ -1331,6 +1941,7 @@ class CalendarView(APIView):
 	"""
 	permission_classes = [IsAuthenticated]
 	
+	@query_budget(4)
 	def get(self, request):
 		user = request.user
 		board_id = request.query_params.get('board_id')
@@ -1339,10 +1950,12 @@ class CalendarView(APIView):
 		
 		# Obtener tarjetas con fecha límite del usuario
 		# Usuario puede ver tarjetas de tableros donde es owner o miembro
+		# (subconsulta en lugar de JOIN + DISTINCT para aprovechar el índice due_date/list)
 		cards = Card.objects.filter(
-			Q(list__board__owner=user) | Q(list__board__members=user),
-			due_date__isnull=False
-		).distinct().select_related('list', 'list__board', 'created_by').prefetch_related('assignees')
+			list__board_id__in=active_board_ids(user),
+			due_date__isnull=False,
+			archived=False,
+		).select_related('list', 'list__board', 'created_by').prefetch_related('assignees')
 		
 		# Filtrar por tablero si se especifica
 		if board_id:
@@ -1369,32 +1982,113 @@ class CalendarView(APIView):
 			except ValueError:
 				pass
 		
+		if fast_serializers.fast_serializers_enabled(request):
+			return Response(fast_serializers.serialize_calendar_events(cards))
 		serializer = CalendarEventSerializer(cards, many=True)
 		return Response(serializer.data)
 
 
+class CalendarSummaryView(APIView):
+	"""
+	Conteo de tarjetas por día y prioridad para pintar la cuadrícula del mes.
+	GET /api/calendar/summary/?start=2024-01-01&end=2024-01-31&board_id=1
+	Respuesta: [{"date": "2024-01-05", "total": 3, "high": 1, "med": 2, "low": 0}, ...]
+	Los eventos completos de un día se piden a /api/calendar/ con start_date = end_date.
+	"""
+	permission_classes = [IsAuthenticated]
+	# Rango máximo permitido en días
+	max_range_days = 366
+	
+	def get(self, request):
+		from datetime import datetime
+
+		from django.db.models import Count
+		
+		try:
+			start = datetime.strptime(request.query_params.get('start', ''), '%Y-%m-%d').date()
+			end = datetime.strptime(request.query_params.get('end', ''), '%Y-%m-%d').date()
+		except ValueError:
+			raise ValidationError({"detail": "start y end son requeridos con formato YYYY-MM-DD"})
+		if end < start:
+			raise ValidationError({"detail": "end debe ser posterior o igual a start"})
+		if (end - start).days > self.max_range_days:
+			raise ValidationError(
+				{"detail": f"El rango no puede superar {self.max_range_days} días"}
+			)
+		
+		# Subconsulta de tableros visibles: evita el JOIN con members que duplicaría filas
+		cards = Card.objects.filter(
+			list__board_id__in=active_board_ids(request.user),
+			due_date__range=(start, end),
+			archived=False,
+		)
+		
+		board_id = request.query_params.get('board_id')
+		if board_id:
+			try:
+				cards = cards.filter(list__board_id=int(board_id))
+			except ValueError:
+				raise ValidationError({"board_id": "board_id debe ser numérico"})
+		
+		rows = (
+			cards.order_by()
+			.values('due_date')
+			.annotate(
+				total=Count('id'),
+				high=Count('id', filter=Q(priority=Card.Priority.HIGH)),
+				med=Count('id', filter=Q(priority=Card.Priority.MED)),
+				low=Count('id', filter=Q(priority=Card.Priority.LOW)),
+			)
+			.order_by('due_date')
+		)
+		return Response([
+			{
+				"date": row['due_date'],
+				"total": row['total'],
+				"high": row['high'],
+				"med": row['med'],
+				"low": row['low'],
+			}
+			for row in rows
+		])
+
+
 class CalendarExportView(APIView):
 	"""
 	Endpoint para exportar calendario a formato .ics (iCalendar).
 	GET /api/calendar/export/?board_id=1
+	La respuesta se genera en streaming: las tarjetas se leen por bloques con
+	.iterator() y cada evento se envía en cuanto se formatea.
 	"""
 	permission_classes = [IsAuthenticated]
+	# Tarjetas leídas (y assignees precargados) por cada consulta
+	chunk_size = 500
 	
 	def get(self, request):
-		from django.http import HttpResponse
-		from datetime import datetime, timedelta
-		import uuid
+		from django.http import StreamingHttpResponse
 		
-		user = request.user
 		board_id = request.query_params.get('board_id')
+		cards, calendar_name = self.get_cards(request.user, board_id)
 		
-		# Obtener tarjetas con fecha límite
+		# Crear respuesta HTTP con el archivo .ics
+		response = StreamingHttpResponse(
+			self.iter_ics(cards, calendar_name),
+			content_type='text/calendar; charset=utf-8'
+		)
+		filename = f"kanban-calendar-{board_id or 'all'}.ics"
+		response['Content-Disposition'] = f'attachment; filename="{filename}"'
+		return response
+	
+	def get_cards(self, user, board_id=None):
+		"""Tarjetas con fecha límite visibles para el usuario y nombre del calendario."""
 		cards = Card.objects.filter(
-			Q(list__board__owner=user) | Q(list__board__members=user),
-			due_date__isnull=False
-		).distinct().select_related('list', 'list__board', 'created_by').prefetch_related('assignees')
+			list__board_id__in=active_board_ids(user),
+			due_date__isnull=False,
+			archived=False,
+		).select_related('list', 'list__board').prefetch_related('assignees')
 		
 		# Filtrar por tablero si se especifica
+		calendar_name = "Kanban Académico"
 		if board_id:
 			try:
 				board_id_int = int(board_id)
@@ -1402,63 +2096,170 @@ class CalendarExportView(APIView):
 				board = Board.objects.get(id=board_id_int)
 				calendar_name = f"Kanban - {board.name}"
 			except (ValueError, Board.DoesNotExist):
-				calendar_name = "Kanban Académico"
-		else:
-			calendar_name = "Kanban Académico"
-		
-		# Generar contenido .ics
-		ics_content = "BEGIN:VCALENDAR\r\n"
-		ics_content += "VERSION:2.0\r\n"
-		ics_content += "PRODID:-//Kanban Académico//Calendar//ES\r\n"
-		ics_content += f"X-WR-CALNAME:{calendar_name}\r\n"
-		ics_content += "CALSCALE:GREGORIAN\r\n"
-		
-		for card in cards:
-			if not card.due_date:
-				continue
-			
-			# Crear evento para cada tarjeta
-			event_id = str(uuid.uuid4())
+				pass
+		return cards.order_by('due_date', 'id'), calendar_name
+	
+	def iter_ics(self, cards, calendar_name):
+		"""Genera el contenido .ics por partes: cabecera, un bloque por evento y cierre."""
+		from datetime import datetime
+		from datetime import timezone as dt_timezone
+
+		from .calendar_feed import event_uid
+		
+		yield (
+			"BEGIN:VCALENDAR\r\n"
+			"VERSION:2.0\r\n"
+			"PRODID:-//Kanban Académico//Calendar//ES\r\n"
+			f"X-WR-CALNAME:{calendar_name}\r\n"
+			"CALSCALE:GREGORIAN\r\n"
+		)
+		
+		# Prioridad (1=Alta, 5=Media, 9=Baja)
+		priority_map = {Card.Priority.HIGH: '1', Card.Priority.MED: '5', Card.Priority.LOW: '9'}
+		
+		for card in cards.iterator(chunk_size=self.chunk_size):
 			dtstart = datetime.combine(card.due_date, datetime.min.time())
 			dtend = dtstart + timedelta(hours=1)  # Evento de 1 hora
 			
 			# Formatear fechas en formato iCalendar (YYYYMMDDTHHMMSS)
 			dtstart_str = dtstart.strftime('%Y%m%dT%H%M%S')
 			dtend_str = dtend.strftime('%Y%m%dT%H%M%S')
-			dtstamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+			# DTSTAMP estable: última modificación de la tarjeta (UTC)
+			dtstamp = card.updated_at.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
 			
 			# Descripción con información de la tarjeta
-			description = f"Tablero: {card.list.board.name}\\n"
-			description += f"Lista: {card.list.title}\\n"
+			board_name = card.list.board.name
+			description = [f"Tablero: {board_name}", f"Lista: {card.list.title}"]
 			if card.description:
-				description += f"Descripción: {card.description}\\n"
-			if card.assignees.exists():
-				assignees = ", ".join([a.username for a in card.assignees.all()])
-				description += f"Responsables: {assignees}\\n"
-			description += f"Prioridad: {card.get_priority_display()}"
-			
-			# Ubicación (nombre del tablero)
-			location = card.list.board.name
+				description.append(f"Descripción: {card.description}")
+			# assignees ya está precargado: no lanzar consultas por tarjeta
+			assignees = [a.username for a in card.assignees.all()]
+			if assignees:
+				description.append(f"Responsables: {', '.join(assignees)}")
+			description.append(f"Prioridad: {card.get_priority_display()}")
+			description = "\\n".join(description)
 			
-			ics_content += "BEGIN:VEVENT\r\n"
-			ics_content += f"UID:{event_id}@kanban-academico\r\n"
-			ics_content += f"DTSTAMP:{dtstamp}\r\n"
-			ics_content += f"DTSTART:{dtstart_str}\r\n"
-			ics_content += f"DTEND:{dtend_str}\r\n"
-			ics_content += f"SUMMARY:{card.title}\r\n"
-			ics_content += f"DESCRIPTION:{description}\r\n"
-			ics_content += f"LOCATION:{location}\r\n"
-			
-			# Prioridad (1=Alta, 5=Media, 9=Baja)
-			priority_map = {'HIGH': '1', 'MED': '5', 'LOW': '9'}
-			ics_content += f"PRIORITY:{priority_map.get(card.priority, '5')}\r\n"
-			
-			ics_content += "END:VEVENT\r\n"
+			yield "".join((
+				"BEGIN:VEVENT\r\n",
+				f"UID:{event_uid(card.id)}\r\n",
+				f"DTSTAMP:{dtstamp}\r\n",
+				f"DTSTART:{dtstart_str}\r\n",
+				f"DTEND:{dtend_str}\r\n",
+				f"SUMMARY:{card.title}\r\n",
+				f"DESCRIPTION:{description}\r\n",
+				f"LOCATION:{board_name}\r\n",
+				f"PRIORITY:{priority_map.get(card.priority, '5')}\r\n",
+				"END:VEVENT\r\n",
+			))
+		
+		yield "END:VCALENDAR\r\n"
+
+
+class CalendarFeedURLView(APIView):
+	"""
+	Devuelve la URL del feed .ics suscribible del usuario (opcionalmente de un tablero).
+	GET /api/calendar/feed-url/?board_id=1
+	POST /api/calendar/feed-url/?board_id=1 regenera el secreto del usuario:
+	todas sus URLs anteriores dejan de funcionar y se devuelve la nueva.
+	"""
+	permission_classes = [IsAuthenticated]
+	
+	def post(self, request):
+		from .calendar_feed import rotate_feed_secret
 		
-		ics_content += "END:VCALENDAR\r\n"
+		rotate_feed_secret(request.user)
+		return self.get(request)
+	
+	def get(self, request):
+		from django.urls import reverse
+
+		from .calendar_feed import make_feed_token
 		
-		# Crear respuesta HTTP con el archivo .ics
-		response = HttpResponse(ics_content, content_type='text/calendar; charset=utf-8')
-		filename = f"kanban-calendar-{board_id or 'all'}.ics"
-		response['Content-Disposition'] = f'attachment; filename="{filename}"'
+		board_id = request.query_params.get('board_id')
+		if board_id:
+			try:
+				board_id = int(board_id)
+			except ValueError:
+				raise ValidationError({"board_id": "board_id debe ser numérico"})
+			boards = Board.objects.filter(Q(owner=request.user) | Q(members=request.user))
+			if not boards.filter(id=board_id).exists():
+				raise PermissionDenied("No eres miembro de este tablero.")
+		token = make_feed_token(request.user, board_id)
+		url = request.build_absolute_uri(reverse("calendar_feed", args=[token]))
+		return Response({"url": url})
+
+
+class CalendarFeedView(CalendarExportView):
+	"""
+	Feed .ics para clientes de calendario (Google Calendar, Outlook, etc.).
+	GET /api/calendar/feed/<token>.ics
+	El token firmado sustituye al JWT. Soporta ETag / Last-Modified y el
+	contenido se cachea hasta que cambia alguna tarjeta con fecha del feed o
+	la feed_version de alguno de sus tableros.
+	"""
+	permission_classes = [permissions.AllowAny]
+	authentication_classes = []
+	
+	def get(self, request, token):
+		import hashlib
+
+		from django.core import signing
+		from django.core.cache import cache
+		from django.db.models import Count, Max, Sum
+		from django.http import HttpResponse
+		from django.utils.cache import get_conditional_response
+		from django.utils.http import http_date
+
+		from .calendar_feed import FEED_CACHE_TTL, read_feed_token
+		
+		try:
+			user, board_id = read_feed_token(token)
+		except (signing.BadSignature, ValueError):
+			raise NotFound("Feed no encontrado")
+		
+		cards, calendar_name = self.get_cards(user, board_id)
+		
+		# Huella barata del contenido: nº de tarjetas, última modificación y
+		# versiones de los tableros (sólo crecen, así que su suma también)
+		state = cards.order_by().aggregate(
+			count=Count('id'), last=Max('updated_at'), versions=Sum('list__board__feed_version'),
+		)
+		last_modified = state['last']
+		fingerprint = f"{user.id}:{board_id}:{state['count']}:{last_modified}:{state['versions']}"
+		digest = hashlib.sha1(fingerprint.encode()).hexdigest()
+		etag = f'"{digest}"'
+		last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+		
+		not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+		if not_modified is not None:
+			return not_modified
+		
+		cache_key = f"calendar_feed:{digest}"
+		content = cache.get(cache_key)
+		if content is None:
+			content = "".join(self.iter_ics(cards, calendar_name))
+			cache.set(cache_key, content, FEED_CACHE_TTL)
+		
+		response = HttpResponse(content, content_type='text/calendar; charset=utf-8')
+		response['ETag'] = etag
+		if last_modified_ts:
+			response['Last-Modified'] = http_date(last_modified_ts)
 		return response
+
+
+class ProfileDownloadView(APIView):
+	"""
+	Descarga de un perfil guardado por ProfilingMiddleware (sólo staff).
+	GET /api/profiles/<id>/?file=json|folded|prof
+	"""
+	permission_classes = [permissions.IsAdminUser]
+	
+	def get(self, request, profile_id):
+		from django.http import FileResponse
+
+		from .profiling import profile_file
+		
+		path = profile_file(profile_id, request.query_params.get("file", "json"))
+		if path is None:
+			raise NotFound("Perfil no encontrado")
+		return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
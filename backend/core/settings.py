@@ -31,7 +31,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+	'api.metrics.MetricsMiddleware',
 	'django.middleware.security.SecurityMiddleware',
+	'api.query_budget.QueryBudgetMiddleware',
 	'django.contrib.sessions.middleware.SessionMiddleware',
 	'corsheaders.middleware.CorsMiddleware',
 	'django.middleware.common.CommonMiddleware',
@@ -39,8 +41,34 @@ MIDDLEWARE = [
 	'django.contrib.auth.middleware.AuthenticationMiddleware',
 	'django.contrib.messages.middleware.MessageMiddleware',
 	'django.middleware.clickjacking.XFrameOptionsMiddleware',
+	'api.profiling.ProfilingMiddleware',
 ]
 
+# Conteo de consultas SQL por petición y detección de N+1 (ver api.query_budget).
+# Se activa con QUERY_BUDGET_ENABLED=True: cuenta todas las peticiones en
+# desarrollo y una muestra en producción.
+# QUERY_BUDGET_RAISE=True hace fallar las vistas que superan su @query_budget (tests).
+QUERY_BUDGET = {
+	'ENABLED': os.getenv('QUERY_BUDGET_ENABLED', 'False') == 'True',
+	'SAMPLE_RATE': float(os.getenv('QUERY_BUDGET_SAMPLE_RATE', '1.0' if DEBUG else '0.01')),
+	'RAISE': os.getenv('QUERY_BUDGET_RAISE', 'False') == 'True',
+	'N_PLUS_ONE_THRESHOLD': int(os.getenv('QUERY_BUDGET_N_PLUS_ONE', '5')),
+	'HEADER': DEBUG,
+}
+
+# Métricas Prometheus en /metrics (ver api.metrics). Fuera de DEBUG hace falta
+# METRICS_TOKEN; con varios workers define también PROMETHEUS_MULTIPROC_DIR.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Perfilado bajo demanda (ver api.profiling): un usuario staff envía
+# "X-Profile: sample" o "X-Profile: cprofile" y sólo esa petición se perfila.
+# Fuera de DEBUG hay que activarlo con PROFILING_ENABLED=True.
+PROFILING = {
+	'ENABLED': os.getenv('PROFILING_ENABLED', str(DEBUG)) == 'True',
+	'DIR': os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles')),
+	'SAMPLE_INTERVAL': float(os.getenv('PROFILING_SAMPLE_INTERVAL', '0.005')),
+}
+
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -125,15 +153,32 @@ CORS_ALLOW_HEADERS = [
 
 # DRF y JWT
 REST_FRAMEWORK = {
+	# JWT: el usuario se construye desde los claims del token (sin consulta por petición)
 	'DEFAULT_AUTHENTICATION_CLASSES': (
-		'rest_framework_simplejwt.authentication.JWTAuthentication',
+		'api.authentication.ClaimsJWTAuthentication',
 	),
 	'DEFAULT_PERMISSION_CLASSES': (
 		'rest_framework.permissions.IsAuthenticated',
 	),
+	# JSON con orjson y MessagePack (Accept / Content-Type: application/msgpack)
+	'DEFAULT_RENDERER_CLASSES': (
+		'api.renderers.ORJSONRenderer',
+		'api.renderers.MessagePackRenderer',
+		'rest_framework.renderers.BrowsableAPIRenderer',
+	),
+	'DEFAULT_PARSER_CLASSES': (
+		'api.parsers.ORJSONParser',
+		'api.parsers.MessagePackParser',
+		'rest_framework.parsers.FormParser',
+		'rest_framework.parsers.MultiPartParser',
+	),
 	'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Serialización rápida por proyecciones (.values()) en los listados de tarjetas,
+# listas y calendario. Misma estructura JSON que los serializers de DRF.
+API_FAST_SERIALIZERS = os.getenv('API_FAST_SERIALIZERS', 'False').lower() == 'true'
+
 SPECTACULAR_SETTINGS = {
 	'TITLE': 'Kanban Académico API',
 	'DESCRIPTION': 'API para gestión de tableros, listas y tarjetas',
@@ -144,6 +189,8 @@ SIMPLE_JWT = {
 	'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
 	'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
 	'AUTH_HEADER_TYPES': ('Bearer',),
+	'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.ClaimsTokenObtainPairSerializer',
+	'TOKEN_REFRESH_SERIALIZER': 'api.authentication.ClaimsTokenRefreshSerializer',
 }
 
 # Django Channels - Configuración
@@ -173,6 +220,40 @@ else:
 	}
 	print("⚠️ Usando InMemoryChannelLayer (solo desarrollo). Para producción, configura Redis.")
 
+# Cachés: "default" (typeahead de usuarios, feeds...) es local a cada proceso.
+# "auth" guarda las marcas de revocación de los claims del JWT (api.authentication):
+# tienen que verlas todos los procesos y no pueden desalojarse, así que con Redis
+# van a Redis; sin Redis sólo son fiables con un único proceso (desarrollo).
+CACHES = {
+	'default': {
+		'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+	},
+	'auth': {
+		'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+		'LOCATION': f'redis://{REDIS_HOST}:{REDIS_PORT}/1',
+	} if USE_REDIS else {
+		'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+		'LOCATION': 'auth',
+		'OPTIONS': {'MAX_ENTRIES': 1000000},
+	},
+}
+
+# Registro de la app (eliminaciones en segundo plano, errores de lotes, N+1...)
+# por consola; el nivel se ajusta con API_LOG_LEVEL
+LOGGING = {
+	'version': 1,
+	'disable_existing_loggers': False,
+	'handlers': {
+		'console': {'class': 'logging.StreamHandler'},
+	},
+	'loggers': {
+		'api': {
+			'handlers': ['console'],
+			'level': os.getenv('API_LOG_LEVEL', 'INFO'),
+		},
+	},
+}
+
 # Web Push / VAPID Configuration
 # Las claves VAPID se pueden generar con: python generate_vapid_keys.py
 # O usar variables de entorno para producción
@@ -1,9 +1,31 @@
 import axios from 'axios'
 import { useAuthStore } from '../store/auth'
+import { decodeMsgpack } from './msgpack'
+
+// Con VITE_API_MSGPACK=true las respuestas se piden en MessagePack
+// (más compactas y rápidas de generar en el backend que JSON)
+const useMsgpack = import.meta.env.VITE_API_MSGPACK === 'true'
 
 const api = axios.create({
   baseURL: import.meta.env.VITE_API_URL || 'http://localhost:8000/api/',
   withCredentials: false,
+  ...(useMsgpack && {
+    headers: { Accept: 'application/msgpack, application/json;q=0.9' },
+    responseType: 'arraybuffer' as const,
+    transformResponse: [
+      (data: ArrayBuffer, headers: Record<string, unknown>) => {
+        if (!(data instanceof ArrayBuffer) || data.byteLength === 0) return data
+        const contentType = String(headers?.['content-type'] ?? '')
+        if (contentType.startsWith('application/msgpack')) return decodeMsgpack(data)
+        const text = new TextDecoder().decode(data)
+        try {
+          return JSON.parse(text)
+        } catch {
+          return text
+        }
+      },
+    ],
+  }),
 })
 
 api.interceptors.request.use(config => {
@@ -16,5 +38,3 @@ api.interceptors.request.use(config => {
 })
 
 export default api
-
-
@@ -23,6 +23,7 @@ type List = {
   id: number
   title: string
   position: number
+  rank: string
   board: number
 }
 
@@ -33,11 +34,17 @@ type Card = {
   due_date: string | null
   priority: 'low' | 'med' | 'high'
   position: number
+  rank: string
   list: number
   created_by: User
   assignees: User[]
 }
 
+// Respuesta de POST boards/{id}/cards/reorder/: orden final de cada lista afectada
+type ReorderResponse = {
+  lists: { id: number; cards: { id: number; position: number; rank: string }[] }[]
+}
+
 export function BoardView() {
   const { id } = useParams<{ id: string }>()
   const navigate = useNavigate()
@@ -270,34 +277,29 @@ export function BoardView() {
       // Remover la tarjeta de su lista actual
       const updatedCards = cards.filter(c => c.id !== cardId)
       // Agregar la tarjeta a la nueva lista con la nueva posición
-      const newCard = { ...cardToMove, list: newListId, position: newPosition }
+      // '~' ordena después de cualquier clave real hasta que responda el servidor
+      const newCard = { ...cardToMove, list: newListId, position: newPosition, rank: '~' }
       updatedCards.push(newCard)
       setCards(updatedCards)
       
       console.log('Movimiento optimista aplicado:', { cardId, oldListId, newListId, newPosition })
       
-      // Hacer la petición al backend
-      const { data } = await api.patch(`cards/${cardId}/`, {
-        list_id: newListId,
-        position: newPosition,
+      // Un único POST atómico al endpoint de reordenación del tablero
+      const { data } = await api.post<ReorderResponse>(`boards/${id}/cards/reorder/`, {
+        moves: [{ card_id: cardId, list_id: newListId, position: newPosition }],
       })
       
-      console.log('Respuesta del servidor:', data)
-      
-      // Verificar que el list_id en la respuesta sea correcto
-      if (data.list !== newListId) {
-        console.warn('El servidor devolvió un list_id diferente:', { esperado: newListId, recibido: data.list })
+      // El servidor devuelve el orden final de las listas afectadas: aplicar lista, posición y clave
+      const placement = new Map<number, { list: number; position: number; rank: string }>()
+      for (const list of data.lists) {
+        for (const item of list.cards) {
+          placement.set(item.id, { list: list.id, position: item.position, rank: item.rank })
+        }
       }
-      
-      // Actualizar con los datos del servidor (que incluyen el list_id correcto)
-      setCards(prevCards => {
-        // Remover la tarjeta de cualquier lista donde esté
-        const withoutMoved = prevCards.filter(c => c.id !== cardId)
-        // Agregar la tarjeta actualizada del servidor
-        const updated = [...withoutMoved, data]
-        console.log('Estado actualizado con datos del servidor. Tarjeta:', updated.find(c => c.id === cardId))
-        return updated
-      })
+      setCards(prevCards => prevCards.map(c => {
+        const placed = placement.get(c.id)
+        return placed ? { ...c, ...placed } : c
+      }))
     } catch (error: any) {
       console.error('Error al mover tarjeta:', error)
       console.error('Detalles del error:', {
@@ -319,8 +321,8 @@ export function BoardView() {
         } else {
           errorMessage = JSON.stringify(error.response.data.detail)
         }
-      } else if (error?.response?.data?.list_id) {
-        errorMessage = `Error en list_id: ${JSON.stringify(error.response.data.list_id)}`
+      } else if (error?.response?.data?.moves) {
+        errorMessage = String(error.response.data.moves)
       } else if (error?.response?.data) {
         errorMessage = `Error: ${JSON.stringify(error.response.data)}`
       } else if (error?.message) {
@@ -366,11 +368,9 @@ export function BoardView() {
       return
     }
     try {
-      // Buscar usuarios por username (necesitarías un endpoint para esto)
-      // Por ahora, usaremos una búsqueda simple
-      const { data } = await api.get<User[]>(`cards/search/?q=${query}`)
-      // Esto es un workaround, idealmente deberías tener un endpoint /api/users/search/
-      setSearchUsers([])
+      // Typeahead por prefijo de username o id_number
+      const { data } = await api.get<User[]>('users/lookup/', { params: { q: query.trim() } })
+      setSearchUsers(data)
     } catch (error) {
       console.error('Error al buscar usuarios:', error)
     }
@@ -432,7 +432,7 @@ export function BoardView() {
   }
 
   const getCardsForList = (listId: number) => {
-    let filtered = cards.filter(card => card.list === listId).sort((a, b) => a.position - b.position)
+    let filtered = cards.filter(card => card.list === listId).sort((a, b) => (a.rank < b.rank ? -1 : a.rank > b.rank ? 1 : a.id - b.id))
     if (searchFilter) {
       filtered = filtered.filter(
         c => c.title.toLowerCase().includes(searchFilter.toLowerCase()) || c.description.toLowerCase().includes(searchFilter.toLowerCase())
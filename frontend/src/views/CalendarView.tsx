@@ -93,6 +93,39 @@ export function CalendarView() {
     }
   }
 
+  const copyFeedURL = async () => {
+    try {
+      const params: any = {}
+      if (filterBoardId) {
+        params.board_id = filterBoardId
+      }
+      const { data } = await api.get<{ url: string }>('calendar/feed-url/', { params })
+      await navigator.clipboard.writeText(data.url)
+      alert('URL de suscripción copiada. Agrégala en tu app de calendario.')
+    } catch (error) {
+      console.error('Error al obtener URL del feed:', error)
+      alert('Error al obtener la URL de suscripción')
+    }
+  }
+
+  const resetFeedURL = async () => {
+    if (!confirm('Las URLs de suscripción que ya compartiste dejarán de funcionar. ¿Continuar?')) {
+      return
+    }
+    try {
+      const params: any = {}
+      if (filterBoardId) {
+        params.board_id = filterBoardId
+      }
+      const { data } = await api.post<{ url: string }>('calendar/feed-url/', null, { params })
+      await navigator.clipboard.writeText(data.url)
+      alert('Nueva URL de suscripción copiada. Vuelve a agregarla en tu app de calendario.')
+    } catch (error) {
+      console.error('Error al regenerar URL del feed:', error)
+      alert('Error al regenerar la URL de suscripción')
+    }
+  }
+
   const getEventsForDate = (date: Date): CalendarEvent[] => {
     const dateStr = date.toISOString().split('T')[0]
     return events.filter(event => event.due_date === dateStr)
@@ -258,6 +291,19 @@ export function CalendarView() {
               >
                 📥 Exportar .ics
               </button>
+              <button
+                onClick={copyFeedURL}
+                className="btn-secondary"
+              >
+                🔗 Suscribirse
+              </button>
+              <button
+                onClick={resetFeedURL}
+                className="btn-secondary"
+                title="Invalida las URLs de suscripción anteriores"
+              >
+                🔄 Nueva URL
+              </button>
             </div>
           </div>
 
@@ -22,6 +22,14 @@ type Card = {
   created_at?: string
 }
 
+type BoardInfo = {
+  due_date: string | null
+  owner: User
+  members: User[]
+}
+
+type BatchResult<T> = { status: number; body: T }
+
 export function CardDetailView() {
   const { boardId, cardId } = useParams<{ boardId: string; cardId: string }>()
   const navigate = useNavigate()
@@ -29,7 +37,7 @@ export function CardDetailView() {
   const { theme } = useThemeStore()
 
   const [card, setCard] = useState<Card | null>(null)
-  const [board, setBoard] = useState<{ due_date: string | null; owner: User } | null>(null)
+  const [board, setBoard] = useState<BoardInfo | null>(null)
   const [loading, setLoading] = useState(true)
   const [editing, setEditing] = useState(false)
   const [showAssigneesModal, setShowAssigneesModal] = useState(false)
@@ -42,8 +50,7 @@ export function CardDetailView() {
 
   useEffect(() => {
     if (cardId) {
-      loadCard()
-      loadBoard()
+      loadCardAndBoard()
     }
   }, [cardId])
 
@@ -68,13 +75,31 @@ export function CardDetailView() {
     }
   }
 
-  const loadBoard = async () => {
-    if (!boardId) return
+  // Tarjeta y tablero en una sola petición (batch/): un único round trip
+  const loadCardAndBoard = async () => {
+    if (!boardId) {
+      await loadCard()
+      return
+    }
     try {
-      const { data } = await api.get<{ due_date: string | null; owner: User }>(`boards/${boardId}/`)
-      setBoard(data)
+      const { data } = await api.post<{ results: [BatchResult<Card>, BatchResult<BoardInfo>] }>('batch/', {
+        operations: [
+          { method: 'GET', path: `cards/${cardId}/` },
+          { method: 'GET', path: `boards/${boardId}/?fields=due_date,owner,members` },
+        ],
+      })
+      const [cardResult, boardResult] = data.results
+      if (cardResult.status !== 200) throw new Error(`HTTP ${cardResult.status}`)
+      setCard(cardResult.body)
+      setEditTitle(cardResult.body.title)
+      setEditDueDate(cardResult.body.due_date || '')
+      setEditPriority(cardResult.body.priority)
+      if (boardResult.status === 200) setBoard(boardResult.body)
     } catch (error) {
-      console.error('Error al cargar tablero:', error)
+      console.error('Error al cargar tarjeta:', error)
+      navigate(`/board/${boardId}`)
+    } finally {
+      setLoading(false)
     }
   }
 
@@ -84,7 +109,8 @@ export function CardDetailView() {
   const loadBoardMembers = async () => {
     if (!boardId) return
     try {
-      const { data } = await api.get<{ owner: User; members: User[] }>(`boards/${boardId}/`)
+      // Reutilizar el tablero ya cargado si está disponible
+      const data = board ?? (await api.get<BoardInfo>(`boards/${boardId}/?fields=due_date,owner,members`)).data
       // Combinar owner y members en una lista única
       const allMembers = [data.owner, ...data.members]
       // Eliminar duplicados por ID
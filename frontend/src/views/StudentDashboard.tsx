@@ -12,17 +12,14 @@ type Board = {
   name: string
   color: string
   owner: { id: number; username: string }
-  members: Array<{ id: number; username: string }>
 }
 
 type Card = {
   id: number
   title: string
-  description: string
   due_date: string | null
   priority: 'low' | 'med' | 'high'
   list: number
-  assignees: Array<{ id: number; username: string }>
 }
 
 export function StudentDashboard() {
@@ -68,7 +65,7 @@ export function StudentDashboard() {
   const loadBoards = async () => {
     setLoading(true)
     try {
-      const { data } = await api.get<Board[]>('boards/')
+      const { data } = await api.get<Board[]>('boards/?fields=id,name,color,owner')
       setBoards(data)
     } catch (error) {
       console.error('Error al cargar tableros:', error)
@@ -81,16 +78,19 @@ export function StudentDashboard() {
     if (!user) return
     setLoadingCards(true)
     try {
+      // Sólo los campos que muestra el dashboard (sin assignees/labels anidados)
+      const fields = 'id,list,title,due_date,priority'
+
       // Cargar tarjetas asignadas a mí
-      const { data: assignedCards } = await api.get<Card[]>(`cards/search/?assignee=${user.id}`)
+      const { data: assignedCards } = await api.get<Card[]>(`cards/search/?assignee=${user.id}&fields=${fields}`)
       setMyCards(assignedCards)
 
       // Cargar tarjetas próximas a vencer (próximos 7 días)
-      const { data: soonData } = await api.get<Card[]>(`cards/search/?due=soon`)
+      const { data: soonData } = await api.get<Card[]>(`cards/search/?due=soon&fields=${fields}`)
       setSoonCards(soonData)
 
       // Cargar tarjetas vencidas
-      const { data: overdueData } = await api.get<Card[]>(`cards/search/?due=overdue`)
+      const { data: overdueData } = await api.get<Card[]>(`cards/search/?due=overdue&fields=${fields}`)
       setOverdueCards(overdueData)
     } catch (error) {
       console.error('Error al cargar tarjetas:', error)